@@ -18,14 +18,15 @@
 2025-02-10 v1.9.1 fixed display memory, print, tonum.
 2025-03-01 v1.10 CLI.
 2025-03-17 v2.0 delete -> delv
+2026-10-18 v2.1 profiler: stat(1), stat(2), Ctrl+P overlay, PYPICO8_PROFILE call counts.
+2026-10-18 v2.2 PYPICO8_FIX16 16.16 fixed point numbers.
 
 >>> _init_video()
 """
 
 # pylint:disable = global-statement, import-outside-toplevel, invalid-name, line-too-long, multiple-imports, no-member, pointless-string-statement, redefined-builtin, too-many-arguments,unused-import, unidiomatic-typecheck, wrong-import-position, too-many-nested-blocks
-import builtins, inspect, os, queue, sys, threading, time as py_time  # noqa: E401
+import builtins, os, queue, sys, threading, time as py_time  # noqa: E401
 from typing import Callable
-from unittest.mock import Mock
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
 try:
@@ -34,11 +35,14 @@ try:
 
     # fmt:off
     sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
-    from pypico8.maths import atan2, ceil, cos, div, divi, flr, max, mid, min, round4, rnd, shl, shr, sgn, sin, sqrt, srand  # type: ignore  # noqa  # unused here but maybe not elsewhere.
+    from pypico8.maths import atan2, ceil, cos, cos_v, div, divi, flr, flr_v, max, mid, min, round4, rnd, shl, shr, sgn, sin, sin_v, sqrt, srand  # type: ignore  # noqa  # unused here but maybe not elsewhere.
     from pypico8.table import Table, add, all, delv, deli, foreach, ipairs, pairs, pack, select, unpack  # noqa
-    from pypico8.audio import audio_channel_notes, music, sfx, threads  # noqa
+    from pypico8.audio import audio_stat, music, sfx, threads  # noqa
     from pypico8.strings import chr, ord, pico8_to_python, printh, split, sub, tonum, tostr  # noqa
-    from pypico8.video import _init_video, camera, circ, circfill, clip, cls, color, cursor, debug, fget, fillp, flip, flip_getlast, fset, get_char_img, get_fps, get_frame_count, line, map, memcpy, mget, mset, oval, ovalfill, pal, palt, peek, peek2, peek4, pget, poke, poke2, poke4, pos, print, pset, rect, rectfill, replace_color, reset, set_debug, _set_fps, scroll, sget, spr, sset, sspr  # noqa
+    from pypico8.video import _init_video, add_write_hook, camera, circ, circfill, clip, cls, color, cursor, debug, fget, fillp, flip, flip_getlast, fset, get_char_img, get_fps, get_frame_count, line, map, memcpy, memset, mget, mset, oval, ovalfill, pal, palt, peek, peek2, peek4, pget, pget_many, poke, poke2, poke4, pos, print, pset, pset_many, rect, rectfill, remove_write_hook, replace_color, reset, set_debug, _set_fps, screen_array, scroll, sget, spr, sset, sspr  # noqa
+    from pypico8 import fix16, profiler, video
+    if fix16.ENABLED:
+        from pypico8.fix16 import Fix16, atan2, ceil, cos, div, divi, flr, rnd, shl, shr, sin, sqrt, tonum  # type: ignore  # noqa: F811
     # fmt:on
 except ModuleNotFoundError as ex:
     builtins.print(ex)
@@ -46,6 +50,20 @@ except ModuleNotFoundError as ex:
 
 FUN0 = Callable[[], None]
 
+if profiler.ENABLED:
+    # Time the drawing, memory and audio API carts import. flip is timed per frame by CartThread.
+    profiler.instrument(
+        globals(),
+        [
+            name
+            for name, value in globals().items()
+            if getattr(value, "__module__", "") in ("pypico8.video", "pypico8.audio")
+            and callable(value)
+            and not name.startswith("_")
+            and name != "flip"
+        ],
+    )
+
 false = False
 true = True
 DEVKIT_PT = 0x5F2D  # 24365
@@ -98,10 +116,22 @@ running = False
 tick = 0
 buttons_pressed_since = [0] * 2 * 6  # 2 players * 6 buttons
 single_frame_mode = 0
+headless = False  # Set by python -m pypico8 render to step carts without a window or wall clock.
+
+
+MIN_DRAW_FPS = (
+    15  # CartThread skips draws down to this frame rate before the game slows down.
+)
+
 
+class CartThread(threading.Thread):  # pylint: disable=too-many-instance-attributes
+    """Async rendering for busy demos like assembled_horizon.
 
-class CartThread(threading.Thread):
-    """Async rendering for busy demos like assembled_horizon."""
+    Like PICO-8, update runs on a fixed timestep at the cart's frame rate. When update, draw and
+    flip take longer than that, draw and flip only run after every 2nd, then every 4th update:
+    60 fps carts draw at 30, then 15 fps, 30 fps carts at 15. So the game keeps its speed.
+    stat(7) gives the measured and stat(8) the targeted draw rate.
+    """
 
     def __init__(
         self,
@@ -116,19 +146,82 @@ class CartThread(threading.Thread):
         self.daemon = True  # Die with main thread.
         self.running = True
         self.stopped = False
+        self.updates_per_draw = 1
+        self.draw_fps = 0.0  # Measured each second.
+        self.slow_frames = 0  # In a row over (> 0) or well under (< 0) their timestep.
 
     def run(self) -> None:
         self.init()
+        due = second_start = py_time.perf_counter()  # When the next frame should start.
+        drawn = 0
         while self.running:
             if self.stopped:
                 pygame.time.wait(100)
-            else:
-                self.update()
-                tick_up()
-                self.draw()
-                flip()  # blink_frame needs this.
-                clock.tick(get_fps())
-                # pygame.time.wait(4)
+                due = second_start = py_time.perf_counter()
+                drawn = 0
+                continue
+            fps = get_fps()
+            updates = self.updates_per_draw
+            begin_frame = py_time.perf_counter()
+            step(self.update, self.draw, updates)
+            now = py_time.perf_counter()
+            self.schedule(now - begin_frame, fps)
+            drawn += 1
+            if now - second_start >= 1:
+                self.draw_fps = drawn / (now - second_start)
+                second_start, drawn = now, 0
+            due += updates / fps
+            if due > now:
+                py_time.sleep(due - now)
+            elif (
+                now - due > 0.25
+            ):  # Too slow even at MIN_DRAW_FPS: let the game slow down.
+                due = now
+
+    def schedule(self, frame_time: float, fps: int) -> None:
+        """Draw half as often after 3 frames in a row took longer than the timestep of their updates,
+        and twice as often after 30 that would have fit in half of it.
+
+        >>> cart = CartThread(); [cart.schedule(0.05, 60) or cart.updates_per_draw for _ in range(7)]
+        [1, 1, 2, 2, 2, 4, 4]
+        >>> [cart.schedule(0.01, 60) or cart.updates_per_draw for _ in range(30)][-2:]
+        [4, 2]
+        >>> [cart.schedule(0.1, 30) or cart.updates_per_draw for _ in range(9)][-1]
+        2
+        """
+        budget = self.updates_per_draw / fps
+        if frame_time > budget:
+            self.slow_frames = self.slow_frames + 1 if self.slow_frames > 0 else 1
+            if (
+                self.slow_frames >= 3
+                and fps / self.updates_per_draw / 2 >= MIN_DRAW_FPS
+            ):
+                self.updates_per_draw *= 2
+                self.slow_frames = 0
+        elif frame_time < budget * 0.4 and self.updates_per_draw > 1:
+            self.slow_frames = self.slow_frames - 1 if self.slow_frames < 0 else -1
+            if self.slow_frames <= -30:
+                self.updates_per_draw //= 2
+                self.slow_frames = 0
+        else:
+            self.slow_frames = 0
+
+
+def step(update: FUN0, draw: FUN0, updates: int = 1) -> None:
+    """Run one frame of the cart: updates updates, then one draw and flip.
+    Time its phases for stat(1), stat(2) and the profiler."""
+    begin_update = py_time.perf_counter()
+    for _ in range(updates):
+        update()
+        tick_up()
+    begin_draw = py_time.perf_counter()
+    draw()
+    begin_flip = py_time.perf_counter()
+    flip()  # blink_frame needs this.
+    profiler.record("_update", begin_draw - begin_update)
+    profiler.record("_draw", begin_flip - begin_draw)
+    profiler.record("flip", py_time.perf_counter() - begin_flip)
+    profiler.end_frame()
 
 
 def cli_start() -> None:
@@ -169,7 +262,12 @@ def btn(button: int | None = None, player: int = 0) -> int | bool:
     >>> pygame.key.get_pressed = real_pressed
     """
 
-    pressed = list(nr for nr, isdown in enumerate(pygame.key.get_pressed()) if isdown)
+    if video.offscreen:  # No keyboard without a window: nothing is pressed.
+        pressed = []
+    else:
+        pressed = list(
+            nr for nr, isdown in enumerate(pygame.key.get_pressed()) if isdown
+        )
 
     if button is None:
         bitfield = 1 if 80 in pressed else 0
@@ -333,6 +431,7 @@ def run(
 ) -> None:
     """Run from the start of the program. Can be called from inside a program to reset program.
 
+    >>> from unittest.mock import Mock
     >>> pygame.event.get = Mock(return_value=[
     ...     Event(pygame.KEYDOWN, key=pygame.K_BREAK, unicode=''),
     ...     Event(pygame.KEYDOWN, key=pygame.K_BREAK, unicode=''),
@@ -352,6 +451,10 @@ def run(
     fps = 60 if _update.__name__ == "_update60" else 30
     _set_fps(fps)
 
+    if headless:
+        run_headless(_init, _update, _draw)
+        return
+
     try:
         _init_video()
         caption = pygame.display.get_caption()[0]
@@ -370,12 +473,24 @@ def run(
             cart = CartThread(_draw, _init, _update)
             cart.start()
 
+        import inspect  # Slow to import.
+
         flip_aid = "cls" not in inspect.getsource(_draw)
         while running:
             fps = get_fps()
             pygame.time.wait(flr(1 / fps * 1000))
-            # Flip if cart thread didn't in time.
-            if (command_mode or flip_aid) and py_time.time() - flip_getlast() > 1 / fps:
+            # Flip if the cart thread didn't in time, like when _draw never returns. Its frames
+            # are scheduled updates_per_draw updates apart.
+            late = py_time.time() - flip_getlast()
+            updates_per_draw = (
+                cart.updates_per_draw if isinstance(cart, CartThread) else 1
+            )
+            if (
+                command_mode
+                and late > 1 / fps
+                or flip_aid
+                and late > 2 * updates_per_draw / fps
+            ):
                 # builtins.print("main flip!")
                 flip()
 
@@ -481,7 +596,9 @@ def run(
 
             for event in pygame.event.get():
                 if event.type == pygame.KEYDOWN:
-                    if event.key in (pygame.K_BREAK, pygame.K_p, pygame.K_RETURN):
+                    if event.key == pygame.K_p and event.mod & pygame.KMOD_CTRL:
+                        profiler.toggle_overlay()
+                    elif event.key in (pygame.K_BREAK, pygame.K_p, pygame.K_RETURN):
                         caption = pygame.display.get_caption()[0]
                         if stopped:
                             if caption.endswith("PAUSED"):
@@ -525,18 +642,51 @@ def run(
     cart.running = False  # type: ignore[union-attr]
     # cart.join()  # No need to wait for daemon thread.
 
+    if profiler.ENABLED:
+        profiler.dump()
+
     pygame.quit()
 
 
-def stat(x: int) -> int | bool | str:
+def run_headless(
+    _init: FUN0 = lambda: None, _update: FUN0 = lambda: None, _draw: FUN0 = lambda: None
+) -> None:
+    """Step the cart as fast as the CPU allows until it stops, t() counting frames instead of seconds.
+    Frames are only drawn to video.screen, so a video.flip_hook has to save them and end the run.
+
+    >>> frames = []
+    >>> def _update(): frames.append(t()); stop() if len(frames) == 3 else None
+    >>> run_headless(_update=_update); frames
+    [0, 0.0333, 0.0667]
+    >>> _init_video()
+    """
+    global stopped
+    _init_video(headless=True)
+    stopped = False
+    try:
+        _init()
+        while not stopped:
+            step(_update, _draw)
+    finally:
+        for thread in threads:
+            thread.stop = True  # type: ignore[attr-defined]
+        for thread in threads:
+            thread.join()
+        if profiler.ENABLED:
+            profiler.dump()
+
+
+def stat(x: int) -> int | float | bool | str:
     """
     Get system status where x is:
 
     0  Memory usage (0..2048)
     1  CPU used since last flip (1.0 == 100% CPU at 30fps)
+    2  System CPU used since last flip, including flip itself
     4  Clipboard contents (after user has pressed CTRL-V)
     6  Parameter string
     7  Current framerate
+    8  Target framerate: 60 or 30, or lower while the cart thread skips draws to keep up
 
     16..19  Index of currently playing SFX on channels 0..3
     20..23  Note number (0..31) on channel 0..3
@@ -573,29 +723,41 @@ def stat(x: int) -> int | bool | str:
     30
     >>> poke(DEVKIT_PT, 1)
     0
+    >>> 0 <= stat(1) <= stat(2)
+    True
     >>> for i in range(30, 111): _ = stat(i)
     """
+    if x == 1:
+        return profiler.cpu(get_fps())
+    if x == 2:
+        return profiler.cpu(get_fps(), True)
     if x == 6 and "-p" in sys.argv:
         return " ".join(sys.argv[sys.argv.index("-p") :])  # Unable to verify.
+    if (
+        x in (7, 8)
+        and not command_mode
+        and isinstance(cart, CartThread)
+        and cart.is_alive()
+    ):
+        if x == 8:
+            return get_fps() // cart.updates_per_draw
+        if cart.draw_fps:
+            return round(cart.draw_fps)
     if x == 7:
         return get_fps() if command_mode else int(get_frame_count() / time())
     if x == 8:
         return get_fps()
 
-    if x in range(16, 20):
-        x += 4
-    if x in range(20, 24):
-        note = (audio_channel_notes[x - 20] + 1) % 32
-        audio_channel_notes[x - 20] = note
-
-        sfx(peek(12800 + note * 2))  # TODO: loop in different thread.
-        return note
+    if x in range(16, 27):
+        return audio_stat(x)
 
     if x == 30:
         return btn() > 0
     if x == 31:
         return str(btn())
     if peek(DEVKIT_PT) == 1:
+        if video.offscreen and x in (32, 33, 34):  # No mouse without a window.
+            return 0
         if x == 32:
             return pygame.mouse.get_pos()[0]
         if x == 33:
@@ -646,15 +808,22 @@ def stop(message: str | None = None) -> None:
     global stopped
     if message:
         builtins.print(message)
-    cart.running = False  # type: ignore
-    pygame.time.wait(100)
+    if cart:
+        cart.running = False
+        pygame.time.wait(100)
     reset()
     stopped = True
 
 
 def t() -> float:
-    """Return seconds since cart start."""
-    return py_time.time() - begin
+    """Return seconds since cart start, or when headless, frames shown at the cart's frame rate."""
+    if video.offscreen:
+        seconds = get_frame_count() / get_fps()
+    else:
+        seconds = py_time.time() - begin
+    if fix16.ENABLED:
+        return fix16.Fix16(seconds)  # type: ignore  # Acts as a float.
+    return round4(seconds) if video.offscreen else seconds
 
 
 def tick_up(delta: int = 1) -> None:
@@ -0,0 +1,72 @@
+"""Command line tools.
+
+python -m pypico8 render cart.py --frames 600 --out cart.gif
+python -m pypico8 wav cart.py --music 0 --out cart.wav
+"""
+
+# pylint:disable = multiple-imports
+import argparse, os, sys  # noqa: E401
+
+from pypico8.audio import export_wav
+from pypico8.render import FORMATS, guess_format, render, run_cart
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the command in argv and return the exit code: 1 if the cart stopped early."""
+    parser = argparse.ArgumentParser(prog="python -m pypico8")
+    commands = parser.add_subparsers(dest="command", required=True)
+    render_parser = commands.add_parser(
+        "render", help="run a cart without a window and save its frames"
+    )
+    render_parser.add_argument("cart", help="cart .py file")
+    render_parser.add_argument("--frames", type=int, default=1, help="frames to save")
+    render_parser.add_argument(
+        "--out", help="PNG folder, .gif or .bin file (default: next to the cart)"
+    )
+    render_parser.add_argument(
+        "--format", choices=FORMATS, help="default: guessed from --out, else png"
+    )
+    render_parser.add_argument("--seed", type=int, default=0, help="srand() seed")
+
+    wav_parser = commands.add_parser(
+        "wav", help="run a cart without a window, then save an sfx or its music as WAV"
+    )
+    wav_parser.add_argument("cart", help="cart .py file")
+    sound = wav_parser.add_mutually_exclusive_group(required=True)
+    sound.add_argument("--sfx", type=int, help="sfx number")
+    sound.add_argument("--music", type=int, help="music pattern to start from")
+    wav_parser.add_argument(
+        "--frames", type=int, default=1, help="frames to run first, to set up RAM"
+    )
+    wav_parser.add_argument(
+        "--seconds", type=float, default=60, help="length limit for loops"
+    )
+    wav_parser.add_argument("--out", help=".wav file (default: next to the cart)")
+    wav_parser.add_argument("--seed", type=int, default=0, help="srand() seed")
+    args = parser.parse_args(argv)
+
+    if args.command == "wav":
+        is_music = args.music is not None
+        n = args.music if is_music else args.sfx
+        out = args.out or os.path.splitext(args.cart)[0] + (
+            f"_music{n}.wav" if is_music else f"_sfx{n}.wav"
+        )
+        if run_cart(args.cart, args.frames, seed=args.seed) < args.frames:
+            return 1
+        samples = export_wav(out, n, is_music, args.seconds)
+        print(f"{samples} samples -> {out}")
+        return 0
+
+    fmt = args.format or (guess_format(args.out) if args.out else "png")
+    out = args.out or os.path.splitext(args.cart)[0] + {
+        "png": "_frames",
+        "gif": ".gif",
+        "raw": ".bin",
+    }.get(fmt, "")
+    saved = render(args.cart, args.frames, out, fmt, args.seed)
+    print(f"{saved} frames -> {out}")
+    return 0 if saved == args.frames else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
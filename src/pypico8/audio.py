@@ -1,22 +1,77 @@
-"""Audio functions."""
+"""Audio functions: a 4 channel synth playing the sfx and music in RAM.
 
-# pylint:disable = multiple-imports, no-member, unused-argument, wrong-import-position
-import os, threading, time  # noqa: E401
+sfx() and music() only change channel state. One mixer thread renders all 4 channels into a single
+stream, keeping one block queued on one pygame channel, so the audio CPU cost is the same however
+many sounds a cart triggers. Rendered notes are cached, so looping music is mostly adding.
+
+Sfx n is 68 bytes at 0x3200 + 68 * n: 32 notes of 16 bits (pitch 0-5, waveform 6-8, volume 9-11,
+effect 12-14, custom instrument 15), then the editor mode, speed, loop start and loop end.
+Music pattern n is 4 bytes at 0x3100 + 4 * n, the sfx per channel with bit 6 to leave it off, and
+the flags loop start, loop back and stop in bit 7 of the first 3 bytes.
+https://pico-8.fandom.com/wiki/Memory#Sound_effects
+
+>>> get_init()  # Importing doesn't open the sound device; the first sfx() or music() does.
+>>> ram = _ram(); ram[SFX_PT + 68 : SFX_PT + 72] = bytes((33 | 3 << 6, 7 << 1, 45, 6 << 1))
+>>> ram[SFX_PT + 68 + 65] = 1; ram[SFX_PT + 68 + 66] = 2  # Speed 1, 2 notes long.
+>>> _sfx(1, 0); audio_stat(16), audio_stat(20)
+(1, 0)
+>>> len(mix(TICK)), audio_stat(20), max(mix(TICK)), audio_stat(16)
+(183, 1, 6911, -1)
+>>> ram[SFX_PT + 68 : SFX_PT + 68 * 2] = bytes(68)
+"""
+
+# pylint:disable = global-statement, import-outside-toplevel, multiple-imports, no-member, too-few-public-methods, too-many-arguments, too-many-instance-attributes, wrong-import-position
+import functools, itertools, math, os, random, sys, threading, time, wave  # noqa: E401
 from array import array
-from collections.abc import MutableSequence, Sequence
+from typing import Iterable
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
 import pygame
 from pygame.mixer import Sound, get_init, pre_init
 
-pre_init(44100, -16, 1, 1024)
-pygame.init()
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+SAMPLE_RATE = 22050
+TICK = 183  # Samples per unit of sfx speed, 1/120 s.
+BLOCK = 512  # Samples mixed at a time, 23 ms.
+AMPLITUDE = 32767 // 4  # Per channel, so 4 channels at full volume don't clip.
+MUSIC_PT = 0x3100
+SFX_PT = 0x3200
+SFX_SIZE = 68
+VIBRATO_HZ = 7.5
 
-audio_channel_notes = [0, 0, 0]
 threads: list[threading.Thread] = []
+# Guards the channel and music state between the cart and the mixer thread.
+lock = threading.Lock()
+
 
+class Channel:
+    """Playback state of one of the 4 channels."""
 
-def sfx(n: int, channel: int = -1, offset: int = 0, length: int = 1) -> None:
+    def __init__(self) -> None:
+        self.sfx = -1  # Not playing.
+        self.note = 0
+        self.end = 32
+        self.released = False  # sfx(-2) lets a looping sfx play to its end.
+        self.music = False
+        self.samples = array("h")  # The note being played.
+        self.pos = 0
+        self.phase = 0  # Waveform position in 1/256 cycles.
+        self.wave = -1
+        self.prev: tuple[int, int] | None = None  # Pitch and volume to slide from.
+
+
+channels = [Channel() for _ in range(4)]
+pattern = -1  # Music not playing.
+pattern_len = 0  # Samples.
+pattern_pos = 0
+patterns_played = 0
+music_mask = 0  # Channels sfx() only uses when asked to.
+music_gain = 1.0
+fade_step = 0.0  # Gain change per sample.
+
+
+def sfx(n: int, channel: int = -1, offset: int = 0, length: int = 32) -> None:
     """
     play sfx n on channel (0..3) from note offset (0..31) for length notes
     n -1 to stop sound on that channel
@@ -30,49 +85,36 @@ def sfx(n: int, channel: int = -1, offset: int = 0, length: int = 1) -> None:
     >>> sfx(0)
     >>> sfx(-1)
     """
-    if channel == -1:
-        chan = pygame.mixer.find_channel()
-    else:
-        chan = pygame.mixer.Channel(channel)
-    note_list = sfx_list[n]
-    for note in note_list[offset : offset + length]:
-        if chan:
-            # chan.play(note)
-            # Play note for half a second.
-            reps = int(0.1 / note.get_length())
-            note.play(reps)
-            time.sleep(note.get_length() * reps)
-
-
-class Note(Sound):  # pylint: disable=too-few-public-methods
-    """A musical note. Code from https://gist.github.com/ohsqueezy/6540433"""
-
-    def __init__(self, frequency: int, volume: float = 0.1) -> None:
-        self.frequency = frequency
-        Sound.__init__(self, self.build_samples())
-        self.set_volume(volume)
-
-    def build_samples(self) -> Sequence[int]:
-        """Raw wave data."""
-        period = int(round(get_init()[0] / self.frequency))
-        samples: MutableSequence[int] = array("h", [0] * period)
-        amplitude = 2 ** (abs(get_init()[1]) - 1) - 1
-        for sample_time in range(period):
-            # square wave
-            if sample_time < period / 2:
-                samples[sample_time] = amplitude
-            else:
-                samples[sample_time] = -amplitude
-        return samples
+    _start()
+    with lock:
+        _sfx(n, channel, offset, length)
+
 
+def _sfx(n: int, channel: int = -1, offset: int = 0, length: int = 32) -> None:
+    if n in (-1, -2) or channel == -2:
+        targets = channels if channel < 0 else [channels[channel & 3]]
+        for ch in targets:
+            if channel == -2 and ch.sfx != n or channel < 0 and ch.music:
+                continue
+            if n == -2:
+                ch.released = True
+            else:
+                ch.sfx = -1
+        return
+    if channel == -1:
+        channel = _free_channel()
+        if channel < 0:
+            return
+    _start_sfx(channels[channel & 3], n & 63, offset, length)
 
-sfx_list = []
-for sfx_i in range(64):
-    sfx_notes = []
-    for note_i in range(32):
-        sfx_notes.append(Note(50 + sfx_i * 4 + note_i * 40))
 
-    sfx_list.append(sfx_notes)
+def _free_channel() -> int:
+    """Return an idle channel not reserved for music, else one playing an sfx, else -1."""
+    for busy in (False, True):
+        for i, ch in enumerate(channels):
+            if not music_mask >> i & 1 and not ch.music and (busy or ch.sfx < 0):
+                return i
+    return -1
 
 
 def music(n: int = 0, fade_len: int = 0, channel_mask: int = 0) -> None:
@@ -89,27 +131,422 @@ def music(n: int = 0, fade_len: int = 0, channel_mask: int = 0) -> None:
     >>> music(0)
     >>> music(-1)
     """
-    # global threads
+    _start()
+    with lock:
+        _music(n, fade_len, channel_mask)
+
+
+def _music(n: int = 0, fade_len: int = 0, channel_mask: int = 0) -> None:
+    """
+    >>> ram = _ram(); ram[MUSIC_PT : MUSIC_PT + 8] = bytes((1, 64, 64, 64, 1, 64, 64 | 128, 64))
+    >>> ram[SFX_PT + 68 + 65] = 1; ram[SFX_PT + 68 + 66] = 2
+    >>> _music(0); audio_stat(24), audio_stat(16)
+    (0, 1)
+    >>> _ = mix(2 * TICK); audio_stat(24), audio_stat(25), audio_stat(26)
+    (1, 1, 0)
+    >>> _ = mix(2 * TICK); audio_stat(24), audio_stat(16)
+    (-1, -1)
+    >>> ram[MUSIC_PT : MUSIC_PT + 8] = bytes(8); ram[SFX_PT + 68 : SFX_PT + 68 * 2] = bytes(68)
+    """
+    global fade_step, music_gain, music_mask, patterns_played
     if n == -1:
-        for thread in threads:
-            thread.stop = True  # type: ignore[attr-defined]
-            thread.join()
+        if fade_len > 0 and pattern >= 0:
+            fade_step = -1000 / (fade_len * SAMPLE_RATE)
+        else:
+            _play_pattern(-1)
         return
+    music_mask = channel_mask
+    patterns_played = 0
+    music_gain = 0.0 if fade_len > 0 else 1.0
+    fade_step = 1000 / (fade_len * SAMPLE_RATE) if fade_len > 0 else 0.0
+    _play_pattern(n)
+
+
+def _play_pattern(n: int) -> None:
+    """Start music pattern n on its channels, or with an invalid or empty pattern, stop music."""
+    global pattern, pattern_len, pattern_pos
+    for ch in channels:
+        if ch.music:
+            ch.sfx = -1
+            ch.music = False
+    pattern = -1
+    if not 0 <= n <= 63:
+        return
+    ram = _ram()
+    ids = ram[MUSIC_PT + 4 * n : MUSIC_PT + 4 * n + 4]
+    enabled = [(i, b & 63) for i, b in enumerate(ids) if not b & 64]
+    if not enabled:
+        return
+    for i, s in enabled:
+        _start_sfx(channels[i], s, for_music=True)
+    # The leftmost channel that doesn't loop sets the pattern length, else the leftmost channel.
+    lengths = [_sfx_length(s) for _, s in enabled]
+    pattern_len = next((size for size, loops in lengths if not loops), lengths[0][0])
+    pattern = n
+    pattern_pos = 0
+
+
+def _next_pattern() -> None:
+    global patterns_played
+    patterns_played += 1
+    ram = _ram()
+    flags = ram[MUSIC_PT + 4 * pattern : MUSIC_PT + 4 * pattern + 3]
+    if flags[2] & 128:  # Stop.
+        _play_pattern(-1)
+    elif flags[1] & 128:  # Loop back to the last loop start.
+        start = pattern
+        while start > 0 and not ram[MUSIC_PT + 4 * start] & 128:
+            start -= 1
+        _play_pattern(start)
+    else:
+        _play_pattern(pattern + 1)
+
+
+def _sfx_length(n: int) -> tuple[int, bool]:
+    """Return the samples sfx n plays without looping, and whether it loops."""
+    ram = _ram()
+    base = SFX_PT + SFX_SIZE * n
+    loop_start, loop_end = ram[base + 66], ram[base + 67]
+    notes = loop_start if loop_end == 0 and loop_start > 0 else 32
+    return notes * max(ram[base + 65], 1) * TICK, loop_end > loop_start
+
+
+def _start_sfx(
+    ch: Channel, n: int, offset: int = 0, length: int = 32, for_music: bool = False
+) -> None:
+    ram = _ram()
+    base = SFX_PT + SFX_SIZE * n
+    loop_start, loop_end = ram[base + 66], ram[base + 67]
+    end = loop_start if loop_end == 0 and loop_start > 0 else 32
+    ch.sfx = n
+    ch.note = offset
+    ch.end = min(end, offset + length)
+    ch.released = False
+    ch.music = for_music
+    ch.prev = None
+    if ch.note >= ch.end:
+        ch.sfx = -1
+    else:
+        _load_note(ch)
+
+
+def _next_note(ch: Channel) -> None:
+    ram = _ram()
+    base = SFX_PT + SFX_SIZE * ch.sfx
+    loop_start, loop_end = ram[base + 66], ram[base + 67]
+    ch.note += 1
+    if loop_end > loop_start and not ch.released and ch.note >= loop_end:
+        ch.note = loop_start
+    if ch.note >= ch.end:
+        ch.sfx = -1
+    else:
+        _load_note(ch)
+
+
+def _load_note(ch: Channel) -> None:
+    """Render the note ch is at.
+    A custom instrument plays as the waveform of the first note of its sfx."""
+    ram = _ram()
+    base = SFX_PT + SFX_SIZE * ch.sfx
+    value = ram[base + ch.note * 2] | ram[base + ch.note * 2 + 1] << 8
+    pitch = value & 63
+    waveform = value >> 6 & 7
+    volume = value >> 9 & 7
+    effect = value >> 12 & 7
+    if value & 0x8000:
+        instrument = SFX_PT + SFX_SIZE * waveform
+        waveform = (ram[instrument] | ram[instrument + 1] << 8) >> 6 & 7
+    arp: tuple[int, ...] = ()
+    if effect >= 6:
+        group = base + (ch.note & ~3) * 2
+        arp = tuple(ram[group + i] & 63 for i in range(0, 8, 2))
+    length = max(ram[base + 65], 1) * TICK
+    prev = ch.prev if effect == 1 else None
+    # Only a held note keeps its phase, so notes repeat exactly and come from the cache.
+    phase = ch.phase if ch.prev and ch.prev[0] == pitch and ch.wave == waveform else 0
+    ch.samples, ch.phase = _note_samples(
+        waveform, pitch, volume, effect, length, prev, arp, phase
+    )
+    ch.prev = pitch, volume
+    ch.wave = waveform
+    ch.pos = 0
+
+
+def mix(n: int) -> array:  # type: ignore[type-arg]
+    """Return the next n samples of all channels mixed, advancing sfx and music."""
+    global fade_step, music_gain, pattern_pos
+    mixed = array("h")
+    while len(mixed) < n:
+        size = n - len(mixed)
+        if pattern >= 0:
+            size = min(size, pattern_len - pattern_pos)
+        parts = []
+        for ch in channels:
+            if ch.sfx >= 0:
+                fade = ch.music and music_gain < 1
+                part = _channel_samples(ch, size)
+                if fade:
+                    part = array("h", [int(s * music_gain) for s in part])
+                parts.append(part)
+        if not parts:
+            mixed.frombytes(bytes(2 * size))
+        elif len(parts) == 1:
+            mixed.extend(parts[0])
+        else:
+            mixed.extend(map(sum, zip(*parts)))
+        if fade_step:
+            music_gain = min(max(music_gain + fade_step * size, 0.0), 1.0)
+            if music_gain in (0.0, 1.0):
+                if music_gain == 0.0:
+                    _play_pattern(-1)
+                fade_step = 0.0
+        if pattern >= 0:
+            pattern_pos += size
+            if pattern_pos >= pattern_len:
+                _next_pattern()
+    return mixed
 
-    def music_worker() -> None:
-        thread = threading.current_thread()
-        thread.do_work = threading.Event()  # type: ignore[attr-defined]  # set() and clear() to run and pause.
-        thread.do_work.set()  # type: ignore[attr-defined]
-        pattern = sfx_list[n]
-        while True:
-            for note in pattern:
-                reps = int(0.1 / note.get_length())
-                note.play(reps)
-                time.sleep(note.get_length() * reps)
-                if getattr(thread, "stop", False):
-                    return
-                thread.do_work.wait()  # type: ignore[attr-defined]
-
-    thread = threading.Thread(target=music_worker)
+
+def _channel_samples(ch: Channel, size: int) -> array:  # type: ignore[type-arg]
+    out = array("h")
+    while len(out) < size and ch.sfx >= 0:
+        part = ch.samples[ch.pos : ch.pos + size - len(out)]
+        out.extend(part)
+        ch.pos += len(part)
+        if ch.pos >= len(ch.samples):
+            _next_note(ch)
+    if len(out) < size:
+        out.frombytes(bytes(2 * (size - len(out))))
+    return out
+
+
+@functools.lru_cache(maxsize=1024)
+def _note_samples(
+    waveform: int,
+    pitch: int,
+    volume: int,
+    effect: int,
+    length: int,
+    prev: tuple[int, int] | None,
+    arp: tuple[int, ...],
+    phase: int,
+) -> tuple[array, int]:  # type: ignore[type-arg]
+    """Render one note of length samples starting at phase, and return them with the phase after.
+
+    >>> samples, phase = _note_samples(3, 33, 7, 0, 4, None, (), 0)  # 440 Hz square wave.
+    >>> list(samples), phase
+    ([8191, 8191, 8191, 8191], 20)
+    """
+    if volume == 0 and effect != 1:
+        return array("h", bytes(2 * length)), phase
+    step = _pitch_step(pitch)
+    amp = AMPLITUDE * volume / 7
+    steps: Iterable[float] = itertools.repeat(step, length)
+    amps: Iterable[float] | None = None  # Constant.
+    if effect == 1 and prev:  # Slide from the previous note.
+        start, end = _pitch_step(prev[0]), AMPLITUDE * prev[1] / 7
+        steps = (start + (step - start) * i / length for i in range(length))
+        amps = (end + (amp - end) * i / length for i in range(length))
+    elif effect == 2:  # Vibrato, half a semitone.
+        k = 2 * math.pi * VIBRATO_HZ / SAMPLE_RATE
+        steps = (step * 2 ** (math.sin(i * k) / 24) for i in range(length))
+    elif effect == 3:  # Drop.
+        steps = (step * (1 - i / length) for i in range(length))
+    elif effect == 4:  # Fade in.
+        amps = (amp * i / length for i in range(length))
+    elif effect == 5:  # Fade out.
+        amps = (amp * (1 - i / length) for i in range(length))
+    elif effect >= 6:  # Arpeggio over the group of 4 notes, fast or slow.
+        rate = TICK * (4 if effect == 6 else 8)
+        arp_steps = [_pitch_step(p) for p in arp]
+        steps = (arp_steps[i // rate % 4] for i in range(length))
+    positions = list(itertools.accumulate(steps, initial=phase))
+    end = int(positions.pop()) & 255
+    table = _wave(waveform)
+    if waveform == 7:  # Phaser: 2 slightly detuned triangles.
+        values = [
+            (table[int(p) & 255] + table[int(p * 1.0078) & 255]) / 2 for p in positions
+        ]
+        amps = amps or itertools.repeat(amp, length)
+        return array("h", [int(v * a) for v, a in zip(values, amps)]), end
+    if amps is None:
+        table = tuple(int(v * amp) for v in table)
+    if waveform == 6:  # Noise changes 16 times per cycle.
+        values = [table[int(p) >> 4 & 4095] for p in positions]
+    else:
+        values = [table[int(p) & 255] for p in positions]
+    if amps is None:
+        return array("h", values), end
+    return array("h", [int(v * a) for v, a in zip(values, amps)]), end
+
+
+def _pitch_step(pitch: int) -> float:
+    """Return the waveform steps per sample of pitch, where 33 is A 440 Hz."""
+    return 440 * 2 ** ((pitch - 33) / 12) * 256 / SAMPLE_RATE
+
+
+@functools.lru_cache(maxsize=None)
+def _wave(n: int) -> tuple[float, ...]:
+    """Return one cycle of waveform n in 256 steps from -1 to 1, or 4096 steps of noise.
+
+    >>> [round(_wave(n)[64], 2) for n in range(8)]
+    [0.0, -0.43, -0.5, 1.0, 1.0, 0.5, -0.33, 0.0]
+    """
+    if n == 6:
+        rng = random.Random(6)  # Same noise every run.
+        return tuple(rng.uniform(-1, 1) for _ in range(4096))
+    xs = [i / 256 for i in range(256)]
+    if n == 1:  # Tilted saw.
+        return tuple(
+            2 * x / 0.875 - 1 if x < 0.875 else 1 - 16 * (x - 0.875) for x in xs
+        )
+    if n == 2:  # Saw.
+        return tuple(2 * x - 1 for x in xs)
+    if n == 3:  # Square.
+        return tuple(1.0 if x < 0.5 else -1.0 for x in xs)
+    if n == 4:  # Pulse.
+        return tuple(1.0 if x < 0.3125 else -1.0 for x in xs)
+    if n == 5:  # Organ: a triangle with its octave.
+        return tuple((_triangle(x) + _triangle(2 * x % 1)) / 2 for x in xs)
+    return tuple(_triangle(x) for x in xs)  # Triangle, and phaser.
+
+
+def _triangle(x: float) -> float:
+    return 1 - 4 * abs(x - 0.5)
+
+
+STATE = (
+    "channels",
+    "pattern",
+    "pattern_len",
+    "pattern_pos",
+    "patterns_played",
+    "music_mask",
+    "music_gain",
+    "fade_step",
+)
+
+
+def export_wav(
+    path: str, n: int, is_music: bool = False, max_seconds: float = 60
+) -> int:
+    """Write sfx n, or with is_music, the music from pattern n, to a 16 bit mono WAV file at
+    SAMPLE_RATE until it ends or loops for max_seconds. Return the samples written.
+    Rendering runs as fast as the CPU allows, without touching the sound device or what is playing,
+    and the same sfx and music RAM always gives the same bytes.
+
+    >>> ram = _ram(); ram[SFX_PT + 68 : SFX_PT + 72] = bytes((33 | 2 << 6, 1 | 7 << 1 | 5 << 4, 21, 2))
+    >>> ram[SFX_PT + 68 + 65] = 8; ram[SFX_PT + 68 + 66] = 2  # Noise fading out, then a triangle.
+    >>> import hashlib, tempfile; path = os.path.join(tempfile.mkdtemp(), "sfx1.wav")
+    >>> export_wav(path, 1), hashlib.sha256(open(path, "rb").read()).hexdigest()[:16]
+    (2928, '70be489f92fce6d8')
+    >>> ram[SFX_PT + 68 : SFX_PT + 68 * 2] = bytes(68)
+    """
+    with lock:
+        saved = {name: globals()[name] for name in STATE}
+        globals().update(
+            channels=[Channel() for _ in range(4)],
+            pattern=-1,
+            patterns_played=0,
+            music_gain=1.0,
+            fade_step=0.0,
+        )
+        written = 0
+        try:
+            if is_music:
+                _music(n)
+            else:
+                _sfx(n, 0)
+            with wave.open(path, "wb") as fp:
+                fp.setnchannels(1)
+                fp.setsampwidth(2)
+                fp.setframerate(SAMPLE_RATE)
+                # Notes last whole ticks, so mixing a tick at a time ends with the sound.
+                while _busy() and written < max_seconds * SAMPLE_RATE:
+                    block = mix(TICK)
+                    if sys.byteorder == "big":
+                        block.byteswap()
+                    fp.writeframes(block)
+                    written += TICK
+        finally:
+            globals().update(saved)
+    return written
+
+
+def audio_stat(x: int) -> int:
+    """Return stat(x) for x in 16..26: sfx and note per channel (-1 if none), music pattern
+    (-1 if none), patterns played and ticks played on the current pattern."""
+    with lock:
+        if 16 <= x <= 19:
+            return channels[x - 16].sfx
+        if 20 <= x <= 23:
+            ch = channels[x - 20]
+            return ch.note if ch.sfx >= 0 else -1
+        if x == 24:
+            return pattern
+        if x == 25:
+            return patterns_played
+        return pattern_pos // TICK if pattern >= 0 else 0
+
+
+def _busy() -> bool:
+    return pattern >= 0 or any(ch.sfx >= 0 for ch in channels)
+
+
+def _ram() -> bytearray:
+    from pypico8.video import mem  # video imports this module.
+
+    return mem
+
+
+def _init_audio() -> None:
+    """Open the sound device as 16 bit mono at SAMPLE_RATE, or SDL's silent driver without one.
+
+    >>> _init_audio(); get_init()
+    (22050, -16, 1)
+    """
+    if get_init() == (SAMPLE_RATE, -16, 1):
+        return
+    pygame.mixer.quit()  # Opened by someone else in another format.
+    pre_init(SAMPLE_RATE, -16, 1, BLOCK, allowedchanges=0)
+    try:
+        pygame.mixer.init()
+    except pygame.error:  # No sound card, e.g. on a build server.
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        pygame.mixer.init()
+
+
+def _start() -> None:
+    """Start the mixer thread unless it runs, opening the sound device on first use.
+    run() stops the thread on exit."""
+    threads[:] = [thread for thread in threads if thread.is_alive()]
+    if threads:
+        return
+    _init_audio()
+    thread = threading.Thread(target=_mixer_worker, daemon=True)
+    thread.do_work = threading.Event()  # type: ignore[attr-defined]  # set() and clear() to run and pause.
+    thread.do_work.set()  # type: ignore[attr-defined]
     threads.append(thread)
     thread.start()
+
+
+def _mixer_worker() -> None:
+    """Keep one mixed block queued behind the one playing."""
+    thread = threading.current_thread()
+    channel = pygame.mixer.Channel(0)
+    stereo = get_init()[2] == 2
+    while not getattr(thread, "stop", False):
+        if not thread.do_work.wait(0.1) or channel.get_queue() or not _busy():  # type: ignore[attr-defined]
+            time.sleep(BLOCK / SAMPLE_RATE / 2)
+            continue
+        with lock:
+            samples = mix(BLOCK)
+        if stereo:
+            both = array("h", bytes(4 * BLOCK))
+            both[0::2] = both[1::2] = samples
+            samples = both
+        sound = Sound(buffer=samples)
+        if channel.get_busy():
+            channel.queue(sound)
+        else:
+            channel.play(sound)
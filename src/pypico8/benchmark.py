@@ -0,0 +1,1098 @@
+"""Benchmarks comparing optimized paths against the implementations they replaced.
+
+Usage: python benchmark.py
+
+>>> _init_video()
+"""
+
+# pylint:disable = consider-using-f-string, multiple-imports, no-member, too-many-lines, unused-import, wrong-import-position
+import builtins, functools, math, os, random, subprocess, sys, time, timeit, tracemalloc, types  # noqa: E401
+from typing import Any, Callable, Iterable, Iterator
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
+import pygame
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import pypico8
+from pypico8 import audio, maths, table, video
+from pypico8.fix16 import Fix16
+from pypico8.video import (
+    DRAW_PALETTE_PT,
+    SCREEN_DATA_PT,
+    SCREEN_PALETTE_PT,
+    _init_video,
+    _pset,
+    circ,
+    color,
+    fillp,
+    flip,
+    line,
+    mem,
+    memcpy,
+    memset,
+    oval,
+    peek,
+    poke,
+    pos,
+    rect,
+    rectfill,
+    rgb,
+    map_sprites,
+    mset,
+    sget,
+    spr,
+    sspr,
+)
+
+
+def set_at_frame() -> pygame.Surface:
+    """Convert screen RAM to a surface one set_at() call per pixel, like flip() used to.
+
+    >>> for i in range(0x2000): mem[SCREEN_DATA_PT + i] = (i * 7) % 256
+    >>> flip()
+    >>> reference = set_at_frame()
+    >>> pygame.image.tobytes(video.surf, "RGBA") == pygame.image.tobytes(reference, "RGBA")
+    True
+    >>> video.cls()
+    """
+    frame = pygame.Surface(video.SCREEN_SIZE, pygame.SRCALPHA)
+    x = 0
+    y = 0
+    for addr in range(SCREEN_DATA_PT, 0x8000):
+        pixels = mem[addr]
+        col1 = pixels & 0b1111
+        col2 = (pixels >> 4) & 0b1111
+        if addr > SCREEN_DATA_PT and addr % 64 == 0:
+            y += 1
+        frame.set_at((x, y), rgb(mem[SCREEN_PALETTE_PT + col1]))
+        frame.set_at((x + 1, y), rgb(mem[SCREEN_PALETTE_PT + col2]))
+        x = (x + 2) % 128
+    return frame
+
+
+# Timings vary on busy machines, so doctests only catch big regressions unless this is set.
+PERF = bool(os.environ.get("PYPICO8_PERF"))
+
+
+def faster(new: float, old: float, factor: float = 1) -> bool:
+    """Return whether rate new is at least factor times rate old with PYPICO8_PERF set, or else
+    whether new is at most 1.5 times slower. Compare times as rates: faster(1 / t1, 1 / t0).
+
+    >>> faster(3, 1, 2), faster(1, 1.4, 2) != PERF
+    (True, True)
+    """
+    return new >= old * (factor if PERF else min(factor, 1) / 1.5)
+
+
+def fps(fun: Callable[[], object], frames: int = 30) -> float:
+    """Return how many times per second fun can be called, in the best of 3 runs of frames calls,
+    so a busy moment on the machine doesn't count."""
+    return frames / min(timeit.repeat(fun, number=frames, repeat=3))
+
+
+def bench_flip(frames: int = 30) -> tuple[float, float]:
+    """Return frames per second of the set_at() conversion and of flip().
+
+    >>> before, after = bench_flip(3)
+    >>> faster(after, before)
+    True
+    """
+    return fps(set_at_frame, frames), fps(flip, frames)
+
+
+frame_surf = pygame.Surface(video.SCREEN_SIZE, pygame.SRCALPHA)
+
+
+def rgba_frame() -> None:
+    """Convert screen RAM to 32-bit frame_surf through the screen palette, like flip() used to.
+
+    >>> for i in range(0x2000): mem[SCREEN_DATA_PT + i] = (i * 7) % 256
+    >>> video.pal(3, 130, 1); flip(); rgba_frame()
+    3
+    >>> pygame.image.tobytes(video.surf, "RGB") == pygame.image.tobytes(frame_surf, "RGB")
+    True
+    >>> video.pal(); video.cls()
+    0
+    """
+    pixels = video.screen_pixels()
+    colors = [rgb(mem[SCREEN_PALETTE_PT + col]) + (255,) for col in range(16)]
+    luts = [bytes(channel) + bytes(256 - 16) for channel in zip(*colors)]
+    rgba = bytearray(len(pixels) * 4)
+    for shift, lut in zip(frame_surf.get_shifts(), luts):
+        byte = shift // 8 if sys.byteorder == "little" else 3 - shift // 8
+        rgba[byte::4] = pixels.translate(lut)
+    frame_surf.get_buffer().write(bytes(rgba))
+
+
+def fade(present: Callable[[], None]) -> None:
+    """Step the screen palette through a fade of color 7, then present the frame."""
+    video.pal(7, (video.peek(SCREEN_PALETTE_PT + 7) + 1) % 16, 1)
+    present()
+
+
+def bench_fade(frames: int = 30) -> tuple[float, float]:
+    """Return headless frames per second of a screen palette fade over a full screen, converted to
+    32-bit per frame, and with flip().
+
+    >>> before, after = bench_fade(3)
+    >>> faster(after, before, 2)
+    True
+    """
+    _init_video(headless=True)
+    for i in range(0x2000):
+        mem[SCREEN_DATA_PT + i] = (i * 7) % 256
+
+    def present() -> None:
+        rgba_frame()
+        video.screen.blit(frame_surf, (0, 0))
+
+    rv = fps(lambda: fade(present), frames), fps(lambda: fade(flip), frames)
+    _init_video()
+    return rv
+
+
+def transform_surface(video_mode: int) -> pygame.Surface:
+    """Show the screen in video_mode through pygame.transform calls, like flip() used to.
+
+    >>> random.seed(1); video.screen_ram[:] = random.randbytes(0x2000)
+    >>> def shown(mode): mem[video.VIDEO_MODE_PT] = mode; flip(); return video.screen
+    >>> def rgb_bytes(surface): return pygame.image.tobytes(surface, "RGB")
+    >>> [m for m in range(256) if rgb_bytes(shown(m)) != rgb_bytes(transform_surface(m))]
+    []
+    >>> mem[video.VIDEO_MODE_PT] = 0; video.cls()
+    """
+    source = pygame.Surface(video.SCREEN_SIZE, 0, 8)
+    source.set_palette(video.surf.get_palette())
+    source.get_buffer().write(video.screen_pixels())
+    shown = pygame.Surface(video.SCREEN_SIZE)
+    if video_mode == 1:
+        # horizontal stretch, 64x128 screen, left half of normal screen
+        topleft = source.subsurface(0, 0, 64, 128)
+        shown.blit(pygame.transform.scale(topleft, (128, 128)), (0, 0))
+    elif video_mode == 2:
+        # vertical stretch, 128x64 screen, top half of normal screen
+        topleft = source.subsurface((0, 0, 128, 64))
+        shown.blit(pygame.transform.scale(topleft, (128, 128)), (0, 0))
+    elif video_mode == 3:
+        # both stretch, 64x64 screen, top left quarter of normal screen
+        topleft = source.subsurface((0, 0, 64, 64))
+        shown.blit(pygame.transform.scale(topleft, (128, 128)), (0, 0))
+    elif video_mode == 5:
+        # horizontal mirroring, left half copied and flipped to right half
+        topleft = source.subsurface((0, 0, 64, 128))
+        shown.blit(topleft, (0, 0))
+        shown.blit(pygame.transform.flip(topleft, 1, 0), (64, 0))
+    elif video_mode == 6:
+        # vertical mirroring, top half copied and flipped to bottom half
+        topleft = source.subsurface((0, 0, 128, 64))
+        shown.blit(topleft, (0, 0))
+        shown.blit(pygame.transform.flip(topleft, 0, 1), (0, 64))
+    elif video_mode == 7:
+        # both mirroring, top left quarter copied and flipped to other quarters
+        topleft = source.subsurface((0, 0, 64, 64))
+        shown.blit(pygame.transform.flip(topleft, 0, 0), (0, 0))
+        shown.blit(pygame.transform.flip(topleft, 1, 0), (64, 0))
+        shown.blit(pygame.transform.flip(topleft, 0, 1), (0, 64))
+        shown.blit(pygame.transform.flip(topleft, 1, 1), (64, 64))
+    elif video_mode == 129:
+        # horizontal flip
+        shown.blit(pygame.transform.flip(source, 1, 0), (0, 0))
+    elif video_mode == 130:
+        # vertical flip
+        shown.blit(pygame.transform.flip(source, 0, 1), (0, 0))
+    elif video_mode == 131:
+        # both flip
+        shown.blit(pygame.transform.flip(source, 1, 1), (0, 0))
+    elif video_mode == 133:
+        # clockwise 90 degree rotation
+        shown.blit(pygame.transform.rotate(source, -90), (0, 0))
+    elif video_mode == 134:
+        # 180 degree rotation (effectively equivalent to 131)
+        shown.blit(pygame.transform.rotate(source, 180), (0, 0))
+    elif video_mode == 135:
+        # counterclockwise 90 degree rotation
+        shown.blit(pygame.transform.rotate(source, 90), (0, 0))
+    else:
+        shown.blit(source, (0, 0))
+    return shown
+
+
+def bench_video_mode(video_mode: int = 7, frames: int = 30) -> tuple[float, float]:
+    """Return headless frames per second in video_mode through pygame.transform and with flip(),
+    changing 2 pixels per frame.
+
+    >>> before, after = bench_video_mode(7, 10)
+    >>> faster(after, before)
+    True
+    """
+    _init_video(headless=True)
+    mem[video.VIDEO_MODE_PT] = video_mode
+
+    def show(shown: pygame.Surface) -> None:
+        video.screen.fill(0)
+        video.screen.blit(shown, (0, 0))
+
+    flip()  # Compile the video mode first.
+
+    rv = (
+        fps(
+            lambda: swap_two_pixels(lambda: show(transform_surface(video_mode))), frames
+        ),
+        fps(lambda: swap_two_pixels(flip), frames),
+    )
+    _init_video()
+    return rv
+
+
+def lockstep(
+    update: Callable[[], None], draw: Callable[[], None], seconds: float
+) -> None:
+    """Run update, draw and flip in lockstep at up to 60 fps for seconds, like CartThread used to."""
+    clock = pygame.time.Clock()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pypico8.step(update, draw)
+        clock.tick(60)
+
+
+def bench_slow_draw(seconds: float = 2.0) -> tuple[float, float]:
+    """Return _update calls per second of a 60 fps cart whose _draw takes 25 ms, run in lockstep
+    and by CartThread, which draws at 30 fps to keep _update at 60.
+
+    >>> before, after = bench_slow_draw(0.5)
+    >>> faster(after, before, 1.5)
+    True
+    """
+    updates = [0]
+
+    def update() -> None:
+        updates[0] += 1
+
+    def draw() -> None:
+        time.sleep(0.025)
+
+    _init_video(headless=True)
+    video._set_fps(60)
+    lockstep(update, draw, seconds)
+    before = updates[0] / seconds
+    updates[0] = 0
+    cart = pypico8.CartThread(draw, update=update)
+    cart.start()
+    time.sleep(seconds)
+    cart.running = False
+    after = updates[0] / seconds
+    cart.join()
+    video._set_fps(30)
+    _init_video()
+    return before, after
+
+
+def swap_two_pixels(present: Callable[[], None]) -> None:
+    """Change 2 pixels, like bogosort.py per swap, then present the frame."""
+    c = video.pget(5, 5)
+    video.pset(5, 5, video.pget(100, 90))
+    video.pset(100, 90, c + 1)
+    present()
+
+
+def bench_partial_flip(frames: int = 30) -> tuple[float, float, float]:
+    """Return headless frames per second of a full flip(), of flip() after 2 pixels changed,
+    and of flip() with nothing changed. Windows add the same display update time to each.
+
+    >>> full, partial, unchanged = bench_partial_flip(3)
+    >>> faster(partial, full, 2), faster(unchanged, partial)
+    (True, True)
+    """
+    _init_video(headless=True)
+    flip()
+
+    def present() -> None:
+        rgba_frame()
+        video.screen.blit(frame_surf, (0, 0))
+
+    rv = (
+        fps(lambda: swap_two_pixels(present), frames),
+        fps(lambda: swap_two_pixels(flip), frames),
+        fps(flip, frames),
+    )
+    _init_video()
+    return rv
+
+
+def peek_poke_memcpy(dest_addr: int, source_addr: int, length: int) -> None:
+    """Copy one byte at a time through peek() and poke(), like memcpy() used to.
+
+    >>> for i in range(0x2000): mem[SCREEN_DATA_PT + i] = (i * 7) % 256
+    >>> peek_poke_memcpy(0x8000, SCREEN_DATA_PT, 0x2000)
+    >>> memcpy(0xA000, SCREEN_DATA_PT, 0x2000)
+    >>> mem[0x8000:0xA000] == mem[0xA000:0xC000] == mem[SCREEN_DATA_PT:0x8000]
+    True
+    >>> memset(0x8000, 0, 0x4000); video.cls()
+    """
+    vals = []
+    for i in range(length):
+        vals.append(peek(source_addr + i))
+    for i, val in enumerate(vals):
+        poke(dest_addr + i, val)
+
+
+def bench_memcpy(number: int = 10) -> tuple[float, float]:
+    """Return screen double buffer copies per second of the peek()/poke() loop and of memcpy().
+
+    >>> before, after = bench_memcpy(3)
+    >>> faster(after, before, 10)
+    True
+    """
+    return (
+        fps(lambda: peek_poke_memcpy(0x8000, SCREEN_DATA_PT, 0x2000), number),
+        fps(lambda: memcpy(0x8000, SCREEN_DATA_PT, 0x2000), number),
+    )
+
+
+def ladder_poke(addr: int, val: int = 0, *more: int) -> int:
+    """poke() checking the address ranges with side effects per byte, like it used to.
+
+    >>> ladder_poke(0x8000, 1, 2, 3); poke(0x8000, 0, 0, 0); ladder_poke(0x5F31, 1); fillp()
+    0
+    0
+    0
+    1.0
+    """
+    addr %= video.RAM_SIZE
+    for val in (val, *more):
+        val = maths.flr(val) % 256
+        if 0 <= addr <= 0x1FFF:
+            video._invalidate_sprites(addr, addr + 1)
+        elif 0x2000 <= addr <= 0x2FFF or 0x3100 <= addr <= 0x31FF:
+            pass
+        elif 0x3000 <= addr <= 0x30FF:
+            video._map_cache.clear()
+        elif 0x3200 <= addr <= 0x42FF or 0x4300 <= addr <= 0x55FF:
+            pass
+        elif video.CHAR_WIDTH_LO_PT <= addr <= 0x5DFF:
+            video._invalidate_font()
+        elif 0x5E00 <= addr <= 0x5EFF:
+            pass
+        elif DRAW_PALETTE_PT <= addr <= 0x5F7F:
+            video.draw_state_version += 1
+        mem[addr] = maths.flr(val) & 0xFF
+        addr = (addr + 1) % video.RAM_SIZE
+    return 0
+
+
+def bench_poke(number: int = 1000) -> tuple[float, float]:
+    """Return 16 byte poke() calls per second to general use RAM, checking the address ranges per
+    byte and checking the write hook pages.
+
+    >>> before, after = bench_poke(100)
+    >>> faster(after, before, 2)
+    True
+    """
+    vals = list(range(16))
+    return (
+        fps(lambda: ladder_poke(0x8000, *vals), number),
+        fps(lambda: poke(0x8000, *vals), number),
+    )
+
+
+def bench_memset(number: int = 10) -> tuple[float, float]:
+    """Return screen clears per second of a poke() loop and of memset().
+
+    >>> before, after = bench_memset(3)
+    >>> faster(after, before, 10)
+    True
+    """
+
+    def poke_loop() -> None:
+        for i in range(0x2000):
+            poke(SCREEN_DATA_PT + i, 0)
+
+    return fps(poke_loop, number), fps(
+        lambda: memset(SCREEN_DATA_PT, 0, 0x2000), number
+    )
+
+
+def pset_rect(*args: int, _border_only: bool = True) -> None:
+    """Draw a rectangle one _pset() call per pixel, like rect() used to.
+
+    >>> def compare(*args):
+    ...     for border in (True, False):
+    ...         video.cls(3)
+    ...         rect(*args, _border_only=border)
+    ...         after = bytes(mem[SCREEN_DATA_PT:0x8000])
+    ...         video.cls(3)
+    ...         pset_rect(*args, _border_only=border)
+    ...         if bytes(mem[SCREEN_DATA_PT:0x8000]) != after:
+    ...             return False
+    ...     return True
+    >>> settings = [(0x5F31, 0, 0, 0), (0x5F31, 0x5A, 0xC3, 0), (0x5F31, 0x5A, 0xC3, 1),
+    ...     (0x5F31, 0x5A, 0xC3, 2), (0x5F5E, 0x3C), (0x5F5E, 255)]
+    >>> [compare(-3, 1, 126, 70, 0x4D) and compare(5, 130, 6, 2, 7) and compare(1, 1, 2, 1, 9)
+    ...     for setting in settings if not poke(*setting)]
+    [True, True, True, True, True, True]
+    >>> fillp(); video.cls()
+    -15525.75
+    """
+    x0, y0 = pos(args[0], args[1])
+    x1, y1 = pos(args[2], args[3])
+    if x1 < x0:
+        x0, x1 = x1, x0
+    if y1 < y0:
+        y0, y1 = y1, y0
+    col = args[4] if len(args) > 4 else None
+    for y in range(y0, y1 + 1):
+        for x in range(x0, x1 + 1):
+            if not _border_only or y == y0 or y == y1 or x == x0 or x == x1:
+                _pset(x, y, col)
+
+
+def bench_rectfill(number: int = 10) -> tuple[float, float]:
+    """Return full screen patterned rectfills per second of the _pset() loop and of rectfill().
+
+    >>> fillp(0x5A5A)
+    0.0
+    >>> before, after = bench_rectfill(3)
+    >>> faster(after, before, 10)
+    True
+    >>> fillp(); video.cls()
+    23130.0
+    """
+    return (
+        fps(lambda: pset_rect(0, 0, 127, 127, 0x18, _border_only=False), number),
+        fps(lambda: rectfill(0, 0, 127, 127, 0x18), number),
+    )
+
+
+def plasma_pset() -> None:
+    """Draw a full screen color gradient the per-pixel way."""
+    plasma_pset_with(video.pset)
+
+
+def plasma_pset_with(pset: Callable[[int, int, int], object]) -> None:
+    for y in range(128):
+        for x in range(128):
+            pset(x, y, (x + y) // 16)
+
+
+def plasma_pset_many() -> None:
+    """Draw plasma_pset()'s gradient with one pset_many() call."""
+    xs = [x for _ in range(128) for x in range(128)]
+    ys = [y for y in range(128) for _ in range(128)]
+    video.pset_many(xs, ys, [(x + y) // 16 for x, y in zip(xs, ys)])
+
+
+def plasma_array() -> None:
+    """Draw plasma_pset()'s gradient as one array expression."""
+    with video.screen_array() as a:
+        y, x = maths.np.indices(a.shape)
+        a[:] = (x + y) // 16
+
+
+def bench_plasma(number: int = 3) -> tuple[float, float, float]:
+    """Return full screen per-pixel frames per second with pset(), pset_many() and screen_array().
+
+    >>> before, many, array = bench_plasma(1)
+    >>> faster(many, before), faster(array, before, 10)
+    (True, True)
+    >>> plasma_pset(); pixels = video.screen_pixels()
+    >>> plasma_array(); pixels == video.screen_pixels()
+    True
+    >>> video.cls()
+    """
+    return (
+        fps(plasma_pset, number),
+        fps(plasma_pset_many, number),
+        fps(plasma_array, number),
+    )
+
+
+def peek_pset(x: int | float, y: int | float, col: int | float) -> None:
+    """pset() reading the camera, clip rectangle, palettes and fill pattern from RAM per pixel,
+    like it used to."""
+    cam_x = video.twos_complement_to_signed(
+        peek(video.CAMERA_X_PT) | peek(video.CAMERA_X_PT + 1) << 8
+    )
+    cam_y = video.twos_complement_to_signed(
+        peek(video.CAMERA_Y_PT) | peek(video.CAMERA_Y_PT + 1) << 8
+    )
+    x, y = maths.flr(cam_x + x), maths.flr(cam_y + y)
+    color(col)
+    if x > 127 or y > 127 or x < mem[video.CLIP_X1_PT] or y < mem[video.CLIP_Y1_PT]:
+        return
+    if x >= mem[video.CLIP_X2_PT] or y >= mem[video.CLIP_Y2_PT]:
+        return
+    col = maths.flr(col)
+    on_color_trans = peek(video.FILL_PATTERN_PT + 2) & 1
+    if peek(video.FILL_PATTERN_PT + 2) & 2:
+        lo_col = mem[video.FILL_PALETTE_PT + (col & 0x0F)]
+    else:
+        lo_col = mem[DRAW_PALETTE_PT + (col & 0x0F)]
+    if video.peek2(video.FILL_PATTERN_PT) >> (15 - ((x % 4) + 4 * (y % 4))) & 1:
+        if on_color_trans:
+            return
+        col = (col & 0xF0) >> 4
+    else:
+        col = lo_col  # The bitplane masks are left out: they are off here.
+    ax, hi = divmod(x, 2)
+    addr = SCREEN_DATA_PT + y * 64 + ax
+    if hi:
+        mem[addr] = (mem[addr] & 0x0F) | ((col & 0x0F) << 4)
+    else:
+        mem[addr] = (mem[addr] & 0xF0) | (col & 0x0F)
+
+
+def bench_pset(number: int = 3) -> tuple[float, float]:
+    """Return frames per second of plasma_pset() through a fill pattern and a camera offset,
+    decoding the draw state from RAM per pixel and once.
+
+    >>> before, after = bench_pset(1)
+    >>> faster(after, before)
+    True
+    >>> fillp(0x5A5A + 0.5); video.camera(3, 2); plasma_pset(); pixels = video.screen_pixels()
+    0.0
+    0
+    >>> video.cls(); plasma_pset_with(peek_pset); pixels == video.screen_pixels()
+    True
+    >>> fillp(); video.camera(); video.cls(); color(6)
+    23130.5
+    0
+    0
+    """
+    fillp(0x5A5A + 0.5)
+    video.camera(3, 2)
+    rv = (
+        fps(lambda: plasma_pset_with(peek_pset), number),
+        fps(plasma_pset, number),
+    )
+    fillp()
+    video.camera()
+    return rv
+
+
+def _pset_cel(cel: pygame.Surface, area: pygame.Rect) -> None:
+    """Draw nontransparent area of a surface."""
+    for y in range(area.top, area.bottom):
+        for x in range(area.left, area.right):
+            if cel.get_at((x, y))[3] != 0:
+                _pset(x, y)
+
+
+def surface_circ(x: int, y: int, radius: int, col: int, border: bool = True) -> None:
+    """Draw a circle through a temporary surface and pygame.draw, like circ() used to."""
+    color(col)
+    cel = pygame.Surface(video.SCREEN_SIZE, pygame.SRCALPHA)
+    area = pygame.draw.ellipse(
+        cel,
+        (255, 255, 255, 255),
+        (pos(x - radius, y - radius), (2 * radius + 1, 2 * radius + 1)),
+        border,
+    )
+    _pset_cel(cel, area)
+
+
+def surface_line(x0: int, y0: int, x1: int, y1: int, col: int) -> None:
+    """Draw a line through a temporary surface and pygame.draw, like line() used to."""
+    color(col)
+    cel = pygame.Surface(video.SCREEN_SIZE, pygame.SRCALPHA)
+    _pset_cel(
+        cel, pygame.draw.line(cel, (255, 255, 255, 255), pos(x0, y0), pos(x1, y1))
+    )
+
+
+def surface_oval(
+    x0: int, y0: int, x1: int, y1: int, col: int, border: bool = True
+) -> None:
+    """Draw an oval through a temporary surface and pygame.draw, like oval() used to."""
+    color(col)
+    cel = pygame.Surface(video.SCREEN_SIZE, pygame.SRCALPHA)
+    area = pygame.draw.ellipse(
+        cel, (255, 255, 255, 255), (pos(x0, y0), (x1 - x0 + 1, y1 - y0 + 1)), border
+    )
+    _pset_cel(cel, area)
+
+
+def pixel_difference(old: object, new: object, *args: int) -> int:
+    """Return how many pixels differ between drawing with old(*args) and new(*args).
+
+    >>> pixel_difference(surface_line, line, 3, 100, 120, 7, 8)
+    0
+    >>> pixel_difference(surface_circ, circ, 64, 64, 30, 8, False)
+    0
+    >>> pixel_difference(surface_oval, oval, 10, 20, 100, 60, 8)
+    0
+    >>> video.cls(); color(6)
+    8
+    """
+    video.cls()
+    old(*args)  # type: ignore[operator]
+    before = bytes(video.screen_pixels())
+    video.cls()
+    new(*args)  # type: ignore[operator]
+    return sum(a != b for a, b in zip(before, video.screen_pixels()))
+
+
+def bench_primitives(number: int = 3) -> tuple[float, float]:
+    """Return frames per second of 100 lines, circles and ovals via surfaces and direct to RAM.
+
+    >>> before, after = bench_primitives(1)
+    >>> faster(after, before, 5)
+    True
+    >>> video.cls(); color(6)
+    10
+    """
+
+    def frame(draw_line: Any, draw_circ: Any, draw_oval: Any) -> None:
+        for i in range(100):
+            draw_line(i, 0, 127 - i, 127, 8)
+            draw_circ(64, 64, i % 40, 9, i % 2 == 0)
+            draw_oval(i % 64, 10, 127 - i % 64, 100, 10, i % 2 == 0)
+
+    return (
+        fps(lambda: frame(surface_line, surface_circ, surface_oval), number),
+        fps(lambda: frame(line, circ, oval), number),
+    )
+
+
+def pset_sspr(
+    sx: int, sy: int, sw: int, sh: int, dx: int, dy: int, dw: int, dh: int
+) -> None:
+    """Stretch a sprite sheet area one sget() and _pset() per pixel, like sspr() used to.
+
+    >>> for i in range(0x800): mem[i] = (i * 37) % 256
+    >>> pixel_difference(pset_sspr, sspr, 3, 5, 16, 16, 10, 20, 40, 24)
+    0
+    >>> memset(0, 0, 0x800); video.cls()
+    """
+    rw = sw / dw
+    rh = sh / dh
+    for y in range(dh):
+        for x in range(dw):
+            col = sget(sx + x * rw, sy + y * rh)
+            if not mem[DRAW_PALETTE_PT + col] & 16:
+                _pset(dx + x, dy + y, col)
+
+
+def bench_spr(number: int = 10) -> tuple[float, float]:
+    """Return frames per second of 200 8x8 sprites one pixel at a time and through spr().
+    The sprite cache is warmed up first, as it is after the first frame of a cart.
+
+    >>> before, after = bench_spr(2)
+    >>> faster(after, before, 3)
+    True
+    >>> memset(0, 0, 0x800); video.cls()
+    """
+
+    def frame(draw: Any) -> None:
+        for i in range(200):
+            draw(i, i % 120, i * 7 % 120)
+
+    def pset_spr(n: int, x: int, y: int) -> None:
+        pset_sspr(n % 16 * 8, n // 16 * 8, 8, 8, x, y, 8, 8)
+
+    poke(0, *((i * 37) % 256 for i in range(0x800)))
+    frame(spr)
+    return fps(lambda: frame(pset_spr), number), fps(lambda: frame(spr), number)
+
+
+def spr_map(
+    cell_x: int, cell_y: int, sx: int, sy: int, cell_w: int, cell_h: int
+) -> None:
+    """Draw a map area one spr() call per cell, like map() meant to.
+
+    >>> poke(0, *((i * 37) % 256 for i in range(0x800)))
+    0
+    >>> for i in range(16 * 128): map_sprites[i] = i % 7 * 9
+    >>> pixel_difference(spr_map, video.map, 0, 0, -4, 3, 17, 16)
+    0
+    >>> map_sprites[:] = [0] * len(map_sprites); memset(0, 0, 0x800); video.cls()
+    """
+    for cy in range(cell_y, cell_y + cell_h):
+        for cx in range(cell_x, cell_x + cell_w):
+            n = map_sprites[cx + cy * 128]
+            if n:
+                spr(n, sx + 8 * (cx - cell_x), sy + 8 * (cy - cell_y))
+
+
+def bench_map(number: int = 30) -> tuple[float, float, float]:
+    """Return milliseconds per 16x16 tile screen through spr() per cell, map() after an mset(),
+    and map() of an unchanged map.
+
+    >>> before, changed, unchanged = bench_map(3)
+    >>> faster(1 / changed, 1 / before), faster(1 / unchanged, 1 / changed)
+    (True, True)
+    """
+    poke(0, *((i * 37) % 256 for i in range(0x800)))
+    for i in range(16 * 128):
+        map_sprites[i] = i % 7 * 9
+    spr_map(0, 0, 0, 0, 16, 16)  # Warm up the sprite cache.
+
+    def changed() -> None:
+        mset(0, 0, 9)
+        video.map(0, 0, 0, 0, 16, 16)
+
+    times = (
+        1000 / fps(lambda: spr_map(0, 0, 0, 0, 16, 16), number),
+        1000 / fps(changed, number),
+        1000 / fps(lambda: video.map(0, 0, 0, 0, 16, 16), number),
+    )
+    map_sprites[:] = [0] * len(map_sprites)
+    memset(0, 0, 0x800)
+    video.cls()
+    return times
+
+
+def get_at_print(s: str, x: int, y: int, col: int) -> None:
+    """Print plain text one get_at() and _pset() per glyph cell pixel, like print() used to.
+
+    >>> pixel_difference(get_at_print, video.print, "Score: 1234 ♥♥♥", 3, 60, 9)
+    0
+    >>> video.cls(); color(6)
+    9
+    """
+    color(col)
+    for c in s:
+        if c in "abcdefghijklmnopqrstuvwxyz":
+            c = c.upper()
+        elif c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
+            c = c.lower()
+        o = video.ord(c)
+        character = video.characters[o].copy()
+        r = character.get_rect()
+        for hi in range(r.h):
+            for wi in range(r.w):
+                if tuple(character.get_at((wi, hi)))[:3] != (0, 0, 0):
+                    _pset(x - 1 + wi, y - 1 + hi, col, False)
+        x += 4 if o < 128 else 8
+
+
+def bench_print(number: int = 100) -> tuple[float, float, float]:
+    """Return HUD lines per second via get_at(), print() parsing each time and print() reusing it.
+
+    >>> before, parsed, cached = bench_print(10)
+    >>> faster(cached, before, 10) and faster(cached, parsed)
+    True
+    >>> video.cls(); color(6)
+    7
+    """
+    hud = "Score: 1234  Lives: 3"
+
+    def parse() -> None:
+        video._print_layouts.clear()  # pylint:disable = protected-access
+        video.print(hud, 1, 1, 7)
+
+    return (
+        fps(lambda: get_at_print(hud, 1, 1, 7), number),
+        fps(parse, number),
+        fps(lambda: video.print(hud, 1, 1, 7), number),
+    )
+
+
+def bench_audio() -> tuple[float, float]:
+    """Return ms of CPU to mix a second of 4 channels: new notes, then notes from the cache.
+
+    >>> cold, warm = bench_audio(); faster(1 / warm, 1 / cold, 2)
+    True
+    """
+    sfx_ram = mem[audio.SFX_PT : audio.SFX_PT + 4 * audio.SFX_SIZE]
+    for n in range(4):
+        base = audio.SFX_PT + n * audio.SFX_SIZE
+        for note in range(32):
+            pitch, wave, effect = (note * 7 + n * 5) % 64, (note + n) % 8, note % 8
+            mem[base + 2 * note] = pitch | (wave & 3) << 6
+            mem[base + 2 * note + 1] = wave >> 2 | 5 << 1 | effect << 4
+        mem[base + 65] = 4  # 32 notes of 33 ms: a second.
+
+    def second() -> None:
+        for n in range(4):
+            audio._sfx(n, n)  # pylint:disable = protected-access
+        audio.mix(audio.SAMPLE_RATE)
+
+    audio._note_samples.cache_clear()  # pylint:disable = protected-access
+    cold = timeit.timeit(second, number=1) * 1000
+    warm = timeit.timeit(second, number=1) * 1000
+    mem[audio.SFX_PT : audio.SFX_PT + 4 * audio.SFX_SIZE] = sfx_ram
+    audio._sfx(-1)  # pylint:disable = protected-access
+    return cold, warm
+
+
+class DictTable(dict[Any, Any]):
+    """Table as it was: a dict where every lookup scans the keys and len() probes 1, 2, 3...
+
+    >>> DictTable({1: 10, "x": 20}).x, DictTable({1: 10, 2: 20}).len()
+    (20, 2)
+    """
+
+    def __getitem__(self, index: Any) -> Any:
+        if index in dict.__iter__(self):
+            return dict.__getitem__(self, index)
+        return None
+
+    def __getattribute__(self, name: str) -> Any:
+        try:
+            return super().__getattribute__(name)
+        except AttributeError:
+            return self.__getitem__(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self[name] = value
+
+    def __iter__(self) -> Any:
+        for index in dict.__iter__(self.copy()):
+            yield dict.__getitem__(self, index)
+
+    def len(self) -> int:
+        """Count sequential keys one lookup at a time."""
+        rv = 1
+        while rv in self:
+            rv += 1
+        return rv - 1
+
+
+def dict_all(t: DictTable) -> Iterator[Any]:
+    """all() as it was."""
+    k = 0
+    while 1:
+        k += 1
+        if k not in t:
+            break
+        if t[k] is None:
+            continue
+        yield t[k]
+
+
+def dict_delv(t: DictTable, v: Any) -> Any:
+    """delv() as it was.
+
+    >>> t = DictTable({1: 10, 2: 20, 3: 30}); dict_delv(t, 20), t
+    (20, {1: 10, 2: 30})
+    """
+    rv = None
+    last_k = None
+    for k in list(t.keys()):
+        if last_k:
+            if last_k + 1 == k:
+                t[last_k] = t[k]
+                del t[k]
+                last_k = k
+            else:
+                return rv
+        elif t[k] == v:
+            rv = t[k]
+            del t[k]
+            last_k = k
+    return rv
+
+
+def dict_foreach(t: DictTable, fun: Callable[[Any], Any]) -> None:
+    """foreach() as it was."""
+    list(map(fun, t))
+
+
+def bench_foreach() -> tuple[int, int]:
+    """Return the peak bytes allocated by a foreach() over 1000 particles with the dict Table
+    and with Table, which iterates in place.
+
+    >>> before, after = bench_foreach()
+    >>> after * 10 < before
+    True
+    """
+    rv = []
+    for new, each in ((DictTable, dict_foreach), (table.Table, table.foreach)):
+        q = new()
+        for i in range(1000):
+            q[i + 1] = new(x=i, y=0, dx=1, dy=0.5)
+        tracemalloc.start()
+        each(q, id)
+        rv.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return rv[0], rv[1]
+
+
+def particles(
+    new: Callable[..., Any],
+    add: Callable[[Any, Any], Any],
+    all: Callable[[Any], Iterable[Any]],  # pylint:disable = redefined-builtin
+    delv: Callable[[Any, Any], Any],
+    frames: int = 30,
+) -> int:
+    """Run a particle system for frames: add 20 particles a frame, move them all, and delete the
+    ones leaving the screen. Return how many are left.
+
+    >>> particles(DictTable, lambda t, v: t.__setitem__(t.len() + 1, v), dict_all, dict_delv)
+    365
+    >>> particles(table.Table, table.add, table.all, table.delv)
+    365
+    """
+    q = new()
+    for _ in range(frames):
+        for i in range(20):
+            add(q, new(x=0, y=i, dx=1 + i % 4))
+        for p in all(q):
+            p.x += p.dx
+            if p.x > 40:
+                delv(q, p)
+    return len(q)
+
+
+def bench_table(frames: int = 30) -> tuple[float, float]:
+    """Return particle frames per second of the dict Table and of the hybrid Table.
+
+    >>> before, after = bench_table()
+    >>> faster(after, before, 3)
+    True
+    """
+    old_add: Callable[[Any, Any], Any] = lambda t, v: t.__setitem__(t.len() + 1, v)
+    return (
+        frames
+        / timeit.timeit(
+            lambda: particles(DictTable, old_add, dict_all, dict_delv, frames),
+            number=1,
+        ),
+        frames
+        / timeit.timeit(
+            lambda: particles(table.Table, table.add, table.all, table.delv, frames),
+            number=1,
+        ),
+    )
+
+
+def move(records: list[Any]) -> None:
+    """Move records like particles: 4 field reads and 2 writes each."""
+    for p in records:
+        p.x += p.dx
+        p.y += p.dy
+
+
+def bench_fields(number: int = 10) -> tuple[float, float, float]:
+    """Return millions of field reads and writes per second of the dict Table, of Table and of a
+    plain object, for comparison.
+
+    >>> before, after, plain = bench_fields(3)
+    >>> faster(after, before, 3), faster(after, plain, 0.5)
+    (True, True)
+    """
+    rv = []
+    for new in (DictTable, table.Table, types.SimpleNamespace):
+        records = [new(x=i, y=0, dx=1, dy=0.5) for i in range(1000)]
+        rv.append(fps(functools.partial(move, records), number) * 6 * 1000 / 1e6)
+    return rv[0], rv[1], rv[2]
+
+
+def hex_round4(n: float) -> float | int:
+    """round4() before, through a hexadecimal string of the fraction."""
+    if n < 0:
+        if n % 1 >= 0.9999:
+            if n > -1:
+                return -0.0
+            return math.ceil(n)
+    if n % 1 > 0.9999:
+        return math.ceil(n)
+    if n % 1 < 0.0001:
+        return math.floor(n)
+    return round(int(maths.hex_fraction(n), 16) / 16**4 * 10**4) / 10**4
+
+
+def bench_round4(number: int = 10000) -> tuple[float, float, float]:
+    """Return thousands of rounded numbers per second before, after, and of Fix16 arithmetic,
+    which needs no rounding.
+
+    >>> before, after, fixed = bench_round4(1000)
+    >>> faster(after, before)
+    True
+    """
+    numbers = [random.uniform(-100, 100) for _ in range(number)]
+    fixed = [Fix16(n) for n in numbers]
+    rv = []
+    for fun in (
+        lambda: [hex_round4(n * 0.3) for n in numbers],
+        lambda: [maths.round4(n * 0.3) for n in numbers],
+        lambda: [n * 0.3 for n in fixed],
+    ):
+        rv.append(number / min(timeit.repeat(fun, number=1, repeat=3)) / 1000)
+    return rv[0], rv[1], rv[2]
+
+
+def bench_trig(number: int = 100) -> tuple[float, float, float]:
+    """Return thousands of sin() calls per second for a 128 pixel scanline before, after, and
+    with sin_v() on a NumPy array. Half the scanline is PICO-8 numbers, half other floats.
+
+    >>> len(bench_trig(10))
+    3
+    """
+    xs = [x / 64 for x in range(64)] + [x * 0.0123 for x in range(64)]
+    maths.sin_v(maths.np.array(xs))  # Fill in the tables.
+    rv = []
+    for fun in (
+        lambda: [maths._sin_turns(x) for x in xs],  # pylint:disable = protected-access
+        lambda: [maths.sin(x) for x in xs],
+        lambda: maths.sin_v(maths.np.array(xs)),
+    ):
+        rv.append(number * len(xs) / timeit.timeit(fun, number=number) / 1000)
+    return rv[0], rv[1], rv[2]
+
+
+# import pypico8 took 320 ms with the sound device opened at import, 260 ms after, mostly pygame.
+IMPORT_BUDGET_MS = 400
+
+
+def bench_import(number: int = 3) -> float:
+    """Return the fastest ms to import pypico8 in a new Python, out of number tries.
+    The import must not open the sound device nor load modules only doctests use.
+
+    >>> import_ms = bench_import()
+    >>> not PERF or import_ms < IMPORT_BUDGET_MS
+    True
+    """
+    code = (
+        "import sys, time; t = time.perf_counter(); import pypico8; t = time.perf_counter() - t; "
+        "assert not pypico8.pygame.mixer.get_init() and 'unittest' not in sys.modules; print(t)"
+    )
+    times = []
+    for _ in range(number):
+        done = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            cwd=os.path.join(os.path.dirname(__file__), ".."),
+            text=True,
+        )
+        times.append(float(done.stdout.split()[-1]) * 1000)
+    return min(times)
+
+
+if __name__ == "__main__":
+    _init_video()
+    builtins.print("flip fps: %.1f before, %.1f after" % bench_flip())
+    builtins.print(
+        "flip fps: %.1f full, %.1f 2 pixels changed, %.1f unchanged"
+        % bench_partial_flip()
+    )
+    builtins.print("palette fade fps: %.1f before, %.1f after" % bench_fade())
+    builtins.print("video mode 7 fps: %.1f before, %.1f after" % bench_video_mode())
+    builtins.print("slow _draw _update/s: %.1f before, %.1f after" % bench_slow_draw())
+    builtins.print("memcpy 8 KiB/s: %.1f before, %.1f after" % bench_memcpy())
+    builtins.print("16 byte pokes/s: %.1f before, %.1f after" % bench_poke())
+    builtins.print("memset 8 KiB/s: %.1f before, %.1f after" % bench_memset())
+    builtins.print("rectfill/s: %.1f before, %.1f after" % bench_rectfill())
+    builtins.print(
+        "per-pixel fps: %.1f pset, %.1f pset_many, %.1f screen_array" % bench_plasma()
+    )
+    builtins.print("pset fill pattern fps: %.1f before, %.1f after" % bench_pset())
+    builtins.print("primitives fps: %.1f before, %.1f after" % bench_primitives())
+    builtins.print("200 sprites fps: %.1f before, %.1f after" % bench_spr())
+    builtins.print(
+        "16x16 tile map ms: %.2f per cell, %.2f changed, %.2f unchanged" % bench_map()
+    )
+    builtins.print("HUD lines/s: %.1f before, %.1f parsed, %.1f cached" % bench_print())
+    builtins.print("particle fps: %.1f before, %.1f after" % bench_table())
+    builtins.print(
+        "M field accesses/s: %.1f before, %.1f after, %.1f plain object"
+        % bench_fields()
+    )
+    builtins.print("round4 K/s: %.1f before, %.1f after, %.1f Fix16" % bench_round4())
+    builtins.print("sin K/s: %.1f before, %.1f after, %.1f sin_v" % bench_trig())
+    builtins.print("foreach peak bytes: %d before, %d after" % bench_foreach())
+    builtins.print("audio ms per second: %.1f new notes, %.1f cached" % bench_audio())
+    builtins.print(
+        "import pypico8 ms: %.1f (budget %d)" % (bench_import(), IMPORT_BUDGET_MS)
+    )
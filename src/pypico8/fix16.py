@@ -0,0 +1,465 @@
+"""PICO-8 numbers: signed 16.16 fixed point, one int32 per Fix16.
+
+Arithmetic wraps around at 32768 like in PICO-8, division by zero gives the largest number of the
+right sign, and numbers are exact multiples of 1/65536 instead of floats rounded for display.
+
+Set the PYPICO8_FIX16 environment variable to 1 before importing pypico8 to get Fix16 numbers from
+rnd(), sin(), cos(), atan2(), sqrt(), flr(), ceil(), div, divi, shl, shr, peek4(), tonum() and t().
+Arithmetic with a Fix16 gives a Fix16, so cart numbers from those stay fixed point end to end.
+
+>>> Fix16(1.5), Fix16(32767) + 1, Fix16(1) / 3, Fix16(-1) / 0
+(Fix16(1.5), Fix16(-32768), Fix16(0.3333), Fix16(-32768))
+>>> Fix16(0x7FFF) * 2, Fix16(-7) % 3, Fix16(-1.5) // 1, -Fix16(-32768)
+(Fix16(-2), Fix16(2), Fix16(-2), Fix16(-32768))
+>>> Fix16(5) & 3, Fix16(0.5) | 1, Fix16(-1) >> 1, Fix16(1) << 16, ~Fix16(0)
+(Fix16(1), Fix16(1.5), Fix16(-0.5), Fix16(0), Fix16(-0.0))
+>>> Fix16(0.1) == 0.1, Fix16(0.1) > 0.1, Fix16(0.5) == 0.5, {0.5: 1}[Fix16(0.5)], Fix16(-1.5).raw
+(False, True, True, 1, -98304)
+>>> float(Fix16(0.1)), Fix16(0.1) == Fix16(0.1000001), hash(Fix16(0.1)) == hash(float(Fix16(0.1)))
+(0.100006103515625, True, True)
+>>> Fix16(-1.5).to_bytes(), Fix16.from_bytes(b"\\x00\\x80\\xfe\\xff")
+(b'\\x00\\x80\\xfe\\xff', Fix16(-1.5))
+"""
+
+# pylint:disable = multiple-imports, redefined-builtin, wrong-import-position
+import math, os, random, sys  # noqa: E401
+from typing import Any
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from pypico8.infix import InfixDiv, InfixShift
+from pypico8.maths import round4
+
+ENABLED = os.environ.get("PYPICO8_FIX16", "") not in ("", "0")
+ONE = 0x10000
+FRACTION = 0xFFFF
+MAX_RAW = 0x7FFFFFFF
+MIN_RAW = -0x80000000
+
+
+def wrap(raw: int) -> int:
+    """Wrap raw around to a signed 32 bit int.
+    >>> wrap(0x80000000), wrap(-0x80000001)
+    (-2147483648, 2147483647)
+    """
+    return ((raw - MIN_RAW) & 0xFFFFFFFF) + MIN_RAW
+
+
+def to_raw(x: "Fix16 | float | int") -> int:
+    """Return the 16.16 bits of x: ints shifted, floats rounded to the nearest 1/65536 like PICO-8
+    reads number literals.
+    >>> to_raw(Fix16(1)), to_raw(-1), to_raw(0.1), to_raw(True)
+    (65536, -65536, 6554, 65536)
+    """
+    if type(x) is Fix16:  # pylint:disable = unidiomatic-typecheck
+        return x.raw
+    if isinstance(x, int):
+        return wrap(x << 16)
+    if isinstance(x, float):
+        return wrap(math.floor(x * ONE + 0.5))
+    if isinstance(x, Fix16):
+        return x.raw
+    raise TypeError(f"can't convert {type(x).__name__} to Fix16")
+
+
+def _coerce(x: Any) -> int | None:
+    """Return the bits of number x, or None if it isn't one."""
+    if type(x) is Fix16:  # pylint:disable = unidiomatic-typecheck
+        return x.raw
+    try:
+        return to_raw(x)
+    except TypeError:
+        return None
+
+
+def _compared(x: Any) -> "int | float | None":
+    """Return number x in 1/65536 units to compare with raw bits, or None if it isn't a number.
+    Floats aren't rounded, so a Fix16 only equals the float it converts to, which has its hash.
+    """
+    if isinstance(x, float):
+        return x * ONE
+    return _coerce(x)
+
+
+def _new(raw: int) -> "Fix16":
+    """Return a Fix16 with raw bits, which must be in range."""
+    rv = object.__new__(Fix16)
+    rv.raw = raw
+    return rv
+
+
+def _div(a: int, b: int) -> int:
+    """Divide bits a by b, rounding towards zero and saturating on overflow and division by zero."""
+    if b:
+        q = abs(a) * ONE // abs(b)
+        if (a < 0) != (b < 0):
+            q = -q
+        if MIN_RAW <= q <= MAX_RAW:
+            return q
+    return MAX_RAW if (a < 0) == (b < 0) else MIN_RAW + 1
+
+
+class Fix16:
+    """A PICO-8 number."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, value: "Fix16 | float | int | str" = 0) -> None:
+        self.raw = to_raw(float(value) if isinstance(value, str) else value)
+
+    @classmethod
+    def from_raw(cls, raw: int) -> "Fix16":
+        """Return the number with bits raw, wrapped to 32 bits."""
+        return _new(wrap(raw))
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray) -> "Fix16":
+        """Read 4 bytes in PICO-8 memory order: fraction first, little-endian."""
+        return _new(int.from_bytes(data, "little", signed=True))
+
+    def to_bytes(self) -> bytes:
+        """Return the 4 bytes poke4() writes."""
+        return self.raw.to_bytes(4, "little", signed=True)
+
+    def __add__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(wrap(self.raw + o))
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(wrap(self.raw - o))
+
+    def __rsub__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(wrap(o - self.raw))
+
+    def __mul__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(wrap(self.raw * o >> 16))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(_div(self.raw, o))
+
+    def __rtruediv__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(_div(o, self.raw))
+
+    def __floordiv__(self, other: Any) -> "Fix16":
+        """PICO-8's \\ operator: flr(a / b)."""
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(_div(self.raw, o) & ~FRACTION)
+
+    def __rfloordiv__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(_div(o, self.raw) & ~FRACTION)
+
+    def __divmod__(self, other: Any) -> tuple["Fix16", "Fix16"]:
+        return self // other, self % other
+
+    def __rdivmod__(self, other: Any) -> tuple["Fix16", "Fix16"]:
+        return other // self, other % self
+
+    def __mod__(self, other: Any) -> "Fix16":
+        """Never negative, like in PICO-8, and x % 0 is 0."""
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(self.raw % abs(o) if o else 0)
+
+    def __rmod__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(o % abs(self.raw) if self.raw else 0)
+
+    def __pow__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        try:
+            return Fix16(float(self) ** (o / ONE))
+        except (OverflowError, ZeroDivisionError):
+            return _new(MAX_RAW)
+
+    def __rpow__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(o) ** self
+
+    def __neg__(self) -> "Fix16":
+        return _new(wrap(-self.raw))
+
+    def __pos__(self) -> "Fix16":
+        return self
+
+    def __abs__(self) -> "Fix16":
+        """abs(-32768) is 32767.99999, as in PICO-8 0.2.3."""
+        return _new(min(abs(self.raw), MAX_RAW))
+
+    def __and__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(self.raw & o)
+
+    __rand__ = __and__
+
+    def __or__(self, other: Any) -> "Fix16":
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(self.raw | o)
+
+    __ror__ = __or__
+
+    def __xor__(self, other: Any) -> "Fix16":
+        """PICO-8's ^^ operator."""
+        o = _coerce(other)
+        if o is None:
+            return NotImplemented
+        return _new(self.raw ^ o)
+
+    __rxor__ = __xor__
+
+    def __invert__(self) -> "Fix16":
+        return _new(~self.raw)
+
+    def __lshift__(self, n: Any) -> "Fix16":
+        shift = int(n // 1)
+        if shift < 0:
+            return self >> -shift
+        return _new(wrap(self.raw << shift) if shift < 32 else 0)
+
+    def __rshift__(self, n: Any) -> "Fix16":
+        """Arithmetic shift: the sign bit is copied in."""
+        shift = int(n // 1)
+        if shift < 0:
+            return self << -shift
+        return _new(self.raw >> min(shift, 31))
+
+    def lshr(self, n: Any) -> "Fix16":
+        """Logical shift right: zeros come in.
+        >>> Fix16(-1).lshr(1)
+        Fix16(32767.5)
+        """
+        shift = int(n // 1)
+        if shift < 0:
+            return self << -shift
+        return _new(wrap((self.raw & 0xFFFFFFFF) >> shift) if shift < 32 else 0)
+
+    def rotl(self, n: Any) -> "Fix16":
+        """Rotate left.
+        >>> Fix16(-32768).rotl(1).raw, Fix16(1).rotl(-16).raw
+        (1, 1)
+        """
+        shift = int(n // 1) & 31
+        bits = self.raw & 0xFFFFFFFF
+        return _new(wrap(bits << shift | bits >> (32 - shift)))
+
+    def rotr(self, n: Any) -> "Fix16":
+        """Rotate right."""
+        return self.rotl(-int(n // 1))
+
+    def __eq__(self, other: object) -> bool:
+        o = _compared(other)
+        return o is not None and self.raw == o
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    def __lt__(self, other: Any) -> bool:
+        o = _compared(other)
+        if o is None:
+            return NotImplemented
+        return self.raw < o
+
+    def __le__(self, other: Any) -> bool:
+        o = _compared(other)
+        if o is None:
+            return NotImplemented
+        return self.raw <= o
+
+    def __gt__(self, other: Any) -> bool:
+        o = _compared(other)
+        if o is None:
+            return NotImplemented
+        return self.raw > o
+
+    def __ge__(self, other: Any) -> bool:
+        o = _compared(other)
+        if o is None:
+            return NotImplemented
+        return self.raw >= o
+
+    def __hash__(self) -> int:
+        return hash(self.raw / ONE)
+
+    def __bool__(self) -> bool:
+        return self.raw != 0
+
+    def __float__(self) -> float:
+        return self.raw / ONE
+
+    def __int__(self) -> int:
+        return -(-self.raw >> 16) if self.raw < 0 else self.raw >> 16
+
+    def __index__(self) -> int:
+        """Indexes and sizes are floored, like PICO-8 does."""
+        return self.raw >> 16
+
+    def __floor__(self) -> int:
+        return self.raw >> 16
+
+    def __ceil__(self) -> int:
+        return -(-self.raw >> 16)
+
+    def __trunc__(self) -> int:
+        return int(self)
+
+    def __round__(self, ndigits: int | None = None) -> Any:
+        return round(self.raw / ONE, ndigits)
+
+    def __str__(self) -> str:
+        """Show up to 4 decimals, like PICO-8's print()."""
+        return str(round4(self.raw / ONE))
+
+    def __repr__(self) -> str:
+        return f"Fix16({self})"
+
+    def __reduce__(self) -> Any:
+        return Fix16.from_raw, (self.raw,)
+
+
+def flr(x: "Fix16 | float | int | str" = 0) -> Fix16:
+    """
+    >>> flr(-1.5), flr("65.5")
+    (Fix16(-2), Fix16(65))
+    """
+    return _new(Fix16(x).raw & ~FRACTION)
+
+
+def ceil(x: "Fix16 | float | int | str" = 0) -> Fix16:
+    """
+    >>> ceil(-1.5), ceil(1.25)
+    (Fix16(-1), Fix16(2))
+    """
+    return -flr(-Fix16(x))
+
+
+def sin(x: "Fix16 | float | int") -> Fix16:
+    """Inverted sine of 0..1, with the same results as maths.sin().
+    >>> sin(0.25), sin(0.0041)
+    (Fix16(-1), Fix16(-0.0257))
+    """
+    return Fix16(math.sin((1 - float(x)) * round4(2 * math.pi)))
+
+
+def cos(x: "Fix16 | float | int") -> Fix16:
+    """Cosine of 0..1, with the same results as maths.cos().
+    >>> cos(0.5), cos(0.004)
+    (Fix16(-1), Fix16(0.9997))
+    """
+    return Fix16(math.cos(float(x) * 2 * math.pi))
+
+
+def atan2(dx: "Fix16 | float | int", dy: "Fix16 | float | int") -> Fix16:
+    """Clockwise angle of dx, dy in [0, 1), 0.25 for 0, 0.
+    >>> atan2(1, 0), atan2(0, 0), atan2(-1, 1), atan2(1, 10)
+    (Fix16(0), Fix16(0.25), Fix16(0.625), Fix16(0.7659))
+    """
+    fdx, fdy = float(dx), float(dy)
+    if fdx == 0 and fdy >= 0:
+        return _new(0x4000 if fdy == 0 else 0xC000)
+    return Fix16((math.atan2(fdy, -fdx) / math.pi + 1) / 2 % 1)
+
+
+def sqrt(x: "Fix16 | float | int") -> Fix16:
+    """Exact square root, 0 for negative numbers.
+    >>> sqrt(2), sqrt(-1), sqrt(Fix16(32767.99))
+    (Fix16(1.4142), Fix16(0), Fix16(181.0193))
+    """
+    raw = Fix16(x).raw
+    return _new(math.isqrt(raw << 16) if raw > 0 else 0)
+
+
+def rnd(x: Any = 1) -> Any:
+    """Random number from 0 up to x, any 32 bits for a negative x, or random item of a table.
+    >>> 0 <= rnd(2) < 2, isinstance(rnd(), Fix16)
+    (True, True)
+    """
+    if isinstance(x, dict):
+        return random.choice(tuple(x))
+    raw = Fix16(x).raw
+    if raw <= 0:
+        return _new(wrap(random.getrandbits(32)))
+    return _new(random.randrange(raw))
+
+
+def tonum(s: Any) -> Fix16 | None:
+    """Parse a decimal, hexadecimal or binary number exactly, or return None.
+    >>> tonum("0x0.199a").raw, tonum("0b11.1"), tonum("-65.6"), tonum("foo")
+    (6554, Fix16(3.5), Fix16(-65.6), None)
+    """
+    if s is None:
+        return _new(0)
+    if not isinstance(s, str):
+        return Fix16(s)
+    text = s.strip().lower()
+    sign = -1 if text.startswith("-") else 1
+    text = text.lstrip("-")
+    base = 16 if text.startswith("0x") else 2 if text.startswith("0b") else 10
+    if base != 10:
+        text = text[2:]
+    try:
+        if base == 10:
+            return Fix16(sign * float(text))
+        whole, _, part = text.partition(".")
+        raw = int(whole or "0", base) << 16
+        if part:
+            raw += int(part, base) * ONE // base ** len(part)
+        return _new(wrap(sign * raw))
+    except ValueError:
+        return None
+
+
+def _fix_div(a: "Fix16 | float | int", b: "Fix16 | float | int") -> Fix16:
+    return Fix16(a) / b
+
+
+def _fix_divi(a: "Fix16 | float | int", b: "Fix16 | float | int") -> Fix16:
+    return Fix16(a) // b
+
+
+def _fix_shl(x: "Fix16 | float | int", n: "Fix16 | float | int") -> Fix16:
+    return Fix16(x) << n
+
+
+def _fix_shr(x: "Fix16 | float | int", n: "Fix16 | float | int") -> Fix16:
+    return Fix16(x) >> n
+
+
+div = InfixDiv(_fix_div)
+divi = InfixDiv(_fix_divi)
+shl = InfixShift(_fix_shl)
+shr = InfixShift(_fix_shr)
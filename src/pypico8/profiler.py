@@ -0,0 +1,145 @@
+"""Frame profiler: call counts and time per API function per frame.
+
+Set the PYPICO8_PROFILE environment variable to a JSON file name (or 1 for profile.json) before
+importing pypico8 to wrap the drawing, memory and audio functions carts import. Times are
+inclusive, so spr() called from map() also counts towards map().
+
+The time spent in the cart's _update, _draw and flip is always recorded, for stat(1) and stat(2).
+Ctrl+P in run() toggles an overlay with the last frame's numbers.
+
+>>> def work(): return 42
+>>> namespace = {"work": work}
+>>> instrument(namespace, ["work"])
+>>> namespace["work"](), namespace["work"]()
+(42, 42)
+>>> record("_draw", 1 / 60); end_frame()
+>>> last_frame["work"][0], last_frame["_draw"]
+(2, [1, 0.016666666666666666])
+>>> cpu(30)
+0.5
+>>> report()["functions"]["work"]["calls"]
+2
+>>> reset()
+"""
+
+# pylint:disable = global-statement, multiple-imports
+import functools, json, os, time as py_time  # noqa: E401
+from typing import Any, Callable
+
+ENABLED = bool(os.environ.get("PYPICO8_PROFILE"))
+DUMP_PATH = (
+    "profile.json"
+    if os.environ.get("PYPICO8_PROFILE", "1") == "1"
+    else os.environ["PYPICO8_PROFILE"]
+)
+# Phases of a frame. _update and _draw are the cart's CPU; the system adds flip.
+CART_PHASES = ("_update", "_draw")
+SYSTEM_PHASES = ("_update", "_draw", "flip")
+
+# Name: [calls, seconds] for the frame in progress, the last finished frame and all frames.
+current: dict[str, list[Any]] = {}
+last_frame: dict[str, list[Any]] = {}
+totals: dict[str, list[Any]] = {}
+frames = 0
+overlay_on = False
+
+
+def instrument(namespace: dict[str, Any], names: list[str]) -> None:
+    """Replace the functions called names in namespace with timed wrappers."""
+    for name in names:
+        namespace[name] = timed(name, namespace[name])
+
+
+def timed(name: str, fun: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap fun to add its calls and time to the current frame under name."""
+
+    @functools.wraps(fun)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = py_time.perf_counter()
+        try:
+            return fun(*args, **kwargs)
+        finally:
+            record(name, py_time.perf_counter() - start)
+
+    return wrapper
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a call taking seconds to name in the current frame."""
+    stats = current.get(name)
+    if stats is None:
+        stats = current[name] = [0, 0.0]
+    stats[0] += 1
+    stats[1] += seconds
+
+
+def end_frame() -> None:
+    """Finish the current frame and add it to the totals."""
+    global frames
+    last_frame.clear()
+    last_frame.update(current)
+    current.clear()
+    frames += 1
+    for name, (calls, seconds) in last_frame.items():
+        stats = totals.setdefault(name, [0, 0.0])
+        stats[0] += calls
+        stats[1] += seconds
+
+
+def cpu(fps: int, system: bool = False) -> float:
+    """Return the part of the last frame at fps spent in the cart, or with system, also in flip.
+    1.0 is the whole frame."""
+    phases = SYSTEM_PHASES if system else CART_PHASES
+    return float(sum(last_frame[p][1] for p in phases if p in last_frame) * fps)
+
+
+def report() -> dict[str, Any]:
+    """Return the totals per function, most time first."""
+    functions = {
+        name: {
+            "calls": calls,
+            "seconds": round(seconds, 6),
+            "ms_per_frame": round(seconds * 1000 / max(frames, 1), 3),
+        }
+        for name, (calls, seconds) in sorted(
+            totals.items(), key=lambda item: item[1][1], reverse=True
+        )
+    }
+    return {"frames": frames, "functions": functions}
+
+
+def dump(path: str = DUMP_PATH) -> None:
+    """Write report() to path as JSON."""
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(report(), fp, indent=2)
+
+
+def overlay_lines(fps: int, top: int = 8) -> list[str]:
+    """Return the overlay text: CPU use, frame phases and the functions taking most time.
+
+    >>> record("flip", 0.002); record("spr", 0.004); end_frame(); overlay_lines(30)
+    ['cpu 0.00 sys 0.06', 'spr 1x 4.0ms', 'flip 1x 2.0ms']
+    >>> reset()
+    """
+    lines = [f"cpu {cpu(fps):.2f} sys {cpu(fps, True):.2f}"]
+    for name, (calls, seconds) in sorted(
+        last_frame.items(), key=lambda item: item[1][1], reverse=True
+    )[:top]:
+        lines.append(f"{name} {calls}x {seconds * 1000:.1f}ms")
+    return lines
+
+
+def toggle_overlay() -> bool:
+    """Switch the overlay on or off and return whether it is on."""
+    global overlay_on
+    overlay_on = not overlay_on
+    return overlay_on
+
+
+def reset() -> None:
+    """Forget all recorded frames."""
+    global frames
+    current.clear()
+    last_frame.clear()
+    totals.clear()
+    frames = 0
@@ -0,0 +1,236 @@
+"""Render carts without a window, as fast as the CPU allows, for CI and thumbnails.
+
+python -m pypico8 render cart.py --frames 600 --out cart.gif
+
+Frames are saved as PNG files in a folder, one animated GIF, or raw 4bpp screen memory: 8192 bytes
+per frame with the left pixel in the low nibble, before the screen palette and video mode apply.
+t() counts frames, and rnd() is seeded, so the same cart renders the same frames every time.
+
+>>> out = os.path.join(tempfile.mkdtemp(), "helix.bin")
+>>> render(os.path.join(os.path.dirname(__file__), "..", "3d_helix.py"), 3, out)
+3
+>>> os.path.getsize(out)
+24576
+"""
+
+# pylint:disable = multiple-imports, unused-import, wrong-import-position
+import io, os, runpy, sys, tempfile  # noqa: E401,F401  # io and tempfile are for doctest.
+from typing import BinaryIO, Callable
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
+import pygame
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import pypico8
+from pypico8 import video
+from pypico8.maths import srand
+
+FORMATS = ("png", "gif", "raw")
+# GIF color table: the 16 colors, then the 16 secret ones.
+GIF_COLORS = [video.PALETTE[c] for c in sorted(video.PALETTE)]
+GIF_INDEX = {bytes(rgb): i for i, rgb in enumerate(GIF_COLORS)}
+
+
+class RenderDone(Exception):
+    """Raised from flip() after enough frames."""
+
+
+class Recorder:
+    """Save each flipped frame to out in fmt."""
+
+    def __init__(self, out: str, fmt: str) -> None:
+        self.out = out
+        self.fmt = fmt
+        self.saved = 0
+        self.fp: BinaryIO | None = None
+        self.gif: GifWriter | None = None
+        if fmt == "png":
+            os.makedirs(out, exist_ok=True)
+        else:
+            self.fp = open(out, "wb")  # pylint:disable = consider-using-with
+
+    def capture(self) -> None:
+        """Save the frame just flipped to video.screen."""
+        if self.fmt == "png":
+            path = os.path.join(self.out, f"frame_{self.saved:05}.png")
+            pygame.image.save(video.screen, path)
+        elif self.fmt == "gif" and self.fp:
+            if not self.gif:  # run() only now set the cart's frame rate.
+                self.gif = GifWriter(self.fp, video.get_fps())
+            self.gif.add(screen_indices())
+        elif self.fp:
+            self.fp.write(video.screen_ram)
+        self.saved += 1
+
+    def close(self) -> None:
+        if self.gif:
+            self.gif.close()
+        if self.fp:
+            self.fp.close()
+
+
+def screen_indices() -> bytes:
+    """Return video.screen as indices into GIF_COLORS, so after the screen palette and video mode.
+
+    >>> video._init_video(headless=True); video.cls(8); video.flip(); screen_indices()[:2]
+    b'\\x08\\x08'
+    >>> video._init_video()
+    """
+    rgb = pygame.image.tobytes(video.screen, "RGB")
+    return bytes(GIF_INDEX.get(rgb[i : i + 3], 0) for i in range(0, len(rgb), 3))
+
+
+class GifWriter:
+    """Write 128x128 frames of GIF_COLORS indices as an endlessly looping GIF at fps.
+    Repeated frames are merged into one longer frame.
+
+    >>> fp = io.BytesIO(); gif = GifWriter(fp, 30)
+    >>> for col in (1, 1, 8): gif.add(bytes([col]) * 128 * 64 + bytes(range(32)) * 256)
+    >>> gif.close(); fp.getvalue()[:6], len(gif.delays)
+    (b'GIF89a', 2)
+    >>> image = pygame.image.load(io.BytesIO(fp.getvalue()))
+    >>> image.get_at((0, 0))[:3] == GIF_COLORS[1], image.get_at((31, 64))[:3] == GIF_COLORS[31]
+    (True, True)
+    """
+
+    def __init__(self, fp: BinaryIO, fps: int) -> None:
+        self.fp = fp
+        self.fps = fps
+        self.frames = 0
+        self.pending: bytes | None = None
+        self.pending_start = 0
+        self.delays: list[int] = []
+        w, h = video.SCREEN_SIZE
+        fp.write(b"GIF89a" + w.to_bytes(2, "little") + h.to_bytes(2, "little"))
+        fp.write(b"\xf4\x00\x00")  # 32 color global table, background 0, square pixels.
+        fp.write(b"".join(bytes(rgb) for rgb in GIF_COLORS))
+        fp.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")  # Loop forever.
+
+    def add(self, pixels: bytes) -> None:
+        if pixels != self.pending:
+            self._write_pending()
+            self.pending = pixels
+            self.pending_start = self.frames
+        self.frames += 1
+
+    def close(self) -> None:
+        self._write_pending()
+        self.fp.write(b"\x3b")
+
+    def _write_pending(self) -> None:
+        if self.pending is None:
+            return
+        # Centiseconds from the start, rounded per frame so the total stays in sync.
+        delay = round(self.frames * 100 / self.fps) - round(
+            self.pending_start * 100 / self.fps
+        )
+        self.delays.append(delay)
+        w, h = video.SCREEN_SIZE
+        self.fp.write(b"\x21\xf9\x04\x00" + delay.to_bytes(2, "little") + b"\x00\x00")
+        self.fp.write(
+            b"\x2c\x00\x00\x00\x00"
+            + w.to_bytes(2, "little")
+            + h.to_bytes(2, "little")
+            + b"\x00\x05"
+        )
+        data = lzw(self.pending, 5)
+        for i in range(0, len(data), 255):
+            block = data[i : i + 255]
+            self.fp.write(bytes((len(block),)) + block)
+        self.fp.write(b"\x00")
+
+
+def lzw(pixels: bytes, min_code_size: int) -> bytes:
+    """Compress pixels the GIF way: variable length codes, least significant bit first.
+
+    >>> lzw(bytes(4), 2).hex()
+    '8451'
+    """
+    clear = 1 << min_code_size
+    code_size = min_code_size + 1
+    next_code = clear + 2
+    table: dict[int, int] = {}
+    out = bytearray()
+    bits = clear  # Start with a clear code.
+    n_bits = code_size
+    prefix = pixels[0]
+    for px in pixels[1:]:
+        key = prefix << 8 | px
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        bits |= prefix << n_bits
+        n_bits += code_size
+        if next_code == 4095:  # Table full: start over rather than grow past 12 bits.
+            bits |= clear << n_bits
+            n_bits += code_size
+            table.clear()
+            code_size = min_code_size + 1
+            next_code = clear + 2
+        else:
+            if next_code == 1 << code_size:
+                code_size += 1
+            table[key] = next_code
+            next_code += 1
+        while n_bits >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            n_bits -= 8
+        prefix = px
+    bits |= prefix << n_bits
+    n_bits += code_size
+    if (
+        next_code == 1 << code_size
+    ):  # The decoder adds one more code before reading the end.
+        code_size += 1
+    bits |= (clear + 1) << n_bits  # End of information.
+    n_bits += code_size
+    out += bits.to_bytes((n_bits + 7) // 8, "little")
+    return bytes(out)
+
+
+def render(cart: str, frames: int, out: str, fmt: str = "", seed: int = 0) -> int:
+    """Run cart headless for frames flips, saving them to out in fmt, guessed from out if empty.
+    Return the number of frames saved, which is less if the cart stopped early."""
+    recorder = Recorder(out, fmt or guess_format(out))
+    try:
+        return run_cart(cart, frames, recorder.capture, seed)
+    finally:
+        recorder.close()
+
+
+def run_cart(
+    cart: str, frames: int, capture: Callable[[], None] = lambda: None, seed: int = 0
+) -> int:
+    """Run cart headless, calling capture after each of up to frames flips.
+    Return the number of flips, which is less if the cart stopped early."""
+    flips = 0
+
+    def flip_hook() -> None:
+        nonlocal flips
+        capture()
+        flips += 1
+        if flips >= frames:
+            raise RenderDone
+
+    pypico8.headless = True
+    srand(seed)
+    video.flip_hook = flip_hook
+    try:
+        runpy.run_path(cart, run_name="__main__")
+    except RenderDone:
+        pass
+    finally:
+        video.flip_hook = None
+        pypico8.headless = False
+    return flips
+
+
+def guess_format(out: str) -> str:
+    """
+    >>> guess_format("helix.gif"), guess_format("helix.bin"), guess_format("helix")
+    ('gif', 'raw', 'png')
+    """
+    ext = os.path.splitext(out)[1].lower()
+    return {".gif": "gif", ".bin": "raw", ".raw": "raw"}.get(ext, "png")
@@ -4,6 +4,7 @@
 import builtins, os, pathlib, sys  # noqa: E401
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from pypico8.fix16 import Fix16
 from pypico8.maths import flr, hex_fraction, round4
 from pypico8.table import Table
 
@@ -75,7 +76,7 @@ def pico8_to_python(s: str) -> str:
     import re  # noqa
 
     s = s.replace("local", "")
-    s = re.sub(r"#([a-zA-Z0-9]+)", r"\1.len()", s)
+    s = re.sub(r"#([a-zA-Z0-9]+)", r"Table.len(\1)", s)
     # Lua table
     s = s.replace("{[0]=", "([").replace("}", "])")  # 0-based
     s = s.replace("{", "Table([")  # 1-based
@@ -178,7 +179,7 @@ def tonum(s: str | int | float) -> int | float | None:
     >>> tonum("0.5555555555555")
     0.5555
     """
-    if type(s) in (int, float):
+    if type(s) in (int, float, Fix16):
         return s  # type: ignore
 
     if s is None:
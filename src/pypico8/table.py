@@ -1,6 +1,11 @@
 """Table object functions."""
 
-from typing import Any, Iterable
+# pylint:disable = multiple-imports, wrong-import-position
+import os, reprlib, sys  # noqa: E401
+from typing import Any, Iterable, Iterator
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from pypico8.fix16 import FRACTION, Fix16
 
 # import numba
 
@@ -43,14 +48,25 @@ class Table(dict[Any, Any]):
     10
     """
 
+    # _seq is the array part: _seq[i - 1] is t[i] for i in 1..#t. String keys are the instance's
+    # attributes, so dot access is a plain attribute lookup, and tables built with the same fields
+    # share their key layout. The dict itself holds the other keys but never #t + 1,
+    # so #t is len(_seq). _removed counts removals from the array part and _low is the lowest index
+    # removed since a loop over it last looked, so loops know where to go on.
+    # A field can hide a method, as t.update = f should, so the methods call each other through
+    # Table, and #t becomes Table.len(t). _seq, _removed and _low are reserved.
+    __slots__ = ("_seq", "_removed", "_low", "__dict__")
+
     def __init__(self, stuff: Any = None, **kwargs: Any) -> None:
+        self._seq: list[Any] = []
+        self._removed = 0
+        self._low = _NONE_REMOVED
         if stuff is not None:
             if isinstance(stuff, dict):
                 for index, item in enumerate(stuff):
-                    dict.__setitem__(self, "key" + str(index + 1), item)
+                    self["key" + str(index + 1)] = item
             else:
-                for index, item in enumerate(stuff):
-                    dict.__setitem__(self, index + 1, item)
+                self._seq.extend(stuff)
         else:
             stuff = kwargs
 
@@ -79,8 +95,10 @@ class Table(dict[Any, Any]):
         11
         12
         """
-        for index in dict.__iter__(self.copy()):
-            yield dict.__getitem__(self, index)
+        for _, v in Table._walk(self):
+            yield v
+        yield from list(self.__dict__.values())
+        yield from list(dict.values(self))
 
     def __getitem__(self, index: Any) -> Any:
         """
@@ -92,27 +110,252 @@ class Table(dict[Any, Any]):
         >>> t[:1]
         {1: 'ten'}
         >>> t[1]
+        >>> t[1.0] = "one"; t[1], t.len()
+        ('one', 1)
+        >>> t["len"] = 2; t["len"], t.len, Table.len(t)
+        (2, 2, 1)
         """
-        if isinstance(index, slice):
+        if type(index) is int:  # pylint:disable = unidiomatic-typecheck
+            if 0 < index <= len(self._seq):
+                return self._seq[index - 1]
+        elif isinstance(index, str):
+            return self.__dict__.get(index)
+        elif isinstance(index, slice):
             start = index.start or 0
             stop = index.stop or len(self)
             step = index.step or 1
-            rv = []
-            keys = list(self.keys())
-            for i in range(start, stop, step):
-                rv.append(self.get(keys[i]))
-            return Table(rv)
-
-        if index in dict.__iter__(self):
-            return dict.__getitem__(self, index)
+            values = list(Table.values(self))
+            return Table([values[i] for i in range(start, stop, step)])
+        else:
+            i = _seq_index(index)
+            if 0 < i <= len(self._seq):
+                return self._seq[i - 1]
+        try:
+            return dict.get(self, index)
+        except TypeError:  # Unhashable, so not a key.
+            return None
 
-        return None
+    def __setitem__(self, index: Any, value: Any) -> None:
+        """Keys 1..#t + 1 go to the array part, strings to the attributes, the rest to the dict.
+        >>> t = Table([10])
+        >>> t[3] = 30; t[2] = 20; t.x = 1; t._seq, vars(t), dict(dict.items(t))
+        ([10, 20, 30], {'x': 1}, {})
+
+        Fields named like methods are fields, set either way:
+        >>> t.update = print; t["update"] is print, "update" in t
+        (True, True)
+        >>> t["update"] = 5; t.update, list(Table.keys(t))
+        (5, [1, 2, 3, 'x', 'update'])
+        """
+        seq = self._seq
+        i = index
+        if type(i) is not int:  # pylint:disable = unidiomatic-typecheck
+            if isinstance(i, str):
+                self.__dict__[i] = value
+                return
+            i = _seq_index(i)
+        if 0 < i <= len(seq):
+            seq[i - 1] = value
+        elif i and i == len(seq) + 1:
+            seq.append(value)
+            if dict.__len__(self):
+                Table._extend(self)
+        else:
+            dict.__setitem__(self, index, value)
 
-    def __getattribute__(self, name: str) -> Any:
+    def __delitem__(self, index: Any) -> None:
+        """
+        >>> t = Table([10, 20, 30, 40])
+        >>> del t[4]; del t[2]; t, t.len()
+        ({1: 10, 3: 30}, 1)
+        >>> del t[2]
+        Traceback (most recent call last):
+        ...
+        KeyError: 2
+        """
+        if isinstance(index, str):
+            del self.__dict__[index]
+            return
+        seq = self._seq
+        i = _seq_index(index)
+        if 0 < i <= len(seq):
+            tail = seq[i:]
+            del seq[i - 1 :]
+            Table._removing(self, i - 1)
+            # Leave a hole: the rest moves to the dict.
+            for j, value in enumerate(tail, i + 1):
+                dict.__setitem__(self, j, value)
+        else:
+            dict.__delitem__(self, index)
+
+    def _extend(self) -> None:
+        """Move keys following the array part from the dict."""
+        seq = self._seq
+        while (value := dict.pop(self, len(seq) + 1, _MISSING)) is not _MISSING:
+            seq.append(value)
+
+    def __contains__(self, key: Any) -> bool:
+        if isinstance(key, str):
+            return key in self.__dict__
+        i = _seq_index(key)
+        if 0 < i <= len(self._seq):
+            return True
         try:
-            return super().__getattribute__(name)
-        except AttributeError:
-            return self.__getitem__(name)
+            return dict.__contains__(self, key)
+        except TypeError:
+            return False
+
+    def __len__(self) -> int:
+        return len(self._seq) + len(self.__dict__) + dict.__len__(self)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Table):
+            return (
+                self._seq == other._seq
+                and self.__dict__ == other.__dict__
+                and dict.__eq__(self, other)
+            )
+        if isinstance(other, dict):
+            return dict(Table.items(self)) == other
+        return NotImplemented
+
+    def __ne__(self, other: object) -> bool:
+        rv = self.__eq__(other)
+        return rv if rv is NotImplemented else not rv
+
+    @reprlib.recursive_repr("{...}")
+    def __repr__(self) -> str:
+        return "{" + ", ".join(f"{k!r}: {v!r}" for k, v in Table.items(self)) + "}"
+
+    def __reduce__(self) -> Any:
+        return Table, (), None, None, Table.items(self)
+
+    def __getattr__(self, name: str) -> Any:
+        """Only called for missing fields, which are nil.
+        >>> Table().x
+        """
+        if name.startswith("__") or name in Table.__slots__:
+            raise AttributeError(name)
+
+    def keys(self) -> Iterator[Any]:  # type: ignore[override]
+        """Iterate over the array part, the string keys, then the rest.
+        >>> list(Table({10: "ten"}).keys())
+        ['key1', 10]
+        """
+        yield from range(1, len(self._seq) + 1)
+        yield from list(self.__dict__)
+        yield from list(dict.keys(self))
+
+    def values(self) -> Iterator[Any]:  # type: ignore[override]
+        yield from self._seq
+        yield from list(self.__dict__.values())
+        yield from list(dict.values(self))
+
+    def items(self) -> Iterator[tuple[Any, Any]]:  # type: ignore[override]
+        yield from Table._walk(self)
+        yield from list(self.__dict__.items())
+        yield from list(dict.items(self))
+
+    def _walk(self) -> Iterator[tuple[int, Any]]:
+        """Yield the array part's items without copying it. Removing the current item is safe:
+        the one moving into its place comes next.
+        >>> t = Table([10, 20, 30])
+        >>> for i, v in t._walk():
+        ...     if v == 20: _ = deli(t, i)
+        ...     else: print(i, v)
+        1 10
+        2 30
+        >>> t = Table(["a", "a", "b", "a"])
+        >>> for i, v in t._walk(): print(i, v, deli(t, i))
+        1 a a
+        1 a a
+        1 b b
+        1 a a
+        """
+        seq = self._seq
+        removed = self._removed
+        k = 0
+        while k < len(seq):
+            v = seq[k]
+            yield k + 1, v
+            k += 1
+            if self._removed != removed:
+                k = Table._resume(self, k, removed)
+                removed = self._removed
+
+    def _removing(self, k: int) -> None:
+        """Note that the array part loses its items from _seq[k] on, or one of them."""
+        self._removed += 1
+        self._low = min(self._low, k)
+
+    def _resume(self, k: int, removed: int) -> int:
+        """Return where a loop over the array part goes on instead of at k, given the _removed it
+        last saw. Items after the lowest removed index moved down by one per removal at most:
+        removals after k don't move them, so an item may come twice but none is skipped.
+        """
+        if self._low < k:
+            k = max(self._low, k - (self._removed - removed))
+        self._low = _NONE_REMOVED
+        return k
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        """
+        >>> t = Table([10, 20]); t.pop(2), t.pop(2, None), t
+        (20, None, {1: 10})
+        """
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        rv = self[key]
+        del self[key]
+        return rv
+
+    def popitem(self) -> tuple[Any, Any]:
+        if dict.__len__(self):
+            return dict.popitem(self)
+        if self.__dict__:
+            return self.__dict__.popitem()
+        if self._seq:
+            Table._removing(self, len(self._seq) - 1)
+            return len(self._seq), self._seq.pop()
+        raise KeyError("popitem(): table is empty")
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def copy(self) -> "Table":
+        rv = Table(self._seq)
+        rv.__dict__.update(self.__dict__)
+        dict.update(rv, dict.items(self))
+        return rv
+
+    def clear(self) -> None:
+        self._seq.clear()
+        Table._removing(self, 0)
+        self.__dict__.clear()
+        dict.clear(self)
+
+    def __reversed__(self) -> Iterator[Any]:
+        yield from reversed(list(Table.keys(self)))
+
+    def __or__(self, other: Any) -> "Table":
+        rv = Table.copy(self)
+        Table.update(rv, other)
+        return rv
+
+    def __ior__(self, other: Any) -> "Table":
+        Table.update(self, other)
+        return self
 
     def len(self) -> int:
         """Only counts sequential items! Lua is awful.
@@ -126,14 +369,26 @@ class Table(dict[Any, Any]):
         >>> t[6] = 40
         >>> t.len()
         4
+        >>> t[5] = 50
+        >>> t.len()
+        6
         """
-        rv = 1
-        while rv in self:
-            rv += 1
-        return rv - 1
+        return len(self._seq)
+
 
-    def __setattr__(self, name: str, value: Any) -> None:
-        return self.__setitem__(name, value)
+_MISSING = object()
+_NONE_REMOVED = sys.maxsize
+
+
+def _seq_index(key: Any) -> int:
+    """Return key as an index into the array part if it is a whole number, else 0."""
+    if type(key) is Fix16:  # pylint:disable = unidiomatic-typecheck
+        return 0 if key.raw & FRACTION else key.raw >> 16
+    if isinstance(key, float):
+        return int(key) if key.is_integer() else 0
+    if isinstance(key, int):
+        return int(key)
+    return 0
 
 
 # @numba.jit()  # AttributeError: 'NoneType' object has no attribute '_code'
@@ -157,25 +412,20 @@ def add(t: Table, v: Any, index: int | None = None) -> Any:  # NOSONAR
     {'x': 0.0, 'y': 99.0}
     >>> foo
     {1: {'x': 0.0, 'y': 99.0}, 2: 11, 3: 22}
+    >>> add(foo, 44, 5); foo.len()
+    44
+    3
     """
-    last = t.len() + 1
+    seq = t._seq  # pylint:disable = protected-access
     if index is None:
-        index = last
-    else:
-        index = int(index // 1)
-
-    # print(f"Adding value {v} to index {index} of len {t.len()} q len {len(t)}")
-    for i in range(last, 0, -1):
-        if i == index:
-            # print(f"Setting index {index} to value {v} of len {t.len()} t {t}")
-            t[i] = v
-            # print(f"len {len(t)} or rather {t.len()} {t} now.")
-            break
-        if i > index:
-            # Move values up to make room.
-            # print(f"Shifting up to index {i} value {v}")
-            t[i] = t[i - 1]
-
+        t[len(seq) + 1] = v
+        return v
+
+    index = int(index // 1)
+    if 0 < index <= len(seq) + 1:
+        seq.insert(index - 1, v)
+        if dict.__len__(t):
+            Table._extend(t)  # pylint:disable = protected-access
     return v
 
 
@@ -196,20 +446,44 @@ def all(t: Table) -> Iterable[Any]:
     >>> t[1] = "one"
     >>> for v in all(t): print(v)
     one
+
+    Deleting the current item is safe, without copying the table first:
+    >>> t = Table([1, 2, 3, 4])
+    >>> for v in all(t):
+    ...     if v % 2: _ = delv(t, v)
+    ...     else: print(v)
+    2
+    4
+    >>> t
+    {1: 2, 2: 4}
+
+    Equal and identical items next to each other are all visited:
+    >>> t = Table([5, 5, 6, 5.0])
+    >>> for v in all(t): print(v, delv(t, v))
+    5 5
+    5 5
+    6 6
+    5.0 5.0
+    >>> t
+    {}
     """
+    seq = t._seq  # pylint:disable = protected-access
+    removed = t._removed  # pylint:disable = protected-access
     k = 0
-    while 1:
+    while k < len(seq):
+        v = seq[k]
         k += 1
-        if k not in t:
-            break
-        if t[k] is None:
-            continue
-        yield t[k]
+        if v is not None:
+            yield v
+            if t._removed != removed:  # pylint:disable = protected-access
+                k = Table._resume(t, k, removed)  # pylint:disable = protected-access
+                removed = t._removed  # pylint:disable = protected-access
 
 
 def foreach(t: Table, fun: type) -> None:
-    """Apply function fun to table t."""
-    list(map(fun, t))
+    """Apply function fun to the non-nil items in the sequence in table t, like all()."""
+    for v in all(t):
+        fun(v)
 
 
 def delv(*args: Any) -> Any | None:
@@ -257,21 +531,13 @@ def delv(*args: Any) -> Any | None:
     if len(args) < 2:
         return None
     t, v = args[:2]
-    rv = None
-    last_k = None
-    for k in list(t.keys()):
-        if last_k:
-            if last_k + 1 == k:
-                t[last_k] = t[k]
-                del t[k]
-                last_k = k
-            else:  # Only sequential keys get reindexed.
-                return rv
-        elif t[k] == v:
-            rv = t[k]
-            del t[k]
-            last_k = k
-    return rv
+    seq = t._seq  # pylint:disable = protected-access
+    for i, item in enumerate(seq):
+        if item is v or item == v:
+            del seq[i]
+            Table._removing(t, i)  # pylint:disable = protected-access
+            return item
+    return None
 
 
 def deli(t: Table, i: int | None = None) -> Any | None:
@@ -296,47 +562,34 @@ def deli(t: Table, i: int | None = None) -> Any | None:
     3
     >>> deli(Table())
     """
-    if i is None:
-        try:
-            return t.pop(list(t.keys())[-1])
-        except IndexError:
-            return None
-
-    # No pointer to reassign! Python is a toy language.
-    # keys = list(t.keys())
-    # rv = t.get(keys[i])
-
-    # keys = keys[:i] + keys[i+1:]
-    # t2 = []
-    # for k in keys:
-    #     t2.append(t.get(k))
-    # t = Table(t2)
-
-    # return rv
-
-    rv = None
-    reindex = False
-    for j, k in enumerate(list(t.keys())):
-        if j + 1 == i:
-            rv = t[k]
-            if j + 1 == len(t):
-                del t[k]
-            else:
-                # Don't delete; k reinsertion gets appended.
-                reindex = True
-        elif reindex:
-            t[j] = t[k]
-            if j + 1 == len(t):
-                del t[k]
-    return rv
+    seq = t._seq  # pylint:disable = protected-access
+    i = len(seq) if i is None else int(i // 1)
+    if 0 < i <= len(seq):
+        Table._removing(t, i - 1)  # pylint:disable = protected-access
+        return seq.pop(i - 1)
+    return None
 
 
 def pairs(d: dict[Any, Any]) -> Iterable[Any]:
-    """Return dict key-value pairs.
+    """Return dict key-value pairs. For a Table, the sequence is iterated without a copy, and
+    deleting the current item from it is safe, like in all(). Other keys are listed when the
+    sequence is done, so fields can be set and cleared in the loop.
     >>> pairs({'foo': 'bar'})
     dict_items([('foo', 'bar')])
+    >>> t = Table([10, 20, 30]); t.x = 40
+    >>> for k, v in pairs(t):
+    ...     if v == 10: _ = deli(t, k)
+    ...     else: print(k, v)
+    1 20
+    2 30
+    x 40
+    >>> for k, v in pairs(t): t[k] = None; t[str(v)] = v; t[v] = k
+    >>> len(t)
+    9
+    >>> list(pairs(Table(items="field")))
+    [('items', 'field')]
     """
-    return d.items()
+    return Table.items(d) if isinstance(d, Table) else d.items()
 
 
 def ipairs(d: dict[Any, Any]) -> list[tuple[int, Any]]:
@@ -344,7 +597,7 @@ def ipairs(d: dict[Any, Any]) -> list[tuple[int, Any]]:
     >>> ipairs({-1: 'a', 0: 'b', 1: "c", 2: "d"})
     [(1, 'c'), (2, 'd')]
     """
-    return [(k, v) for k, v in d.items() if isinstance(k, int) and k > 0]
+    return [(k, v) for k, v in pairs(d) if isinstance(k, int) and k > 0]
 
 
 def pack(*args: Any) -> Table:
@@ -2,18 +2,18 @@
 >>> _init_video()
 """
 
-# pylint:disable = function-redefined, global-statement, invalid-name, line-too-long, multiple-imports, no-member, pointless-string-statement, redefined-builtin, too-many-function-args, too-many-lines, unused-import, wrong-import-position
-import base64, builtins, decimal, io, math, os, re, sys, time as py_time  # noqa: E401
-import threading
-from typing import Any
-
-from emoji.tokenizer import tokenize
+# pylint:disable = function-redefined, global-statement, import-outside-toplevel, invalid-name, line-too-long, multiple-imports, no-member, pointless-string-statement, redefined-builtin, too-many-function-args, too-many-lines, unused-import, wrong-import-position
+import base64, builtins, io, math, os, re, sys, time as py_time  # noqa: E401
+import contextlib, functools, itertools, threading  # noqa: E401
+from typing import Any, Callable, Iterable, Iterator
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
 import pygame
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from pypico8.audio import threads
+from pypico8 import fix16, profiler
+from pypico8.fix16 import Fix16
 from pypico8.maths import ceil, flr, rnd, round4, shl, shr  # type: ignore
 from pypico8.strings import (
     PROBLEMATIC_MULTI_CHAR_CHARS,
@@ -24,6 +24,11 @@ from pypico8.strings import (
 )
 from pypico8.table import Table
 
+try:
+    import numpy as np
+except ModuleNotFoundError:  # Only screen_array() needs it.
+    np = None  # type: ignore
+
 # Pointers https://pico-8.fandom.com/wiki/Memory
 SPRITE_SHEET_PT = 0
 SPRITE_FLAGS_PT = 0x3000  # 12288
@@ -44,7 +49,7 @@ DRAW_COLOR_PT = 0x5F25  # 24357
 CURSOR_X_PT = 0x5F26  # 24358
 CURSOR_Y_PT = 0x5F27  # 24359
 CAMERA_X_PT = 0x5F28  # 24360
-CAMERA_Y_PT = 0x5F29  # 24362
+CAMERA_Y_PT = 0x5F2A  # 24362
 VIDEO_MODE_PT = 0x5F2C  # 24364
 PERSIST_PT = 0x5F2E  # 24366
 PAUSE_AUDIO_PT = 0x5F2F  # 24367
@@ -59,6 +64,7 @@ PRINT_PT = 0x5F58  # 24408
 BITPLANE_PT = 0x5F5E  # 24414
 HIGH_COLOR_PT = 0x5F5F  # 24415
 FILL_PALETTE_PT = 0x5F60  # 24416
+GPIO_PT = 0x5F80  # 24448
 SCREEN_DATA_PT = 0x6000  # 24576
 GENERAL_USE_PT = 0x8000  # 32768. Pico8 0.2.4+
 
@@ -127,6 +133,15 @@ PATTERNS = {
     "▥": 21845.5,
 }
 
+# bytes.translate() tables splitting a screen byte into its left and right pixel.
+LO_NIBBLE = bytes(i & 0x0F for i in range(256))
+HI_NIBBLE = bytes(i >> 4 for i in range(256))
+SHL_NIBBLE = bytes((i << 4) & 0xFF for i in range(256))
+
+# Nibble maps from the old to the new color of a pixel; KEEP leaves it unchanged.
+KEEP = tuple(range(16))
+NibbleMap = tuple[int, ...]
+
 DEBUG = False
 SCREEN_SIZE = (128, 128)
 characters: list[pygame.Surface] = []
@@ -134,13 +149,19 @@ clock: pygame.time.Clock
 fps: int = 30
 frame_count: int = 0
 last_flip: float = 0.0
+flip_hook: Callable[[], None] | None = (
+    None  # Called after each flip, e.g. to save the frame.
+)
 lock = threading.Lock()
+offscreen = False
 screen: pygame.Surface
 scrolled: int = 0
+# What flip() last showed: screen memory, then the screen palette, video mode and overlay state.
+_shown_screen = b""
+_shown_state: tuple[bytes, int, bool] | None = None
 surf: pygame.Surface
 font_img: pygame.Surface
 spritesheet: pygame.Surface
-decimal.getcontext().prec = 4
 
 
 def debug(s: Any) -> None:
@@ -154,14 +175,32 @@ def debug(s: Any) -> None:
         printh(s)
 
 
-def _init_video() -> None:
-    global characters, clock, frame_count, font_img, screen, spritesheet, surf
+def _init_video(headless: bool = False) -> None:
+    """Open the window, or with headless, only an off-screen surface that flip() draws to.
 
-    mem[VIDEO_MODE_PT] = 0
+    >>> _init_video(headless=True); pygame.display.get_surface() is None
+    True
+    >>> _init_video()
+    """
+    global characters, clock, frame_count, font_img, offscreen, screen, spritesheet, surf
+    global _shown_screen, _shown_state
 
-    pygame.display.set_caption("PyPico8")
-    screen = pygame.display.set_mode(SCREEN_SIZE, pygame.SCALED | pygame.RESIZABLE)
-    surf = pygame.Surface(SCREEN_SIZE, pygame.SRCALPHA)
+    mem[VIDEO_MODE_PT] = 0
+    _shown_screen, _shown_state = (
+        b"",
+        None,
+    )  # Show all of the first frame on the new screen.
+
+    offscreen = headless
+    if headless:
+        pygame.display.quit()
+        screen = pygame.Surface(SCREEN_SIZE)
+    else:
+        pygame.display.set_caption("PyPico8")
+        screen = pygame.display.set_mode(SCREEN_SIZE, pygame.SCALED | pygame.RESIZABLE)
+    surf = pygame.Surface(
+        SCREEN_SIZE, 0, 8
+    )  # Screen color indices; the palette does the rest.
 
     reset()
     cls()
@@ -177,15 +216,20 @@ def _init_video() -> None:
         fp.write(font_file.read())
     font_file.seek(0)
     """
-    font_img = pygame.image.load(font_file).convert_alpha()
+    font_png = pygame.image.load(font_file)
+    font_img = pygame.Surface(
+        font_png.get_size(), pygame.SRCALPHA
+    )  # Like convert_alpha() without a window.
+    font_img.blit(font_png, (0, 0))
     replace_color(font_img, (255, 255, 255, 255), (194, 195, 199, 255))
     font_img.set_colorkey((0, 0, 0))
 
-    spritesheet = surf.copy()
+    spritesheet = pygame.Surface(SCREEN_SIZE, pygame.SRCALPHA)
     # for i in range(0x3100):
     #     mem[i] = 0
 
     characters = [get_char_img(i) for i in range(256)]
+    _font_rows[:] = [_glyph_rows(image) for image in characters]
 
 
 # ---------- Memory ---------- #
@@ -212,18 +256,96 @@ Map format is one byte per cel, where each byte normally encodes a sprite index.
 """
 
 RAM_SIZE = 2**16  # 65536, 16 bit (15 until Pico8 0.2.4)
-mem = [0] * RAM_SIZE
+mem = bytearray(RAM_SIZE)
 mem[BITPLANE_PT] = 255  # bitplane mode disabled
+# Zero-copy views for bulk access. mem is never resized, so exporting its buffer is safe.
+ram = memoryview(mem)
+screen_ram = ram[SCREEN_DATA_PT:GENERAL_USE_PT]
+
+# Bumped when the draw and hardware state at 0x5F00..0x5F7F is written: by a write hook, and by
+# pal() and palt(), which write to mem directly.
+draw_state_version = 0
+
+
+class DrawState:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    """The draw state RAM decoded once for the drawing functions, until draw_state_version changes.
+    The draw color and cursor, which color(), cursor() and print() set directly, are left out.
+
+    >>> fillp(0b0011001111001100 + 0.5); camera(-2, 3); clip(1, 2, 200, 4)
+    0.0
+    0
+    (0, 0, 128, 128)
+    >>> state = _draw_state(); state.pattern_rows, state.transparent, state.camera_x, state.camera_y
+    ((3, 3, 12, 12), True, 2, -3)
+    >>> state.clip_x1, state.clip_y1, state.clip_x2, state.clip_y2
+    (1, 2, 128, 6)
+    >>> fillp(); camera(); clip(); _draw_state() is state
+    13260.5
+    0
+    (1, 2, 201, 6)
+    False
+    """
+
+    def __init__(self) -> None:
+        self.version = draw_state_version
+        flags = mem[FILL_PATTERN_PT + 2]
+        pattern = mem[FILL_PATTERN_PT] | mem[FILL_PATTERN_PT + 1] << 8
+        self.pattern = pattern
+        # Off (1) bits of each pattern row y % 4, with x % 4 == 0 the highest of 4.
+        self.pattern_rows = tuple(pattern >> (12 - 4 * y) & 0x0F for y in range(4))
+        self.transparent = bool(flags & 1)  # Off pixels keep their color.
+        self.use_fill_palette = bool(flags & 2)
+        self.draw_palette = bytes(mem[DRAW_PALETTE_PT : DRAW_PALETTE_PT + 16])
+        self.fill_palette = bytes(mem[FILL_PALETTE_PT : FILL_PALETTE_PT + 16])
+        # The on color of each color: from the fill palette in fill palette mode.
+        palette = self.fill_palette if self.use_fill_palette else self.draw_palette
+        self.colors = bytes(c & 0x0F for c in palette)
+        bitplane_mode = mem[BITPLANE_PT]
+        self.bitplanes = bitplane_mode != 255
+        self.read_mask = bitplane_mode >> 4
+        self.write_mask = bitplane_mode & 0x0F
+        self.camera_x = int.from_bytes(
+            ram[CAMERA_X_PT : CAMERA_X_PT + 2], "little", signed=True
+        )
+        self.camera_y = int.from_bytes(
+            ram[CAMERA_Y_PT : CAMERA_Y_PT + 2], "little", signed=True
+        )
+        self.clip_x1 = mem[CLIP_X1_PT]
+        self.clip_y1 = mem[CLIP_Y1_PT]
+        self.clip_x2 = min(mem[CLIP_X2_PT], 128)
+        self.clip_y2 = min(mem[CLIP_Y2_PT], 128)
+        self.pattern_maps: dict[int, list[tuple[NibbleMap, ...]]] = (
+            {}
+        )  # See _pattern_maps().
+
+
+_decoded_state = DrawState()
+
+
+def _draw_state() -> DrawState:
+    """Return the decoded draw state, decoding it again if RAM changed since."""
+    global _decoded_state
+    if _decoded_state.version != draw_state_version:
+        _decoded_state = DrawState()
+    return _decoded_state
 
 
 def camera(x_offset: int = 0, y_offset: int = 0) -> int:
     """
     Set a screen offset of -x, -y for all drawing operations
         camera() to reset
+
+    The offsets are stored as signed 16-bit values at 0x5F28 and 0x5F2A.
+    >>> camera(300, -2); pos(0, 0)
+    0
+    (-300, 2)
+    >>> camera(); color(6)
+    0
+    0
     """
     color(0)  # Undocumented.
-    mem[CAMERA_X_PT] = -x_offset
-    mem[CAMERA_Y_PT] = -y_offset
+    poke2(CAMERA_X_PT, -x_offset)
+    poke2(CAMERA_Y_PT, -y_offset)
     return 0
 
 
@@ -253,6 +375,15 @@ def clip(
     (10, 20, 40, 60)
     >>> peek4(24352)
     15400.0783
+    >>> cls(); clip(1, 1, 2, 2); rectfill(0, 0, 3, 3, 9); _show_screen(0, 0, 4, 4)
+    (0, 0, 128, 128)
+    0
+    ....
+    .99.
+    .99.
+    ....
+    >>> cls(); color(6)
+    9
     """
     prev_state = (
         peek(CLIP_X1_PT),
@@ -296,9 +427,8 @@ def _cls(col: int | float | str = 0) -> None:
     40
     >>> cls()
     """
-    col = flr(tonum(col))
-    for i in range(128 * 64):
-        mem[SCREEN_DATA_PT + i] = col + col * 16
+    col = flr(tonum(col)) & 0x0F
+    screen_ram[:] = bytes((col + col * 16,)) * len(screen_ram)
 
 
 def color(col: int | float | str | None = None) -> int:
@@ -392,8 +522,8 @@ def cursor(x: int = 0, y: int = 0, col: int | None = None) -> int:
     >>> cursor(0, 0, 7)
     0
     """
-    mem[CURSOR_X_PT] = x
-    mem[CURSOR_Y_PT] = y
+    mem[CURSOR_X_PT] = flr(x) & 0xFF
+    mem[CURSOR_Y_PT] = flr(y) & 0xFF
     if col is not None:
         color(col)
     return 0
@@ -520,6 +650,91 @@ def rgb(col: int) -> tuple[int, int, int]:
     return PALETTE[col]
 
 
+def screen_pixels() -> bytes:
+    """Unpack the 4bpp screen data into one screen color index byte per pixel.
+
+    All 128 rows of the screen, top to bottom. Each row contains 128 pixels in 64 bytes.
+    Each byte contains two adjacent pixels, with the lo 4 bits being the left/even pixel
+    and the hi 4 bits being the right/odd pixel.
+
+    >>> cls(); pset(1, 0, 9); pset(127, 127, 15)
+    0
+    0
+    >>> pixels = screen_pixels(); list(pixels[:3]), pixels[-1], len(pixels)
+    ([0, 9, 0], 15, 16384)
+    >>> cls()
+    """
+    return _unpack(bytes(screen_ram))
+
+
+def _unpack(packed: bytes) -> bytes:
+    """Split 4bpp bytes into one color index byte per pixel, left pixel first."""
+    pixels = bytearray(len(packed) * 2)
+    pixels[0::2] = packed.translate(LO_NIBBLE)
+    pixels[1::2] = packed.translate(HI_NIBBLE)
+    return bytes(pixels)
+
+
+def _pack(pixels: bytes) -> bytes:
+    """Join pairs of color index bytes (0..15) into 4bpp bytes; the inverse of _unpack().
+
+    >>> _pack(_unpack(bytes(range(256)))) == bytes(range(256))
+    True
+    """
+    lo = int.from_bytes(pixels[0::2], "little")
+    hi = int.from_bytes(pixels[1::2].translate(SHL_NIBBLE), "little")
+    return (lo | hi).to_bytes(len(pixels) // 2, "little")
+
+
+def _blit_pixels(pixels: bytes, top: int = 0) -> None:
+    """Write screen color indices straight into the 8-bit pixel buffer of surf, from row top."""
+    surf.get_buffer().write(pixels, top * surf.get_pitch())
+
+
+def _set_screen_palette(palette: bytes) -> None:
+    """Point the 16 colors of surf at the screen palette entries, such as 128 for the secret colors.
+
+    >>> pal(0, 128, 1); flip(); pygame.display.get_surface().get_at((0, 0))[:3]
+    0
+    (41, 24, 20)
+    >>> pal(); flip()
+    0
+    """
+    surf.set_palette([rgb(col) for col in palette])
+
+
+def _changed_rows(old: bytes, new: bytes) -> list[tuple[int, int]]:
+    """Return the start and end of each run of screen rows that differ between old and new
+    screen memory.
+
+    >>> _changed_rows(bytes(8192), bytes(8192)), _changed_rows(bytes(8192), b"\\1" * 8192)
+    ([], [(0, 128)])
+    >>> new = bytearray(8192); new[64] = new[64 * 3] = new[64 * 4 + 63] = 1
+    >>> _changed_rows(bytes(8192), bytes(new))
+    [(1, 2), (3, 5)]
+    """
+    if len(old) != len(new):
+        return [(0, 128)]
+    # Compare blocks of 8 rows first; when most changed, the whole screen may as well have.
+    blocks = [
+        y
+        for y in range(0, 128, 8)
+        if old[y * 64 : y * 64 + 512] != new[y * 64 : y * 64 + 512]
+    ]
+    if len(blocks) > 8:
+        return [(0, 128)]
+    rows: list[tuple[int, int]] = []
+    for block in blocks:
+        for y in range(block, block + 8):
+            if old[y * 64 : y * 64 + 64] == new[y * 64 : y * 64 + 64]:
+                continue
+            if rows and rows[-1][1] == y:
+                rows[-1] = (rows[-1][0], y + 1)
+            else:
+                rows.append((y, y + 1))
+    return rows
+
+
 def flip() -> None:
     """
     Flip the back buffer to screen and wait for next frame
@@ -536,95 +751,150 @@ def flip() -> None:
     24336 is screen palette start.
 
 
-    >>> for i in (135, 134, 133, 131, 130, 129, 7, 6, 5, 4, 3, 2, 1):
+    >>> for i in (135, 134, 133, 131, 130, 129, 7, 6, 5, 4, 3, 2, 1, 0):
     ...   mem[VIDEO_MODE_PT] = i; flip()
+
+    Only the screen rows changed since the last flip are converted and shown, and nothing at all
+    when neither they, the screen palette nor the video mode changed. The screen palette only
+    sets the 16 colors of the 8-bit surf, so fades cost no conversion.
+
+    >>> display = pygame.display.get_surface(); _ = display.fill((1, 2, 3)); flip()
+    >>> pset(5, 5, 8); flip(); display.get_at((5, 5))[:3], display.get_at((5, 6))[:3]
+    0
+    ((255, 0, 77), (1, 2, 3))
+    >>> cls(); flip()
     """
-    global frame_count, last_flip
+    global frame_count, last_flip, _shown_screen, _shown_state
     with lock:
         frame_count += 1
-        screen.fill(0)
-        # area = (peek(CLIP_X1_PT), peek(CLIP_Y1_PT), peek(CLIP_X2_PT), peek(CLIP_Y2_PT))
-
-        x = 0
-        y = 0
-        for addr in range(SCREEN_DATA_PT, 0x8000):  # 24576-32767
-            """
-            All 128 rows of the screen, top to bottom. Each row contains 128 pixels in 64 bytes.
-            Each byte contains two adjacent pixels, with the lo 4 bits being the left/even pixel
-            and the hi 4 bits being the right/odd pixel.
-            """
-            pixels = mem[addr]
-            # pixels = addr % 16 + 32 # OK
-            col1 = pixels & 0b1111
-            col2 = (pixels >> 4) & 0b1111
-            # col1 = (addr + y) % 16
-            # col2 = (addr + y) % 16
-            # debug(f"x {x}, y {y}, pixels {pixels} so {col1} and {col2}")
-            if addr > SCREEN_DATA_PT and addr % 64 == 0:
-                y += 1
-            surf.set_at((x, y), rgb(mem[SCREEN_PALETTE_PT + col1]))
-            surf.set_at((x + 1, y), rgb(mem[SCREEN_PALETTE_PT + col2]))
-            x = (x + 2) % 128
-
-        # https://www.reddit.com/r/pico8/comments/s4o8l6/comment/hstbjcf/
+        packed = bytes(screen_ram)
+        rows = _changed_rows(_shown_screen, packed)
         video_mode = mem[VIDEO_MODE_PT]
-        if video_mode == 1:
-            # horizontal stretch, 64x128 screen, left half of normal screen
-            topleft = surf.subsurface(0, 0, 64, 128)
-            screen.blit(pygame.transform.scale(topleft, (128, 128)), (0, 0))
-        elif video_mode == 2:
-            # vertical stretch, 128x64 screen, top half of normal screen
-            topleft = surf.subsurface((0, 0, 128, 64))
-            screen.blit(pygame.transform.scale(topleft, (128, 128)), (0, 0))
-        elif video_mode == 3:
-            # both stretch, 64x64 screen, top left quarter of normal screen
-            topleft = surf.subsurface((0, 0, 64, 64))
-            screen.blit(pygame.transform.scale(topleft, (128, 128)), (0, 0))
-        elif video_mode == 5:
-            # horizontal mirroring, left half copied and flipped to right half
-            topleft = surf.subsurface((0, 0, 64, 128))
-            screen.blit(topleft, (0, 0))
-            screen.blit(pygame.transform.flip(topleft, 1, 0), (64, 0))
-        elif video_mode == 6:
-            # vertical mirroring, top half copied and flipped to bottom half
-            topleft = surf.subsurface((0, 0, 128, 64))
-            screen.blit(topleft, (0, 0))
-            screen.blit(pygame.transform.flip(topleft, 0, 1), (0, 64))
-        elif video_mode == 7:
-            # both mirroring, top left quarter copied and flipped to other quarters
-            topleft = surf.subsurface((0, 0, 64, 64))
-            screen.blit(pygame.transform.flip(topleft, 0, 0), (0, 0))
-            screen.blit(pygame.transform.flip(topleft, 1, 0), (64, 0))
-            screen.blit(pygame.transform.flip(topleft, 0, 1), (0, 64))
-            screen.blit(pygame.transform.flip(topleft, 1, 1), (64, 64))
-        elif video_mode == 129:
-            # horizontal flip
-            screen.blit(pygame.transform.flip(surf, 1, 0), (0, 0))
-        elif video_mode == 130:
-            # vertical flip
-            screen.blit(pygame.transform.flip(surf, 0, 1), (0, 0))
-        elif video_mode == 131:
-            # both flip
-            screen.blit(pygame.transform.flip(surf, 1, 1), (0, 0))
-        elif video_mode == 133:
-            # clockwise 90 degree rotation
-            screen.blit(pygame.transform.rotate(surf, -90), (0, 0))
-        elif video_mode == 134:
-            # 180 degree rotation (effectively equivalent to 131)
-            screen.blit(pygame.transform.rotate(surf, 180), (0, 0))
-        elif video_mode == 135:
-            # counterclockwise 90 degree rotation
-            screen.blit(pygame.transform.rotate(surf, 90), (0, 0))
+        ops = _video_mode_ops(video_mode)
+        if not _shown_state or video_mode != _shown_state[1] or (rows and ops[2]):
+            rows = [(0, 128)]  # Show the whole screen through the video mode.
+            _blit_pixels(_apply_video_mode(packed, ops) if ops[2] else _unpack(packed))
         else:
-            screen.blit(surf, (0, 0))
-
-        pygame.display.flip()
+            for y0, y1 in rows:
+                _blit_pixels(_unpack(packed[y0 * 64 : y1 * 64]), y0)
+        palette = bytes(mem[SCREEN_PALETTE_PT : SCREEN_PALETTE_PT + 16])
+        if not _shown_state or palette != _shown_state[0]:
+            _set_screen_palette(palette)
+        state = (palette, video_mode, profiler.overlay_on)
+        if state != _shown_state or profiler.overlay_on or rows == [(0, 128)]:
+            _present()
+        elif rows:
+            for y0, y1 in rows:
+                screen.blit(surf, (0, y0), (0, y0, 128, y1 - y0))
+            if not offscreen:
+                pygame.display.update([(0, y0, 128, y1 - y0) for y0, y1 in rows])
+        _shown_screen, _shown_state = packed, state
+        if flip_hook:
+            flip_hook()
         last_flip = py_time.time()
         # printh(f"FPS: {clock.get_fps():.1f}")
         # printh(f"video flip {fps} fps")
         # pygame.time.wait(10)
 
 
+def _present() -> None:
+    """Show all of surf, with the overlay if on."""
+    screen.blit(surf, (0, 0))
+    if profiler.overlay_on:
+        _draw_overlay(profiler.overlay_lines(fps))
+    if not offscreen:
+        pygame.display.flip()
+
+
+# How _video_mode_ops() prepares the pixels of the top rows it reads: as is, followed by them
+# reversed, or with each pixel doubled.
+PLAIN, MIRRORED, DOUBLED = range(3)
+VideoModeOps = tuple[int, int, tuple[slice, ...]]
+
+
+@functools.lru_cache(maxsize=256)
+def _video_mode_ops(video_mode: int) -> VideoModeOps:
+    """Compile video_mode into how to prepare how many top rows of the unpacked screen pixels, and
+    the slices of them that joined give the shown pixels. No slices if it shows the screen as is.
+    https://www.reddit.com/r/pico8/comments/s4o8l6/comment/hstbjcf/
+
+    >>> packed = b"\x10\x32" * 4096; shown = _apply_video_mode(packed, _video_mode_ops(133))
+    >>> list(shown[:3]), list(shown[128:131]), _video_mode_ops(0), len(_video_mode_ops(6)[2])
+    ([0, 0, 0], [1, 1, 1], (0, 128, ()), 65)
+    """
+    prepare, height = PLAIN, 64 if video_mode in (2, 3, 6, 7) else 128
+    rows: list[slice] = []
+    for y in range(128):
+        if video_mode in (2, 3):  # Vertical stretch.
+            y //= 2
+        elif video_mode in (6, 7):  # Vertical mirroring.
+            y = min(y, 127 - y)
+        r = y * 128
+        reversed_r = (
+            height * 128 + (height - 1 - y) * 128
+        )  # Where MIRRORED has this row reversed.
+        if video_mode in (1, 3):  # Horizontal stretch: the left half, 64 pixels wide.
+            prepare = DOUBLED
+            rows += [slice(r * 2, r * 2 + 128)]
+        elif video_mode in (2, 6):  # Only vertical stretch or mirroring: the top half.
+            rows += [slice(r, r + 128)]
+        elif video_mode in (
+            5,
+            7,
+        ):  # Horizontal mirroring: the left half, then it flipped.
+            prepare = MIRRORED
+            rows += [slice(r, r + 64), slice(reversed_r + 64, reversed_r + 128)]
+        elif video_mode == 129:  # Horizontal flip.
+            prepare = MIRRORED
+            rows += [slice(reversed_r, reversed_r + 128)]
+        elif video_mode == 130:  # Vertical flip.
+            rows += [slice((127 - y) * 128, (127 - y) * 128 + 128)]
+        elif video_mode == 133:  # Clockwise 90 degree rotation: columns bottom to top.
+            rows += [slice(127 * 128 + y, None, -128)]
+        elif video_mode == 135:  # Counterclockwise 90 degree rotation.
+            rows += [slice(127 - y, None, 128)]
+    if video_mode in (131, 134):  # Both flip, and 180 degree rotation.
+        rows = [slice(None, None, -1)]
+
+    # Join slices that continue each other, so contiguous rows copy in one go.
+    slices: list[slice] = []
+    for row in rows:
+        if slices and row.step is None and slices[-1].step is None:
+            if slices[-1].stop == row.start:
+                slices[-1] = slice(slices[-1].start, row.stop)
+                continue
+        slices.append(row)
+    return prepare, height, tuple(slices)
+
+
+def _apply_video_mode(packed: bytes, ops: VideoModeOps) -> bytes:
+    """Return the pixels of packed screen memory as shown through _video_mode_ops(),
+    unpacking only the rows it reads."""
+    prepare, height, slices = ops
+    pixels = _unpack(packed[: height * 64])
+    if prepare == MIRRORED:
+        pixels += pixels[::-1]
+    elif prepare == DOUBLED:
+        doubled = bytearray(height * 256)
+        doubled[0::2] = doubled[1::2] = pixels
+        pixels = bytes(doubled)
+    return b"".join([pixels[s] for s in slices])
+
+
+def _draw_overlay(lines: list[str]) -> None:
+    """Draw lines of text over the display without touching screen memory.
+
+    >>> _draw_overlay(["cpu 0.50"]); pygame.display.get_surface().get_at((1, 2))[:3]
+    (194, 195, 199)
+    """
+    backdrop = pygame.Surface((128, 6 * len(lines) + 1), pygame.SRCALPHA)
+    backdrop.fill((0, 0, 0, 160))
+    screen.blit(backdrop, (0, 0))
+    for row, text in enumerate(lines):
+        for column, c in enumerate(text[:32]):
+            screen.blit(characters[ord(c.swapcase())], (column * 4, row * 6))
+
+
 def flip_getlast() -> float:
     return last_flip
 
@@ -638,13 +908,130 @@ def memcpy(dest_addr: int, source_addr: int, length: int) -> None:
     >>> memcpy(100, 0, 100)
     >>> mem[0:100] == mem[100:200]
     True
-    >>> for i in range(200): mem[i] = 0
+    >>> memcpy(1, 0, 200)  # Overlapping forward.
+    >>> mem[1:101] == mem[101:201]
+    True
+    >>> memcpy(0x5F2E, 0, 4)  # Overlaps the pause register.
+    >>> mem[0:201] = bytes(201); poke(0x5F2E, 0, 0, 0, 0)
+    0
+    """
+    if length <= 0:
+        return
+    source_addr = flr(source_addr) % RAM_SIZE
+    vals = mem[source_addr : source_addr + length]
+    if len(vals) < length:  # Wrap around the end of RAM.
+        vals += mem[: length - len(vals)]
+    _write(dest_addr, vals)
+
+
+def memset(dest_addr: int, val: int, length: int) -> None:
+    """
+    Write the 8-bit value val into memory starting at dest_addr, for len bytes.
+
+    >>> memset(0x8000, 0x1234, 3); [peek(0x8000 + i) for i in range(4)]
+    [52, 52, 52, 0]
+    >>> memset(0x8000, 0, 3)
+    """
+    if length <= 0:
+        return
+    _write(dest_addr, bytes((flr(val) & 0xFF,)) * length)
+
+
+def _write(addr: int, data: bytes | bytearray) -> None:
+    """Write data to RAM at addr in one slice, wrapping at the end of RAM,
+    then call the write hooks of the 256 byte pages it touched, if any.
+    """
+    addr = flr(addr) % RAM_SIZE
+    end = addr + len(data)
+    if end > RAM_SIZE:
+        head = RAM_SIZE - addr
+        _write(addr, data[:head])
+        _write(0, data[head:])
+        return
+    if end == addr:
+        return
+    mem[addr:end] = data
+    pages = _page_hooks[addr >> 8 : ((end - 1) >> 8) + 1]
+    if any(pages):
+        called: list[tuple[int, int, WriteHook]] = []
+        for hooks in pages:
+            for entry in tuple(hooks):
+                if entry not in called:  # A hook over several pages runs once.
+                    called.append(entry)
+                    lo, hi = max(addr, entry[0]), min(end, entry[1])
+                    if lo < hi:
+                        entry[2](lo, hi)
+
+
+WriteHook = Callable[[int, int], None]
+# The (start, end, hook) registrations overlapping each 256 byte page of RAM.
+_page_hooks: list[list[tuple[int, int, WriteHook]]] = [[] for _ in range(RAM_SIZE >> 8)]
+
+
+def add_write_hook(start: int, end: int, hook: WriteHook) -> None:
+    """Call hook(lo, hi) after poke(), poke2(), poke4(), memcpy(), memset() or print() write to
+    addresses lo..hi - 1 of start..end - 1. For cache invalidation, dirty rectangles or
+    watchpoints. Writes only pay for hooks on the 256 byte pages they touch.
+
+    >>> writes = []; hook = lambda lo, hi: writes.append((hex(lo), hi - lo))
+    >>> add_write_hook(0x8010, 0x8020, hook); add_write_hook(0x80FF, 0x8101, hook)
+    >>> poke(0x800E, 1, 2, 3); memset(0x8000, 0, 0x200); poke(0x8200, 1); writes
+    0
+    0
+    [('0x8010', 1), ('0x8010', 16), ('0x80ff', 2)]
+    >>> remove_write_hook(hook); poke(0x8010, 0); len(writes)
+    0
+    3
     """
-    vals = []
-    for i in range(length):
-        vals.append(peek(source_addr + i))
-    for i, val in enumerate(vals):
-        poke(dest_addr + i, val)
+    for page in range(start >> 8, ((end - 1) >> 8) + 1):
+        _page_hooks[page].append((start, end, hook))
+
+
+def remove_write_hook(hook: WriteHook) -> None:
+    """Stop calling hook, for all the ranges add_write_hook() added it to."""
+    for hooks in _page_hooks:
+        hooks[:] = [entry for entry in hooks if entry[2] is not hook]
+
+
+def _sheet_written(start: int, end: int) -> None:
+    _invalidate_sprites(start, end)
+
+
+def _flags_written(_start: int, _end: int) -> None:
+    # https://pico-8.fandom.com/wiki/Memory#Sprite_flags
+    _map_cache.clear()
+
+
+def _font_written(_start: int, _end: int) -> None:
+    # General use / custom font (Pico8 0.2.2+)
+    _invalidate_font()
+
+
+def _draw_state_written(_start: int, _end: int) -> None:
+    # https://pico-8.fandom.com/wiki/Memory#Draw_state and #Hardware_state
+    global draw_state_version
+    draw_state_version += 1
+
+
+def _pause_written(_start: int, _end: int) -> None:
+    """Pause (1) or resume (0) the audio threads. 2 keeps music (TODO).
+    With the pause menu flag set, the menu takes the request instead."""
+    val = mem[PAUSE_AUDIO_PT]
+    if val and mem[PAUSE_MENU_PT] == 1:
+        mem[PAUSE_MENU_PT] = mem[PAUSE_AUDIO_PT] = 0
+        return
+    for thread in threads:
+        if val == 1:
+            thread.do_work.clear()  # type: ignore[attr-defined]
+        elif val == 0:
+            thread.do_work.set()  # type: ignore[attr-defined]
+
+
+add_write_hook(SPRITE_SHEET_PT, 0x2000, _sheet_written)
+add_write_hook(SPRITE_FLAGS_PT, SPRITE_FLAGS_PT + 256, _flags_written)
+add_write_hook(CUSTOM_FONT_PT, 0x5E00, _font_written)
+add_write_hook(DRAW_PALETTE_PT, GPIO_PT, _draw_state_written)
+add_write_hook(PAUSE_AUDIO_PT, PAUSE_AUDIO_PT + 1, _pause_written)
 
 
 # ---------- Map ---------- #
@@ -656,11 +1043,16 @@ using the map editor, the meaning of each cell is taken to be an index into the
 map_sprites = [0] * 128 * 64
 
 
+# Composed map areas by (cell_x, cell_y, cell_w, cell_h, layers), until mset() or a sheet or flag write.
+_map_cache: dict[tuple[int, ...], list[bytes]] = {}
+MAP_CACHE_SIZE = 16
+
+
 def map(
-    cell_x: int,
-    cell_y: int,
-    sx: int,
-    sy: int,
+    cell_x: int = 0,
+    cell_y: int = 0,
+    sx: int = 0,
+    sy: int = 0,
     cell_w: int = 128,
     cell_h: int = 32,
     layers: int | None = None,
@@ -681,22 +1073,57 @@ def map(
     Sprite 0 is always taken to mean empty, and is never drawn.
 
     >>> map(0, 0, 0, 0)
-    >>> cls()
-    """
-    yi = cell_y
-    xi = cell_x
-    yi_end = yi + cell_h
-    xi_end = xi + cell_w
-    while yi < yi_end:
-        yi += 1
-        xi = 0
-        while xi < xi_end:
-            xi += 1
-            v = map_sprites[xi + yi * 128]
-            if v == 0:
-                continue
-            if layers is not None and (fget(v) & layers):
-                spr(map_sprites[xi + yi * 128], sx, sy)
+    >>> sset(8, 0, 7); sset(16, 0, 8); fset(2, 0x5)
+    >>> mset(1, 0, 1); mset(2, 0, 2); mset(3, 0, 1)
+    >>> map(0, 0, 0, 0, 4, 1); _show_screen(8, 0, 24, 1)
+    7.......8.......7.......
+    >>> cls(); map(1, 0, 4, 0, 3, 1, 0x5); _show_screen(12, 0, 20, 1)
+    8...................
+    >>> mset(1, 0, 0); mset(2, 0, 0); mset(3, 0, 0); fset(2, 0); sset(8, 0, 0); sset(16, 0, 0); cls()
+    """
+    cell_x, cell_y, cell_w, cell_h = flr(cell_x), flr(cell_y), flr(cell_w), flr(cell_h)
+    x, y = pos(sx, sy)
+    # Only compose the cells inside the clipping rectangle.
+    state = _draw_state()
+    i0 = max(0, (state.clip_x1 - x) // 8)
+    i1 = min(cell_w, (state.clip_x2 - x + 7) // 8)
+    j0 = max(0, (state.clip_y1 - y) // 8)
+    j1 = min(cell_h, (state.clip_y2 - y + 7) // 8)
+    if i0 >= i1 or j0 >= j1:
+        return
+    key = (cell_x + i0, cell_y + j0, i1 - i0, j1 - j0, layers or 0)
+    rows = _map_cache.get(key)
+    if rows is None:
+        if len(_map_cache) >= MAP_CACHE_SIZE:
+            _map_cache.clear()
+        rows = _map_cache[key] = _map_rows(*key)
+    _blit_sprite(x + 8 * i0, y + 8 * j0, rows)
+
+
+def _map_rows(
+    cell_x: int, cell_y: int, cell_w: int, cell_h: int, layers: int
+) -> list[bytes]:
+    """Compose the sprites of a map area into rows of color indices, with 16 for empty cells.
+
+    >>> mset(1, 0, 1); sset(9, 1, 7)
+    >>> [list(row[6:11]) for row in _map_rows(0, 0, 2, 1, 0)[:2]]
+    [[16, 16, 0, 0, 0], [16, 16, 0, 7, 0]]
+    >>> mset(1, 0, 0); sset(9, 1, 0)
+    """
+    flags = mem[SPRITE_FLAGS_PT : SPRITE_FLAGS_PT + 256]
+    drawn = [n != 0 and flags[n] & layers == layers for n in range(256)]
+    empty = [b"\x10" * 8] * 8
+    rows: list[bytes] = []
+    for cy in range(cell_y, cell_y + cell_h):
+        tiles = []
+        for cx in range(cell_x, cell_x + cell_w):
+            n = map_sprites[cx + cy * 128] if 0 <= cx < 128 and 0 <= cy < 64 else 0
+            if drawn[n]:
+                tiles.append(_sprite_rows(n % 16 * 8, n // 16 * 8, 8, 8, 8, 8))
+            else:
+                tiles.append(empty)
+        rows.extend(b"".join(tile[k] for tile in tiles) for k in range(8))
+    return rows
 
 
 def mget(x: int, y: int) -> int:
@@ -715,6 +1142,7 @@ def mset(x: int, y: int, v: int) -> None:
     >>> mset(0, 0, 0)
     """
     map_sprites[x + y * 128] = v
+    _map_cache.clear()
 
 
 def peek(addr: int) -> int:
@@ -725,10 +1153,8 @@ def peek(addr: int) -> int:
     0
     >>> peek(2**16)
     0
-    >>> mem[0] = "foo"
-    >>> peek(0)
-    0
-    >>> mem[0] = 0
+    >>> peek(2**16 + 1.5) == peek(1)
+    True
     >>> peek("foo")
     0
     """
@@ -736,11 +1162,7 @@ def peek(addr: int) -> int:
         addr = flr(addr) % RAM_SIZE
     except ValueError:
         addr = 0
-    try:
-        return mem[addr] & 0xFF
-    except TypeError as ex:
-        debug(f"mem[{addr}] {ex}")
-        return 0
+    return mem[addr]
 
 
 def peek2(addr: int, _: int = 1) -> int:
@@ -799,85 +1221,30 @@ def peek4(addr: int) -> float:
     >>> poke4(a, -1.1); peek4(a)
     0
     -1.1
+    >>> poke4(0xFFFE, 1.5); peek4(0xFFFE); peek4(a + 0.5)
+    0
+    1.5
+    -1.1
+    >>> poke4(0xFFFE, 0)
+    0
     """
-    rv = (
-        shr(peek(addr), 16)
-        + shr(peek(addr + 1), 8)
-        + peek(addr + 2)
-        + shl(peek(addr + 3), 8)
-    )
-    if int(rv) & 2**15:
-        rv = -0xFFFF + rv - 1
-    return round4(rv)
+    addr = flr(addr) % RAM_SIZE
+    vals = mem[addr : addr + 4]
+    if len(vals) < 4:  # Wrap around the end of RAM.
+        vals += mem[: 4 - len(vals)]
+    rv = Fix16.from_bytes(vals)
+    return rv if fix16.ENABLED else round4(float(rv))  # type: ignore  # Fix16 acts as a float.
 
 
 def poke(addr: int, val: int = 0, *more: int) -> int:
     """
-    Write one byte to an address in base ram.
+    Write one byte to an address in base ram, and more to the addresses after it.
     >>> poke(RAM_SIZE, 11)
     0
     >>> peek(0)
     11
     """
-    addr %= RAM_SIZE
-    for val in (val, *more):
-        val = flr(val) % 256
-        # if val == 9 and addr >= 0 and addr < 200:
-        #     printh(f"POKED {addr} {val} from {sys._getframe().f_back.f_code.co_name}:")  # type: ignore[union-attr]
-        # if addr >= 0x5F60 and addr < 0x5F60 + 16:
-        #     printh(f"POKED FILL PALETTE {addr} {val} from {sys._getframe().f_back.f_code.co_name}:")  # type: ignore[union-attr]
-
-        if 0 <= addr <= 0x1FFF:  # Spritesheet
-            # x = addr % 64 * 2
-            # y = addr // 64
-            # spritesheet.set_at((x, y), PALETTE[val & 0b1111])
-            # spritesheet.set_at((x + 1, y), PALETTE[val >> 4 & 0b1111])
-            # if addr % 10 == 0:
-            #     printh(f"spritesheet @ {x},{y}=>{addr} to {val}")
-            pass
-        elif 0x2000 <= addr <= 0x2FFF:
-            # https://pico-8.fandom.com/wiki/Memory#Memory_map
-            pass
-        elif 0x3000 <= addr <= 0x30FF:
-            # https://pico-8.fandom.com/wiki/Memory#Sprite_flags
-            pass
-        elif 0x3100 <= addr <= 0x31FF:
-            # https://pico-8.fandom.com/wiki/Memory#Music
-            pass
-        elif 0x3200 <= addr <= 0x42FF:
-            # https://pico-8.fandom.com/wiki/Memory#Sound_effects
-            pass
-        elif 0x4300 <= addr <= 0x55FF:
-            # General use
-            pass
-        elif CHAR_WIDTH_LO_PT <= addr <= 0x5DFF:
-            # General use / custom font (Pico8 0.2.2+)
-            pass
-        elif 0x5E00 <= addr <= 0x5EFF:
-            # Persistent cart data (64 numbers = 256 bytes)
-            pass
-        elif DRAW_PALETTE_PT <= addr <= 0x5F3F:  # 24320 24383
-            # https://pico-8.fandom.com/wiki/Memory#Draw_state
-            if addr == 24367:
-                # pause. val 2 keeps music (TODO)
-                if val and mem[PAUSE_MENU_PT] == 1:
-                    mem[PAUSE_MENU_PT] = 0
-                    return 0
-                for thread in threads:
-                    if val == 1:
-                        thread.do_work.clear()  # type: ignore[attr-defined]
-                    elif val == 0:
-                        thread.do_work.set()  # type: ignore[attr-defined]
-        elif AUDIO_FX_PT <= addr <= 0x5F7F:  # 24384 24447
-            # https://pico-8.fandom.com/wiki/Memory#Hardware_state
-            if (
-                addr == BITPLANE_PT
-            ):  # 0x5F5E  # bitplane read (hi nibble) and write (lo nibble) masks.
-                # debug(f"bitplane poke {val}")
-                pass
-
-        mem[addr] = flr(val) & 0xFF
-        addr += 1
+    _write(addr, bytes([flr(v) % 256 for v in (val, *more)]))
     return 0
 
 
@@ -947,16 +1314,7 @@ def poke4(addr: int, val: int) -> int:
     >>> peek4(0x5000)
     1
     """
-    whole = int(val)
-    part = int(shl(val, 16))
-    if val < 0 and val % 1:
-        print("-")
-        whole -= 1
-    poke(addr, part & 0xFF)
-    poke(addr + 1, part >> 8 & 0xFF)
-    poke(addr + 2, whole & 0xFF)
-    poke(addr + 3, whole >> 8 & 0xFF)
-    return 0
+    return poke(addr, *Fix16(val).to_bytes())
 
 
 def circ(
@@ -973,34 +1331,64 @@ def circ(
     >>> circ(0, 0)
     >>> circ(0, 0, -1)
     >>> circ(0, 0, 0)
+    >>> cls(); circ(3, 3, 3, 7)
+    >>> _show_screen(0, 0, 7, 7)
+    ..777..
+    .7...7.
+    7.....7
+    7.....7
+    7.....7
+    .7...7.
+    ..777..
+    >>> cls(); circ(2, 2, 2.9, 8, False)
+    >>> _show_screen(0, 0, 5, 5)
+    .888.
+    88888
+    88888
+    88888
+    .888.
+    >>> cls()
     """
     if radius < 0:
         return
-    if radius == 0:
-        pset(x, y, col)
-        return
     if col is not None:
         color(col)
-
-    cel = surf.copy()
-    cel.fill((0, 0, 0, 0))
-    area = pygame.draw.ellipse(
-        cel,
-        (255, 255, 255, 255),
-        (pos(x - radius, y - radius), (2 * radius + 1, 2 * radius + 1)),
-        _border,
-    )
-    # x = 0
-    # y = 10
-    # for radius in range(0, 10):
-    #     x += radius * 2
-    #     pygame.draw.circle(cel, col2rgb(col + radius), pos(x, y), ceil(radius), _border)
-    #     pygame.draw.ellipse(cel, col2rgb(col + radius), (pos(x, y + 20), (2 * radius + 1, 2 * radius + 1)), _border)
-    #     with open("debug.png", "wb") as fp:
-    #         pygame.image.save(cel, fp, "png")
-    # raise Exception("DEBUG")
-
-    _pset_cel(cel, area)
+    cx, cy = pos(x, y)
+    patterns = _pattern_maps(mem[DRAW_COLOR_PT])
+    if _border:
+        points: set[tuple[int, int]] = set()
+        for dx, dy in _circle_octant(flr(radius)):
+            for px, py in ((dx, dy), (dy, dx)):
+                points.update(
+                    ((cx - px, cy - py), (cx + px, cy - py)),
+                    ((cx - px, cy + py), (cx + px, cy + py)),
+                )
+        _plot(points, patterns)
+    else:
+        rows: dict[int, int] = {}
+        for dx, dy in _circle_octant(flr(radius)):
+            for px, py in ((dx, dy), (dy, dx)):
+                for row in (cy - py, cy + py):
+                    rows[row] = max(rows.get(row, 0), px)
+        for row, half in rows.items():
+            _span(cx - half, cx + half, row, patterns[row % 4])
+
+
+def _circle_octant(r: int) -> Iterator[tuple[int, int]]:
+    """Yield the x,y offsets of the midpoint circle of radius r from 0 to 45 degrees.
+
+    >>> list(_circle_octant(3))
+    [(3, 0), (3, 1), (2, 2)]
+    """
+    x, y, d = r, 0, 1 - r
+    while y <= x:
+        yield x, y
+        y += 1
+        if d < 0:
+            d += 2 * y + 1
+        else:
+            x -= 1
+            d += 2 * (y - x) + 1
 
 
 def circfill(
@@ -1026,6 +1414,14 @@ def line(
     If x1,y1 are not given, the end of the last drawn line is used.
 
     >>> line(0, 0)
+    >>> cls(); line(0, 0, 5, 2, 9); line(1, 3, 1, 4)
+    >>> _show_screen(0, 0, 6, 5)
+    99....
+    ..99..
+    ....99
+    .9....
+    .9....
+    >>> cls()
     """
 
     if x1 is None:
@@ -1044,12 +1440,35 @@ def line(
     if col is not None:
         color(col)
 
-    cel = surf.copy()
-    cel.fill((0, 0, 0, 0))
-    # debug(f"line {pos(x0, y0)} to {pos(x1, y1)}")
-    _pset_cel(
-        cel, pygame.draw.line(cel, (255, 255, 255, 255), pos(x0, y0), pos(x1, y1))
-    )
+    x0, y0 = pos(x0, y0)
+    x1, y1 = pos(x1, y1)
+    if max(x0, x1) < 0 or max(y0, y1) < 0 or min(x0, x1) > 127 or min(y0, y1) > 127:
+        return
+    _plot(_line_points(x0, y0, x1, y1), _pattern_maps(mem[DRAW_COLOR_PT]))
+
+
+def _line_points(x0: int, y0: int, x1: int, y1: int) -> Iterator[tuple[int, int]]:
+    """Yield the pixels of a Bresenham line from x0,y0 to x1,y1.
+
+    >>> list(_line_points(0, 0, 3, -1))
+    [(0, 0), (1, 0), (2, -1), (3, -1)]
+    """
+    dx = abs(x1 - x0)
+    dy = -abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    err = dx + dy
+    while True:
+        yield x0, y0
+        if x0 == x1 and y0 == y1:
+            return
+        e2 = 2 * err
+        if e2 >= dy:
+            err += dy
+            x0 += sx
+        if e2 <= dx:
+            err += dx
+            y0 += sy
 
 
 def oval(
@@ -1062,19 +1481,77 @@ def oval(
 ) -> None:
     """Draw an oval that is symmetrical in x and y (an ellipse), with the given bounding rectangle.
     >>> oval(0, 0, 0, 0)
+    >>> cls(); oval(0, 0, 7, 4, 12)
+    >>> _show_screen(0, 0, 8, 5)
+    ..cccc..
+    .c....c.
+    c......c
+    .c....c.
+    ..cccc..
+    >>> cls(); ovalfill(0, 0, 3, 5, 2)
+    >>> _show_screen(0, 0, 4, 6)
+    .22.
+    2222
+    2222
+    2222
+    2222
+    .22.
+    >>> cls()
     """
+    if col is not None:
+        color(col)
+    x0, y0 = pos(x0, y0)
+    x1, y1 = pos(x1, y1)
     if x1 < x0:
         x0, x1 = x1, x0
     if y1 < y0:
         y0, y1 = y1, y0
-    if col is not None:
-        color(col)
-    cel = surf.copy()
-    cel.fill((0, 0, 0, 0))
-    area = pygame.draw.ellipse(
-        cel, (255, 255, 255, 255), (pos(x0, y0), (x1 - x0 + 1, y1 - y0 + 1)), _border
-    )
-    _pset_cel(cel, area)
+    patterns = _pattern_maps(mem[DRAW_COLOR_PT])
+    if _border:
+        _plot(set(_ellipse_points(x0, y0, x1, y1)), patterns)
+    else:
+        rows: dict[int, tuple[int, int]] = {}
+        for x, y in _ellipse_points(x0, y0, x1, y1):
+            left, right = rows.get(y, (x, x))
+            rows[y] = (min(left, x), max(right, x))
+        for y, (left, right) in rows.items():
+            _span(left, right, y, patterns[y % 4])
+
+
+def _ellipse_points(x0: int, y0: int, x1: int, y1: int) -> Iterator[tuple[int, int]]:
+    """Yield the outline pixels of the ellipse inside the rectangle x0,y0 to x1,y1 (x0 <= x1, y0 <= y1).
+    Midpoint algorithm by Alois Zingl, so even and odd sizes both touch every side of the rectangle.
+
+    >>> sorted(set(_ellipse_points(0, 0, 2, 2)))
+    [(0, 1), (1, 0), (1, 2), (2, 1)]
+    """
+    a = x1 - x0
+    b = y1 - y0
+    b1 = b & 1
+    dx = 4 * (1 - a) * b * b
+    dy = 4 * (b1 + 1) * a * a
+    err = dx + dy + b1 * a * a
+    y0 += (b + 1) // 2
+    y1 = y0 - b1
+    a8 = 8 * a * a
+    b8 = 8 * b * b
+    while x0 <= x1:
+        yield from ((x1, y0), (x0, y0), (x0, y1), (x1, y1))
+        e2 = 2 * err
+        if e2 <= dy:
+            y0 += 1
+            y1 -= 1
+            dy += a8
+            err += dy
+        if e2 >= dx or 2 * err > dy:
+            x0 += 1
+            x1 -= 1
+            dx += b8
+            err += dx
+    while y0 - y1 <= b:  # Finish the tips of flat ellipses.
+        yield from ((x0 - 1, y0), (x1 + 1, y0), (x0 - 1, y1), (x1 + 1, y1))
+        y0 += 1
+        y1 -= 1
 
 
 def ovalfill(
@@ -1090,6 +1567,36 @@ def ovalfill(
     oval(x0, y0, x1, y1, col, False)
 
 
+def _plot(
+    points: Iterable[tuple[int, int]], patterns: list[tuple[NibbleMap, ...]]
+) -> None:
+    """Draw distinct pixels, merging horizontal neighbours into spans.
+
+    >>> _plot([(1, 0), (3, 0), (2, 0), (0, 1)], _pattern_maps(5)); _show_screen(0, 0, 4, 2)
+    .555
+    5...
+    >>> cls()
+    """
+    run_y = run_x0 = run_x1 = -1
+    for x, y in sorted(points, key=lambda p: (p[1], p[0])):
+        if y == run_y and x == run_x1 + 1:
+            run_x1 = x
+            continue
+        if run_y >= 0:
+            _span(run_x0, run_x1, run_y, patterns[run_y % 4])
+        run_y, run_x0, run_x1 = y, x, x
+    if run_y >= 0:
+        _span(run_x0, run_x1, run_y, patterns[run_y % 4])
+
+
+def _show_screen(x: int, y: int, w: int, h: int) -> None:
+    """Print a screen area with . for color 0 and hex digits for others."""
+    for row in range(y, y + h):
+        builtins.print(
+            "".join(f"{pget(col, row):x}".replace("0", ".") for col in range(x, x + w))
+        )
+
+
 def rect(*args: Any, _border_only: bool = True) -> int:
     """Draw a rectangle. x0: int, y0: int, x1: int, y1: int, col: int | None = None, _border_only=True
     Col None => 0 but No col => draw color!!!
@@ -1118,14 +1625,110 @@ def rect(*args: Any, _border_only: bool = True) -> int:
         col = None
 
     debug(f"rect({x0},{y0} {x1},{y1} {col} {_border_only})")
-    for y in range(y0, y1 + 1):
-        for x in range(x0, x1 + 1):
-            if not _border_only or y == y0 or y == y1 or x == x0 or x == x1:
-                _pset(x, y, col)
+    patterns = _pattern_maps(mem[DRAW_COLOR_PT] if col is None else flr(col))
+    for y in range(max(y0, 0), min(y1, 127) + 1):
+        maps = patterns[y % 4]
+        if not _border_only or y in (y0, y1):
+            _span(x0, x1, y, maps)
+        else:
+            _span(x0, x0, y, maps)
+            _span(x1, x1, y, maps)
 
     return 0
 
 
+def _pattern_maps(col: int) -> list[tuple[NibbleMap, ...]]:
+    """Decode the draw state for col once per DrawState, like _pset() does per pixel.
+    Returns for each fill pattern row (y % 4) the nibble maps for each column (x % 4).
+
+    >>> fillp(0b0011001111001100)
+    0.0
+    >>> [[m[0] for m in row] for row in _pattern_maps(0x12)]
+    [[2, 2, 1, 1], [2, 2, 1, 1], [1, 1, 2, 2], [1, 1, 2, 2]]
+    >>> fillp(0b0011001111001100 + 0.5)  # Transparent off pixels keep their color.
+    13260.0
+    >>> [[m[5] for m in row] for row in _pattern_maps(0x12)]
+    [[2, 2, 5, 5], [2, 2, 5, 5], [5, 5, 2, 2], [5, 5, 2, 2]]
+    >>> fillp()
+    13260.5
+    """
+    state = _draw_state()
+    maps = state.pattern_maps.get(col)
+    if maps is not None:
+        return maps
+    lo_col = state.colors[col & 0x0F]
+    if state.bitplanes:
+        write_mask, read_mask = state.write_mask, state.read_mask
+        on_map = tuple(
+            (dst & ~write_mask) | (lo_col & write_mask & read_mask) for dst in range(16)
+        )
+    else:
+        on_map = (lo_col,) * 16
+    off_map = KEEP if state.transparent else ((col & 0xF0) >> 4,) * 16
+
+    maps = state.pattern_maps[col] = [
+        tuple(off_map if bits >> (3 - x) & 1 else on_map for x in range(4))
+        for bits in state.pattern_rows
+    ]
+    return maps
+
+
+@functools.lru_cache(maxsize=256)
+def _byte_table(lo_map: NibbleMap, hi_map: NibbleMap) -> bytes:
+    """bytes.translate() table applying lo_map to the left and hi_map to the right pixel of a byte."""
+    return bytes(lo_map[b & 0x0F] | hi_map[b >> 4] << 4 for b in range(256))
+
+
+def _span(x0: int, x1: int, y: int, maps: tuple[NibbleMap, ...]) -> None:
+    """Draw pixels x0..x1 of screen row y through the nibble maps for x % 4.
+    Whole bytes are written per run; only odd edge pixels are set individually.
+
+    >>> maps = _pattern_maps(0x18)[0]
+    >>> _span(-5, 4, 0, maps); _span(7, 7, 0, maps); [pget(x, 0) for x in range(9)]
+    [8, 8, 8, 8, 8, 0, 0, 8, 0]
+    >>> cls()
+    """
+    state = _draw_state()
+    if not state.clip_y1 <= y < state.clip_y2:
+        return
+    x0 = max(x0, state.clip_x1)
+    x1 = min(x1, state.clip_x2 - 1)
+    if x0 > x1:
+        return
+    row = SCREEN_DATA_PT + y * 64
+    if x0 & 1:
+        _set_nibble(row, x0, maps[x0 % 4])
+        x0 += 1
+    if not x1 & 1:
+        _set_nibble(row, x1, maps[x1 % 4])
+        x1 -= 1
+    start = x0 // 2
+    n = (x1 + 1) // 2 - start
+    if n <= 0:
+        return
+    # Byte start covers x % 4 in (0, 1) when start is even, else (2, 3).
+    even, odd = (maps[0], maps[1]), (maps[2], maps[3])
+    if start & 1:
+        even, odd = odd, even
+    if all(m.count(m[0]) == 16 for m in maps):
+        pair = bytes((even[0][0] | even[1][0] << 4, odd[0][0] | odd[1][0] << 4))
+        mem[row + start : row + start + n] = (pair * ((n + 1) // 2))[:n]
+    else:
+        seg = mem[row + start : row + start + n]
+        seg[0::2] = seg[0::2].translate(_byte_table(*even))
+        seg[1::2] = seg[1::2].translate(_byte_table(*odd))
+        mem[row + start : row + start + n] = seg
+
+
+def _set_nibble(row: int, x: int, nibble_map: NibbleMap) -> None:
+    """Map the color of pixel x of the screen row starting at address row."""
+    addr = row + x // 2
+    if x & 1:
+        mem[addr] = (mem[addr] & 0x0F) | nibble_map[mem[addr] >> 4] << 4
+    else:
+        mem[addr] = (mem[addr] & 0xF0) | nibble_map[mem[addr] & 0x0F]
+
+
 def rectfill(*args: Any) -> int:
     """Draw a filled rectangle.
     >>> rectfill(0, 0, 0, 0)
@@ -1172,6 +1775,7 @@ def pal(*args: Any) -> int | None:
     >>> pal()
     0
     """
+    global draw_state_version
 
     if len(args) == 0:
         """pal() resets first 2 palettes to defaults."""
@@ -1291,6 +1895,7 @@ def pal(*args: Any) -> int | None:
     if p == 0:
         rv = uint4(rv)
     mem[pt + old_col] = uint8(new_col)
+    draw_state_version += 1
     return rv
 
 
@@ -1317,6 +1922,7 @@ def palt(coli: int | None = None, transparent: bool | None = None) -> int | bool
     >>> palt()
     -16384
     """
+    global draw_state_version
     prev_state = 0
 
     if coli is None and transparent is None:
@@ -1344,6 +1950,7 @@ def palt(coli: int | None = None, transparent: bool | None = None) -> int | bool
             mem[a] |= 16
         elif transparent is False:
             mem[a] &= 15
+    draw_state_version += 1
     return prev_state
 
 
@@ -1351,7 +1958,8 @@ def pos(x: int | float, y: int | float) -> tuple[int, int]:
     """Returns floored and camera-offset x,y tuple.
     Setting out of bounds is possible, but getting is not; mod in callers for get_at.
     """
-    return (flr(mem[CAMERA_X_PT] + x), flr(mem[CAMERA_Y_PT] + y))
+    state = _draw_state()
+    return (flr(state.camera_x + x), flr(state.camera_y + y))
 
 
 def pget(x: int | float, y: int | float) -> int:
@@ -1415,32 +2023,27 @@ def _pset(
     and the hi 4 bits being the right/odd pixel.
 
     Uses 4x4 fill pattern in 16 bits at 0x5F31 with transparency option at 0x5F33. Pattern 0 (on color) is draw color 0x0F; 1 (off color) is 0xF0.
+    Pixels outside the clipping rectangle are left alone.
     """
-    if x < 0 or y < 0 or x > 127 or y > 127:
+    state = _draw_state()
+    if not (state.clip_x1 <= x < state.clip_x2 and state.clip_y1 <= y < state.clip_y2):
         return
 
     if col is None:
         col = mem[DRAW_COLOR_PT]
     col = flr(col)
 
-    on_color_trans = peek(FILL_PATTERN_PT + 2) & 1
-    use_fill_palette = peek(FILL_PATTERN_PT + 2) & 2
     # When it's set, pixel values in spr/sspr/map/tline are mapped to 8-bit colour pairs starting at 0x5f60, and the fill pattern is observed when the high & low nibbles differ.
-    if use_fill_palette:
-        lo_col = mem[FILL_PALETTE_PT + (col & 0x0F)]
-    else:
-        lo_col = mem[DRAW_PALETTE_PT + (col & 0x0F)]
+    lo_col = state.colors[col & 0x0F]
 
     if use_pattern:
-        if peek2(FILL_PATTERN_PT) >> (15 - ((x % 4) + 4 * (y % 4))) & 1:
-            if on_color_trans:
+        if state.pattern_rows[y % 4] >> (3 - x % 4) & 1:
+            if state.transparent:
                 return
             col = (col & 0xF0) >> 4
         else:
-            bitplane_mode = mem[BITPLANE_PT]  # 0x5F5 / 24414
-            if bitplane_mode != 255:
-                read_mask = (bitplane_mode & 0xF0) >> 4
-                write_mask = bitplane_mode & 0x0F
+            if state.bitplanes:  # 0x5F5E / 24414
+                read_mask, write_mask = state.read_mask, state.write_mask
                 # https://www.lexaloffle.com/bbs/?tid=54215#:~:text=%3E%200x5f5e%20/-,24414,-%3E%20Allows%20PICO%2D8
                 dst_color = pget(x, y)
                 lo_col = (dst_color & ~write_mask) | (lo_col & write_mask & read_mask)
@@ -1456,22 +2059,136 @@ def _pset(
     # debug(f"pset {x},{y} @ {addr} to 0x{mem[addr]:02x}, vis {on_color_trans}")
 
 
-def _pset_cel(
-    cel: pygame.Surface | None = None,
-    area: pygame.Rect | None = None,
-) -> None:
-    """Draw nontransparent area of a surface."""
-    if cel is None:
-        cel = surf
-    if area is None:
-        area = cel.get_bounding_rect()
-    xr = range(area.left, area.right)
-    yr = range(area.top, area.bottom)
-    # debug(f"_pset_cel {mem[FILL_PATTERN_PT + 1]:02x} {mem[FILL_PATTERN_PT]:02x} area {area} from {sys._getframe().f_back.f_code.co_name}")
-    for y in yr:
-        for x in xr:
-            if cel.get_at((x, y))[3] != 0:
-                _pset(x, y)
+def pset_many(
+    xs: Iterable[int | float],
+    ys: Iterable[int | float],
+    cols: Iterable[int | float] | int | float | None = None,
+) -> int:
+    """Set the pixel at each x, y plus camera offset to the color at the same index in cols,
+    to cols if it's one color, or to the draw color if None. Like pset() per pixel, but the
+    camera, clip rectangle and draw state are read once, and once per color.
+
+    >>> cls(); pset_many([0, 1, 2, -1], [0, 0, 1, 0], [8, 9, 10, 11]); _show_screen(0, 0, 3, 2)
+    0
+    89.
+    ..a
+    >>> camera(-1, 0); fillp(0x5A5A); pset_many(range(4), [1] * 4, 0x1C)
+    0
+    0.0
+    0
+    >>> camera(); _show_screen(0, 1, 5, 1); fillp(); cls()
+    0
+    .c1c1
+    23130.0
+    >>> pset_many(np.arange(3), np.zeros(3), np.array([0, 7, 0])); _show_screen(0, 0, 3, 1); color()
+    0
+    .7.
+    0
+    >>> cls()
+    """
+    state = _draw_state()
+    cam_x, cam_y = state.camera_x, state.camera_y
+    x0, y0, x1, y1 = state.clip_x1, state.clip_y1, state.clip_x2, state.clip_y2
+    if cols is None or isinstance(cols, (int, float, Fix16)):
+        cols = itertools.repeat(mem[DRAW_COLOR_PT] if cols is None else cols)
+    patterns: dict[int, list[tuple[NibbleMap, ...]]] = {}
+    c = None
+    for x, y, col in zip(xs, ys, cols):
+        x, y, c = flr(x) + cam_x, flr(y) + cam_y, flr(col)
+        maps = patterns.get(c)
+        if maps is None:
+            maps = patterns[c] = _pattern_maps(c)
+        if x0 <= x < x1 and y0 <= y < y1:
+            _set_nibble(SCREEN_DATA_PT + y * 64, x, maps[y % 4][x % 4])
+    if c is not None:
+        color(c)
+    return 0
+
+
+def pget_many(xs: Iterable[int | float], ys: Iterable[int | float]) -> Any:
+    """Get the color at each x, y plus camera offset, like pget(), as a list,
+    or as a NumPy array if xs is one.
+
+    >>> cls(); pset(1, 0, 9); pget_many([0, 1, 1, 200], [0, 0, -1, 0])
+    0
+    [0, 9, 0, 0]
+    >>> pget_many(np.array([1, 2]), np.array([0, 0])).tolist()
+    [9, 0]
+    >>> cls()
+    """
+    cam_x, cam_y = pos(0, 0)
+    pixels = screen_pixels()
+    if np is not None and isinstance(xs, np.ndarray):
+        x = np.floor(xs).astype(int) + cam_x
+        y = np.floor(np.asarray(ys)).astype(int) + cam_y
+        inside = (x >= 0) & (x < 128) & (y >= 0) & (y < 128)
+        rv = np.zeros(x.shape, np.uint8)
+        rv[inside] = np.frombuffer(pixels, np.uint8)[y[inside] * 128 + x[inside]]
+        return rv
+    return [
+        pixels[y * 128 + x] if 0 <= x < 128 and 0 <= y < 128 else 0
+        for x, y in ((flr(x) + cam_x, flr(y) + cam_y) for x, y in zip(xs, ys))
+    ]
+
+
+@contextlib.contextmanager
+def screen_array() -> Iterator[Any]:
+    """Give the screen as a writable 128x128 NumPy array of colors indexed [y, x], plus camera
+    offset like pget(). When the block ends, changed pixels are mapped through the draw palette
+    and packed back into screen memory in one pass, inside the clip rectangle. Drawing calls
+    made inside the block are kept where the array was left unchanged.
+    Needs NumPy: pip install pypico8[numpy]
+
+    >>> cls(); camera(0, 1); clip(0, 0, 128, 2); pal(8, 2)
+    0
+    (0, 0, 128, 128)
+    8
+    >>> with screen_array() as a: a[1:4, :3] = 8; a[1, 3] = a[1, 2] + 1
+    >>> camera(); clip(); pal(); _show_screen(0, 0, 5, 3)
+    0
+    (0, 0, 128, 2)
+    0
+    2229.
+    222..
+    .....
+    >>> with screen_array() as a: a[0, 0] = 9; pset(1, 0, 7)
+    0
+    >>> _show_screen(0, 0, 5, 1)
+    9729.
+    >>> cls()
+    """
+    if np is None:
+        raise ModuleNotFoundError(
+            "screen_array() needs NumPy: pip install pypico8[numpy]"
+        )
+    screen_part, view_part = _camera_overlap()
+    pixels = np.frombuffer(bytearray(screen_pixels()), np.uint8).reshape(128, 128)
+    view = np.zeros((128, 128), np.uint8)
+    view[view_part] = pixels[screen_part]
+    before = view.copy()
+    yield view
+
+    pixels = np.frombuffer(bytearray(screen_pixels()), np.uint8).reshape(128, 128)
+    state = _draw_state()
+    clipped = np.zeros((128, 128), bool)
+    clipped[state.clip_y1 : state.clip_y2, state.clip_x1 : state.clip_x2] = True
+    changed = (view != before)[view_part] & clipped[screen_part]
+    draw_palette = np.frombuffer(state.draw_palette, np.uint8)
+    target = pixels[screen_part]
+    target[changed] = draw_palette[view[view_part][changed] & 0x0F] & 0x0F
+    screen_ram[:] = (pixels[:, 0::2] | pixels[:, 1::2] << 4).tobytes()
+
+
+def _camera_overlap() -> tuple[tuple[slice, slice], tuple[slice, slice]]:
+    """Return the screen and camera view [y, x] slices that show the same pixels."""
+    cam_x, cam_y = pos(0, 0)
+    x0, x1 = max(0, -cam_x), max(0, min(128, 128 - cam_x))
+    y0, y1 = max(0, -cam_y), max(0, min(128, 128 - cam_y))
+    x1, y1 = max(x0, x1), max(y0, y1)
+    return (
+        (slice(y0 + cam_y, y1 + cam_y), slice(x0 + cam_x, x1 + cam_x)),
+        (slice(y0, y1), slice(x0, x1)),
+    )
 
 
 def fget(n: int, flag_index: int | None = None) -> int:
@@ -1492,10 +2209,11 @@ def fset(n: int, f: int = 0, v: bool | None = None) -> None:
     """
     if n < 0 or n > 255:
         return
+    _map_cache.clear()
     if v is None:
         mem[SPRITE_FLAGS_PT + n] = f % 256
     if v:
-        mem[SPRITE_FLAGS_PT + n] |= 1 << f
+        mem[SPRITE_FLAGS_PT + n] |= (1 << f) & 0xFF
     else:
         mem[SPRITE_FLAGS_PT + n] &= ~(1 << f)
 
@@ -1506,7 +2224,7 @@ def get_char_img(n: int) -> pygame.Surface:
     y = n // 16 * 8
     w = 9 if n >= 128 else 5
     area = (x, y, w, 5)
-    image = pygame.Surface((w, 7), pygame.SRCALPHA).convert_alpha()
+    image = pygame.Surface((w, 7), pygame.SRCALPHA)
     image.blit(font_img, (1, 1), area)
     return image
 
@@ -1547,6 +2265,10 @@ def print(
     128
     >>> print("\\f8\\^:247cb67c7eff0106\\f6nice\ntutorial", 10, 10)
     42
+    >>> print(r"\^@80000002hi!"); peek(0x8000), peek(0x8001), peek(0x8002)  # Poke 2 bytes.
+    (72, 73, 0)
+    >>> poke(0x8000, 0, 0)
+    0
     """
     if s is None:
         return None
@@ -1555,8 +2277,8 @@ def print(
     scroll(0)  # Reset scrolled count.
     if x is not None and y is not None:
         x, y = pos(x, y)  # archery.py
-        mem[CURSOR_X_PT] = x
-        mem[CURSOR_Y_PT] = y
+        mem[CURSOR_X_PT] = x & 0xFF
+        mem[CURSOR_Y_PT] = y & 0xFF
     elif x is not None and y is None:
         col = flr(x)
         x = None
@@ -1567,23 +2289,101 @@ def print(
         y = mem[CURSOR_Y_PT]
     else:
         y = flr(y)
-
     if col is not None:
         color(col)
 
+    s = str(s)
+    key = (s, x, y, mem[DRAW_COLOR_PT], _wrap, do_scroll)
+    layout = _print_layouts.pop(key, None)
+    if layout is None:
+        layout = _print_layout(s, x, y, do_scroll, _wrap)
+    elif layout[0] is not None:
+        _blit_sprite(*layout[0], luts=TEXT_LUTS)
+    _, draw_col, cursor_x, cursor_y, result, cacheable = layout
+    if cacheable:
+        _print_layouts[key] = layout  # Most recently used last.
+        if len(_print_layouts) > PRINT_CACHE_SIZE:
+            del _print_layouts[next(iter(_print_layouts))]
+    if draw_col is not None:
+        mem[DRAW_COLOR_PT] = draw_col
+    if cursor_x is not None:
+        mem[CURSOR_X_PT] = cursor_x & 0xFF
+    if cursor_y is not None:
+        mem[CURSOR_Y_PT] = cursor_y & 0xFF
+    return result
+
+
+# Text drawn by a print() call: x, y and rows of color indices, with 16 for untouched pixels.
+Text = tuple[int, int, list[bytes]]
+# Text or None, draw color, cursor x and y (None if unchanged), return value, and whether it can be reused.
+PrintLayout = tuple[Text | None, int | None, int | None, int | None, int | None, bool]
+# Glyph x, y, rows of 0 (off) and 1 (on) pixels, on color and off color (None is transparent).
+Glyph = tuple[int, int, tuple[bytes, ...], int, int | None]
+
+# Layouts of print() calls without side effects by (s, x, y, draw color, _wrap, do_scroll), least recently used first.
+_print_layouts: dict[tuple[Any, ...], PrintLayout] = {}
+PRINT_CACHE_SIZE = 256
+# Rows of the built-in font glyphs in their 7 pixel high cells, from font_img.
+_font_rows: list[tuple[bytes, ...]] = []
+# Rows of custom font glyphs by (ord, width, height), from memory at 0x5600.
+_custom_glyphs: dict[tuple[int, int, int], tuple[bytes, ...]] = {}
+# Text colors map to themselves, 16 is transparent.
+TEXT_LUTS = (bytes(range(16)) + bytes(240), bytes(256), b"\xff" * 16 + bytes(240))
+
+
+def _print_layout(s: str, x: int, y: int, do_scroll: bool, _wrap: bool) -> PrintLayout:
+    r"""Parse P8SCII and draw s at x, y like print().
+    Glyphs are collected and drawn in one go; only control codes with side effects draw earlier.
+
+    >>> _print_layout("\\f8hi", 0, 0, False, False)[1:]
+    (8, None, 6, 8, True)
+    >>> _print_layout("\\^c0", 0, 0, False, False)[5]
+    False
+    """
     bg = mem[DRAW_COLOR_PT] & 0xF0
     fg = mem[DRAW_COLOR_PT] & 0x0F
+    draw_col = cursor_x = cursor_y = None
+    # The cursor bytes wrap, so remember the unwrapped carriage return position.
+    home_x, home_y = x, y
     bg_rgb = None
     char_pause = 0
-    s = str(s)
+    glyphs: list[Glyph] = []
+    cacheable = True
+
+    def flush() -> None:
+        """Draw the glyphs so far, before a side effect."""
+        nonlocal cacheable
+        cacheable = False
+        text = _compose_text(glyphs)
+        if text:
+            _blit_sprite(*text, luts=TEXT_LUTS)
+        glyphs.clear()
+
+    def done(result: int | None, end_y: int | None = None) -> PrintLayout:
+        """Draw the remaining glyphs and describe the call."""
+        text = _compose_text(glyphs)
+        if text:
+            _blit_sprite(*text, luts=TEXT_LUTS)
+        return (
+            text,
+            draw_col,
+            cursor_x,
+            cursor_y if end_y is None else end_y,
+            result,
+            cacheable,
+        )
+
     for ln in re.split(r"(?<!\\)\\n|\n", s):
-        x = mem[CURSOR_X_PT]
+        x = home_x
 
         if (do_scroll or _wrap) and y > 121:
+            flush()
             scroll(6)
             y = 121
 
         debug(f"printing {repr(ln)} @ {x}, {y}")
+        from emoji.tokenizer import tokenize  # Slow to import.
+
         tokens = list(c for c, _ in tokenize(ln, True))
         i = 0
         invert = False
@@ -1596,13 +2396,12 @@ def print(
             c1 = "".join(tokens[i + 1 : i + 2])
             c2 = "".join(tokens[i + 1 : i + 3])
             c3 = "".join(tokens[i + 1 : i + 4])
-            debug(f"x {x} y {0} i {i} tokens {''.join(tokens[i:])}")
             if c == "\b" or c == "\\" and c1 == "b":
                 x -= char_width
                 i += 2 if c == "\\" else 1
                 continue
             if c == "\r" or c == "\\" and c1 == "r":
-                x = mem[CURSOR_X_PT]
+                x = home_x
                 i += 2 if c == "\\" else 1
                 continue
             if c == "\t" or c == "\\" and c1 == "t":
@@ -1610,8 +2409,8 @@ def print(
                 i += 2 if c == "\\" else 1
                 continue
             if c == "\0":
-                mem[CURSOR_X_PT] = x
-                return x
+                cursor_x = x
+                return done(x)
             if c in "abcdefghijklmnopqrstuvwxyz":
                 c = c.upper()
             elif c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
@@ -1636,34 +2435,36 @@ def print(
                     continue
                 if c1 == "#":
                     if i + 2 >= len(tokens):
-                        return x
+                        return done(x)
                     # Set background color for this print call only.
                     bg = int(tokens[i + 2], 16)
-                    mem[DRAW_COLOR_PT] = (bg << 4) | fg
+                    draw_col = ((bg << 4) | fg) & 0xFF
                     bg_rgb = PALETTE[bg]
                     i += 3
                     continue
                 if c1 == "f":
                     if i + 2 >= len(tokens):
-                        return x
+                        return done(x)
                     # Set foreground color.
                     fg = int(tokens[i + 2], 16)
-                    mem[DRAW_COLOR_PT] = (bg << 4) | fg
+                    draw_col = ((bg << 4) | fg) & 0xFF
                     i += 3
                     continue
                 if c2 == "^@":
                     # Poke n bytes to memory.
+                    flush()
                     addr = int("".join(tokens[i + 3 : i + 7]), 16)
                     n = int("".join(tokens[i + 7 : i + 11]), 16)
-                    for j in range(n):
-                        poke(addr + j, ord(tokens[i + 11 + i]))
-                    return None
+                    _write(
+                        addr, bytes([ord(c) % 256 for c in tokens[i + 11 : i + 11 + n]])
+                    )
+                    return done(None)
                 if c2 == "^!" and i + 7 < len(tokens):
                     # Set palette til end of string. See spark.py
+                    flush()
                     addr = int("".join(tokens[i + 3 : i + 7]), 16)
-                    for j, c in enumerate(tokens[i + 7 :]):
-                        poke(addr + j, ord(c))
-                    return None
+                    _write(addr, bytes([ord(c) % 256 for c in tokens[i + 7 :]]))
+                    return done(None)
                 if c2 == "^i":
                     invert = True
                     i += 3
@@ -1691,10 +2492,7 @@ def print(
                 if c2 == "^:" and i + 19 < len(tokens):
                     # https://pico-8.fandom.com/wiki/P8SCII_Control_Codes#Drawing_one-off_characters
                     ccn = int("".join(tokens[i + 3 : i + 3 + 16]), 16)
-                    for ccy in range(8):
-                        for ccx in range(8):
-                            if ccn & (1 << (ccy * 8 + ccx)):
-                                pset(x + ccx, y + 7 - ccy)
+                    glyphs.append((x, y, _one_off_rows(ccn), fg, None))
                     x += 9
                     i += 19
                     continue
@@ -1703,27 +2501,24 @@ def print(
                     ccn = 0
                     for raw_byte in tokens[i + 3 : i + 3 + 8]:
                         ccn = (ccn << 8) + ord(raw_byte)
-                    for ccy in range(8):
-                        for ccx in range(8):
-                            if ccn & (1 << (ccy * 8 + ccx)):
-                                pset(x + ccx, y + 7 - ccy)
+                    glyphs.append((x, y, _one_off_rows(ccn), fg, None))
                     x += 9
                     i += 11
                     continue
                 if c2 == "^c" and i + 3 < len(tokens):
+                    flush()
                     _cls(tokens[i + 3])
                     x = y = 0
                     i += 4
                     continue
                 if c2 == "^g":
-                    x = mem[CURSOR_X_PT]
-                    y = mem[CURSOR_Y_PT]
+                    x, y = home_x, home_y
                     i += 3
                     continue
                 # \^h updates the home position to be the cursor's current position.
                 if c2 == "^h":
-                    mem[CURSOR_X_PT] = x
-                    mem[CURSOR_Y_PT] = y
+                    home_x, home_y = x, y
+                    cursor_x, cursor_y = x, y
                     i += 3
                     continue
                 # \^j P0 P1 sets the cursor to an absolute (x, y) pixel position. Each parameter value is multiplied by 4.
@@ -1739,6 +2534,7 @@ def print(
                     continue
                 if c1 == "^" and i + 2 < len(tokens):
                     # Wait for n frames.
+                    flush()
                     flip()
                     pygame.time.wait(int(tokens[i + 2]) * 20)
                     i += 3
@@ -1753,10 +2549,11 @@ def print(
                         i += 3
                     except ValueError:
                         """Handles r"\0"."""
-                        mem[CURSOR_X_PT] = x
-                        return x
+                        cursor_x = x
+                        return done(x)
 
             if char_pause:
+                flush()
                 flip()
                 pygame.time.wait(char_pause)
 
@@ -1764,57 +2561,120 @@ def print(
                 x = 0
                 y += char_height
                 if (do_scroll or _wrap) and y > 121:
+                    flush()
                     scroll(6)
                     y = 121  # There's at least one line printed before.
 
             o = ord(c)
             if custom_font:
-                debug(f"rendering char {c} ord {o}")
-                CHAR_PT = CUSTOM_FONT_PT + o * 8
                 w = char_width if o < 128 else char_width_hi
-                ccn = 0
-                for ibyte in range(8):
-                    ccn = (ccn << 8) + mem[CHAR_PT + ibyte]
-                for ccy in range(char_height):
-                    for ccx in range(w):
-                        if ccn & (1 << (ccy * 8 + ccx)):
-                            pset(x + ccx, y + 7 - ccy)
-                debug(f"x {x}, y {y}")
+                top = max(8 - char_height, 0)
+                glyphs.append(
+                    (x, y + top, _custom_glyph_rows(o, w, char_height), fg, None)
+                )
                 x += w
                 i += 1
                 continue
 
-            character = characters[o].copy()
-            r = character.get_rect()
-
-            for hi in range(r.h):
-                for wi in range(r.w):
-                    clr_at = tuple(character.get_at((wi, hi)))
-                    if clr_at[:3] != (
-                        0,
-                        0,
-                        0,
-                    ):  # TODO: Check whether Color == BLACK = Color((0, 0, 0)) is faster.
-                        _pset(
-                            x - 1 + wi,
-                            y - 1 + hi,
-                            bg if invert else fg,
-                            False,
-                        )
-                    elif bg_rgb is not None:
-                        _pset(
-                            x - 1 + wi,
-                            y - 1 + hi,
-                            fg if invert else bg,
-                            False,
-                        )
+            glyphs.append(
+                (
+                    x - 1,
+                    y - 1,
+                    _font_rows[o],
+                    bg if invert else fg,
+                    (fg if invert else bg) if bg_rgb is not None else None,
+                )
+            )
             x += char_width if o < 128 else char_width_hi
             i += 1
 
         y += char_height
 
-    mem[CURSOR_Y_PT] = y & 0xFF
-    return int(min(128, x))
+    return done(int(min(128, x)), y)
+
+
+def _compose_text(glyphs: list[Glyph]) -> Text | None:
+    """Place glyphs in rows of color indices covering all of them, 16 where none draws.
+
+    >>> _compose_text([(1, 0, (bytes((1, 0)),), 7, None), (0, 0, (bytes((1, 0, 1)),), 8, 2)])
+    (0, 0, [b'\\x08\\x02\\x08'])
+    >>> _compose_text([(0, 0, (bytes((1, 0, 1)),), 8, 2), (1, 0, (bytes((1, 0)),), 7, None)])
+    (0, 0, [b'\\x08\\x07\\x08'])
+    """
+    if not glyphs:
+        return None
+    x0 = min(g[0] for g in glyphs)
+    y0 = min(g[1] for g in glyphs)
+    x1 = max(g[0] + len(g[2][0]) for g in glyphs if g[2])
+    y1 = max(g[1] + len(g[2]) for g in glyphs)
+    canvas = [bytearray(b"\x10" * (x1 - x0)) for _ in range(y1 - y0)]
+    for x, y, rows, on, off in glyphs:
+        table = _glyph_table(on, off)
+        a = x - x0
+        for canvas_row, row in zip(canvas[y - y0 :], rows):
+            if off is None:
+                mask = int.from_bytes(row.translate(GLYPH_MASK), "little")
+                src = int.from_bytes(row.translate(table), "little") & mask
+                old = int.from_bytes(canvas_row[a : a + len(row)], "little") & ~mask
+                canvas_row[a : a + len(row)] = (src | old).to_bytes(len(row), "little")
+            else:
+                canvas_row[a : a + len(row)] = row.translate(table)
+    return x0, y0, [bytes(canvas_row) for canvas_row in canvas]
+
+
+GLYPH_MASK = b"\x00\xff" + bytes(254)
+
+
+@functools.lru_cache(maxsize=512)
+def _glyph_table(on: int, off: int | None) -> bytes:
+    """bytes.translate() table from glyph pixel 1 to on and 0 to off (or 16)."""
+    return bytes((16 if off is None else off & 0x0F, on & 0x0F)) + bytes(254)
+
+
+def _one_off_rows(ccn: int) -> tuple[bytes, ...]:
+    """Rows of an 8x8 one-off character, the first row in the highest byte."""
+    return tuple(
+        bytes(ccn >> ((7 - r) * 8 + b) & 1 for b in range(8)) for r in range(8)
+    )
+
+
+def _custom_glyph_rows(o: int, w: int, h: int) -> tuple[bytes, ...]:
+    """Rows of custom font character o, w pixels wide and the last h of its 8 rows.
+    Decoded from memory at 0x5600 until that is written to.
+
+    >>> poke(CUSTOM_FONT_PT + 65 * 8 + 7, 0b101); _custom_glyph_rows(65, 3, 1)
+    0
+    (b'\\x01\\x00\\x01',)
+    >>> poke(CUSTOM_FONT_PT + 65 * 8 + 7, 0); _custom_glyph_rows(65, 3, 1)
+    0
+    (b'\\x00\\x00\\x00',)
+    """
+    key = (o, w, h)
+    rows = _custom_glyphs.get(key)
+    if rows is None:
+        addr = CUSTOM_FONT_PT + o * 8
+        rows = _custom_glyphs[key] = tuple(
+            bytes(mem[addr + j] >> b & 1 for b in range(w))
+            for j in range(max(8 - h, 0), 8)
+        )
+    return rows
+
+
+def _invalidate_font() -> None:
+    """Forget decoded custom font glyphs and the layouts that may use them."""
+    _custom_glyphs.clear()
+    _print_layouts.clear()
+
+
+def _glyph_rows(image: pygame.Surface) -> tuple[bytes, ...]:
+    """Rows of 1 for each non-black pixel of a character image, else 0."""
+    return tuple(
+        bytes(
+            int(tuple(image.get_at((x, y)))[:3] != (0, 0, 0))
+            for x in range(image.get_width())
+        )
+        for y in range(image.get_height())
+    )
 
 
 def scroll(dy: int = 0) -> int:
@@ -1837,10 +2697,9 @@ def scroll(dy: int = 0) -> int:
         return rv
     dy = min(int(abs(dy)), 128)
     scrolled += dy
-    scroll_to = SCREEN_DATA_PT + 64 * dy
-    memcpy(SCREEN_DATA_PT, scroll_to, GENERAL_USE_PT - scroll_to)
-    for addr in range(GENERAL_USE_PT - 64 * dy, GENERAL_USE_PT):
-        mem[addr] = 0
+    shift = 64 * dy
+    screen_ram[: len(screen_ram) - shift] = screen_ram[shift:]
+    screen_ram[len(screen_ram) - shift :] = bytes(shift)
     return scrolled
 
 
@@ -1914,6 +2773,7 @@ def sset(x: int = 0, y: int = 0, col: int | None = None) -> None:
 
     mx, hi = divmod(x, 2)
     addr = SPRITE_SHEET_PT + flr(y) * 64 + flr(mx)
+    _invalidate_sprites(addr, addr + 1)
     if hi:
         mem[addr] = (mem[addr] & 0x0F) | ((col & 0x0F) << 4)
     else:
@@ -1950,23 +2810,15 @@ def spr(
 
     >>> spr(0)
     >>> spr(0, 0, 0, 1, 1, True, True)
+    >>> sset(8, 0, 1); sset(9, 0, 2); sset(15, 7, 3)
+    >>> cls(); spr(1, 0, 0); spr(1, 8, 0, 1, 1, True, True)
+    >>> _show_screen(0, 0, 16, 1); _show_screen(0, 7, 16, 1)
+    12......3.......
+    .......3......21
+    >>> sset(8, 0, 0); sset(9, 0, 0); sset(15, 7, 0); cls()
     """
-    sx = (n % 16) * 8
-    sy = (n // 16) * 8
-    for dy in range(8 * h):
-        for dx in range(8 * w):
-            if flip_x:
-                tdx = 8 - dx
-            else:
-                tdx = dx
-            if flip_y:
-                tdy = 8 - dy
-            else:
-                tdy = dy
-            # printh(
-            #     f"_pset({x} + {tdx}, {y} + {tdy}, sget({sx} + {dx}, {sy} + {dy}) => {sget(sx + dx, sy + dy)})"
-            # )
-            _pset(x + tdx, y + tdy, sget(sx + dx, sy + dy), False)
+    n = flr(n)
+    sspr((n % 16) * 8, (n // 16) * 8, 8 * w, 8 * h, x, y, None, None, flip_x, flip_y)
 
 
 def _show_surf(s: pygame.Surface) -> None:
@@ -2004,12 +2856,14 @@ def sspr(
 
     >>> sspr(0, 0, 0, 0, 0, 0, -1, -1)
     >>> sspr(0, 0, 1, 1, 1, 1)
-    """
-    sx = flr(sx)
-    sy = flr(sy)
-    sw = flr(sw)
-    sh = flr(sh)
-
+    >>> sset(8, 0, 1); sset(9, 0, 2); cls(); sspr(8, 0, 2, 1, 1, 0, 4, 2); sspr(8, 0, 2, 1, 1, 2, -4)
+    >>> _show_screen(0, 0, 5, 3)
+    .1122
+    .1122
+    .2211
+    >>> sset(8, 0, 0); sset(9, 0, 0); cls()
+    """
+    sx, sy, sw, sh = flr(sx), flr(sy), flr(sw), flr(sh)
     if dx is None:
         dx = 0
     if dy is None:
@@ -2026,63 +2880,172 @@ def sspr(
         dh = abs(dh)
         flip_y = not flip_y
 
-    if flr(sw) == 0 or flr(sh) == 0 or flr(dw) == 0 or flr(dh) == 0:
+    dw, dh = flr(dw), flr(dh)
+    if sw == 0 or sh == 0 or dw == 0 or dh == 0:
         return
 
-    # printh(
-    #     f"sspr(sx {sx:.2f}, sy {sy:.2f}, sw {sw}, sh {sh}, dx {dx:.2f}, dy {dy:.2f}, dw {dw:.2f}, dh {dh:.2f}, {flip_x}, {flip_y})"
-    # )
+    dx, dy = pos(dx, dy)
+    rows = _sprite_rows(sx, sy, sw, sh, dw, dh)
+    if flip_y:
+        rows = rows[::-1]
+    if flip_x:
+        rows = [row[::-1] for row in rows]
+    _blit_sprite(dx, dy, rows)
+
+
+# Decoded sprite rows by (sx, sy, sw, sh, dw, dh), and the keys using each 8 pixel band of the sheet.
+_sprite_cache: dict[tuple[int, ...], list[bytes]] = {}
+_sprite_bands: list[set[tuple[int, ...]]] = [set() for _ in range(16)]
+SPRITE_CACHE_SIZE = 1024
+
+
+def _sprite_rows(sx: int, sy: int, sw: int, sh: int, dw: int, dh: int) -> list[bytes]:
+    """Return the sheet area sx, sy, sw, sh scaled to dw x dh as rows of color index bytes.
+    Decoded once, until poke(), sset(), memcpy() or memset() write to that part of the sheet.
+
+    >>> sset(1, 1, 7); [list(row) for row in _sprite_rows(0, 0, 2, 2, 4, 2)]
+    [[0, 0, 0, 0], [0, 0, 7, 7]]
+    >>> sset(1, 1, 0); [list(row) for row in _sprite_rows(0, 0, 2, 2, 4, 2)]
+    [[0, 0, 0, 0], [0, 0, 0, 0]]
+    """
+    key = (sx, sy, sw, sh, dw, dh)
+    rows = _sprite_cache.get(key)
+    if rows is not None:
+        return rows
+    if len(_sprite_cache) >= SPRITE_CACHE_SIZE:
+        _sprite_cache.clear()
+        for band in _sprite_bands:
+            band.clear()
+
+    cols = [flr(sx + x * sw / dw) for x in range(dw)]
+    # Columns outside the sheet read the 0 after its 128 pixels.
+    cols = [x if 0 <= x < 128 else 128 for x in cols]
+    sheet_rows: dict[int, bytes] = {}
+    rows = []
+    for y in range(dh):
+        sheet_y = flr(sy + y * sh / dh)
+        if sheet_y not in sheet_rows:
+            if 0 <= sheet_y < 128:
+                addr = SPRITE_SHEET_PT + sheet_y * 64
+                pixels = _unpack(bytes(mem[addr : addr + 64])) + bytes(1)
+            else:
+                pixels = bytes(129)
+            if cols == list(range(cols[0], cols[0] + dw)):
+                sheet_rows[sheet_y] = pixels[cols[0] : cols[0] + dw]
+            else:
+                sheet_rows[sheet_y] = bytes(pixels[x] for x in cols)
+            if 0 <= sheet_y < 128:
+                _sprite_bands[sheet_y // 8].add(key)
+        rows.append(sheet_rows[sheet_y])
+    _sprite_cache[key] = rows
+    return rows
+
+
+def _invalidate_sprites(start: int, end: int) -> None:
+    """Forget decoded sprites using sheet addresses start up to end."""
+    _map_cache.clear()
+    for band in range(start // 512, min(end - 1, 0x1FFF) // 512 + 1):
+        for key in _sprite_bands[band]:
+            _sprite_cache.pop(key, None)
+        _sprite_bands[band].clear()
+
 
-    dh = abs(flr(dh))
-    dw = abs(flr(dw))
+def _blit_sprite(
+    x: int, y: int, rows: list[bytes], luts: tuple[bytes, bytes, bytes] | None = None
+) -> None:
+    """Draw rows of sprite color indices at screen x, y through the draw palette.
+    Colors with the palt() bit are transparent. With fill palette mode (0x5F33 bit 1) colors map
+    to the pairs at 0x5F60, with the fill pattern choosing the lo (on) or hi (off) nibble.
+    Each screen row is merged and written back as whole bytes.
+    Given luts, the on color and opacity tables, those replace the palettes and fill pattern.
+
+    >>> cls(5); _blit_sprite(1, 0, [bytes((0, 1, 2))]); pal(2, 9); _blit_sprite(2, 1, [bytes((2,))])
+    2
+    >>> _show_screen(0, 0, 4, 2)
+    5512
+    5595
+    >>> fillp(0x8000); poke(FILL_PATTERN_PT + 2, 2); poke(FILL_PALETTE_PT + 1, 0x4A)
+    0.0
+    0
+    0
+    >>> _blit_sprite(0, 0, [bytes((1, 1))]); _show_screen(0, 0, 4, 1)
+    4a12
+    >>> fillp(); pal(); pal(2); cls()
+    -32767.75
+    0
+    0
+    """
+    state = _draw_state()
+    top = max(y, state.clip_y1)
+    bottom = min(y + len(rows), state.clip_y2)
+    left = max(x, state.clip_x1)
+    right = min(x + len(rows[0]) if rows else x, state.clip_x2)
+    if top >= bottom or left >= right:
+        return
+    byte0 = left // 2
+    n = (right + 1) // 2 - byte0
+    # Pad to whole bytes with index 16, which no palette entry draws.
+    pad_left = b"\x10" * (left - byte0 * 2)
+    pad_right = b"\x10" * (2 * n - (right - byte0 * 2))
+    pixels = b"".join(
+        pad_left + row[left - x : right - x] + pad_right
+        for row in rows[top - y : bottom - y]
+    )
 
-    rw = sw / dw
-    rh = sh / dh
+    draw_palette = state.draw_palette
+    if luts:
+        on, _, opaque = luts
+        src = int.from_bytes(pixels.translate(on), "little")
+        mask = int.from_bytes(pixels.translate(opaque), "little")
+    elif state.use_fill_palette:
+        on, off, opaque = _sprite_luts(draw_palette, state.fill_palette)
+        pattern = state.pattern
+        off_mask = int.from_bytes(
+            b"".join(
+                _pattern_row(pattern, row_y, byte0 * 2, 2 * n)
+                for row_y in range(top, bottom)
+            ),
+            "little",
+        )
+        src = int.from_bytes(pixels.translate(on), "little") & ~off_mask
+        src |= int.from_bytes(pixels.translate(off), "little") & off_mask
+        mask = int.from_bytes(pixels.translate(opaque), "little")
+        if state.transparent:
+            mask &= ~off_mask
+    else:
+        on, _, opaque = _sprite_luts(draw_palette)
+        src = int.from_bytes(pixels.translate(on), "little")
+        mask = int.from_bytes(pixels.translate(opaque), "little")
 
-    # sprite = pygame.transform.flip(sprite_get(sx, sy, sw, sh), flip_x, flip_y)
-    # sprite = pygame.transform.scale(sprite, (dw, dh))
-    # sprite.set_at((0, 0), (255, 0, 0, 100))
-    # sprite.set_colorkey((0, 0, 0))
+    addrs = range(SCREEN_DATA_PT + top * 64 + byte0, SCREEN_DATA_PT + bottom * 64, 64)
+    if mask.bit_count() < 8 * len(pixels):
+        dst = int.from_bytes(_unpack(b"".join(mem[a : a + n] for a in addrs)), "little")
+        src = (src & mask) | (dst & ~mask)
+    packed = _pack(src.to_bytes(len(pixels), "little"))
+    for i, addr in enumerate(addrs):
+        mem[addr : addr + n] = packed[i * n : i * n + n]
 
-    # OK
-    # pygame.image.save(sprite, f"debug_sspr{sx},{sy},{sw},{sh}, d {dx},{dy},{dw},{dh}, f {flip_x},{flip_y}.png")
-    # pygame.image.save(spritesheet, f"debug_spritesheet.png")
-    # 1/0
-    # show_surf(sprite)
-    # surf.blit(sprite, (dx, dy))
 
-    # for y in range(sh):
-    #     for x in range(sx):
-    #         c = sget(x, y)
-    #         builtins.print(f"{c if c else ' '}", end="")
-    #     builtins.print()
-    # return
+@functools.lru_cache(maxsize=64)
+def _sprite_luts(
+    draw_palette: bytes, fill_palette: bytes | None = None
+) -> tuple[bytes, bytes, bytes]:
+    """bytes.translate() tables from sprite color to on color, off color and opacity (0xFF).
+    Without a fill palette the on color comes from the draw palette and there is no off color.
+    """
+    opaque = bytes(0 if c & 16 else 0xFF for c in draw_palette) + bytes(240)
+    if fill_palette is None:
+        return bytes(c & 0x0F for c in draw_palette) + bytes(240), bytes(256), opaque
+    on = bytes(c & 0x0F for c in fill_palette) + bytes(240)
+    off = bytes(c >> 4 for c in fill_palette) + bytes(240)
+    return on, off, opaque
 
-    fg = mem[DRAW_COLOR_PT] & 0x0F
-    bg = (mem[DRAW_COLOR_PT] & 0xF0) >> 4
-    for y in range(dh):
-        for x in range(dw):
-            tx = (dw - 1 - x) if flip_x else x
-            ty = (dh - 1 - y) if flip_y else y
-            col = sget(sx + tx * rw, sy + ty * rh)
-            col2 = mem[DRAW_PALETTE_PT + col]
-            # col = mem[DRAW_PALETTE_PT + sget(sx + tx * rw, sy + ty * rh)]
-            # builtins.print(f"({x * rw: 2.0f},{y * rh:2.0f}c{col:2})", end="")
-            # builtins.print(f"{col:2} ", end="")
-            # rgba = sprite.get_at((x, y))
-            # printh(rgba)
-            # v = sum(rgba) % 16
-            if mem[FILL_PALETTE_PT] and fg != bg:
-                # builtins.print(f"f{fg:02}b{bg:02} ", end="")
-                _pset(flr(dx + tx), flr(dy + ty), bg if (col2 & 16) else fg)
-            else:
-                # builtins.print(
-                #     f"0v{v:02} {col} ", end=""
-                # )
-                # Draw if not transparent.
-                if not col2 & 16:
-                    _pset(flr(dx + tx), flr(dy + ty), col)  # v)
-        # builtins.print()
+
+@functools.lru_cache(maxsize=64)
+def _pattern_row(pattern: int, y: int, x: int, n: int) -> bytes:
+    """0xFF for each of n pixels from x on row y that the fill pattern turns off."""
+    bits = pattern >> (12 - 4 * (y % 4))
+    return bytes(0xFF if bits >> (3 - (x + i) % 4) & 1 else 0 for i in range(n))
 
 
 def twos_complement_to_signed(value: int, bits: int = 16) -> int:
@@ -2192,11 +3155,11 @@ def reset() -> None:
     if not flags & 2:
         poke(HIGH_COLOR_PT, 0)
     if not flags & 4:
-        poke(AUDIO_FX_PT, 0, 0, 0)
+        mem[AUDIO_FX_PT : AUDIO_FX_PT + 3] = bytes(3)
     if not flags & 8:
         poke(BITPLANE_PT, 255)
     if not flags & 16:
-        poke(PRINT_PT, 0, 0, 0, 0)
+        mem[PRINT_PT : PRINT_PT + 4] = bytes(4)
     if not flags & 32:
         fillp()
     camera()